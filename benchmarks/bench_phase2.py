@@ -0,0 +1,181 @@
+"""
+Benchmarks the Phase 2 processing hot path on a synthetic corpus.
+
+Times text extraction, chunking and metadata extraction on their own, each
+entity type's search against a plain regex pass for it, then
+a full `run_text_extraction_pipeline` from an empty index, and reports MB/s
+and peak RSS for each. Results are compared against a stored baseline and
+the run fails if any stage is slower or larger than the tolerance allows,
+or if an entity type's anchored search is slower than a plain regex pass.
+
+    python benchmarks/bench_phase2.py --scale 2
+    python benchmarks/bench_phase2.py --save-baseline
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.measure import PeakRssSampler
+from processing.text_extraction import extract_text
+from processing.chunking import chunk_spans, chunk_text_by_paragraph
+from processing.metadata_extraction import ENTITY_PATTERNS, extract_metadata, find_entity
+from processing.pipeline import find_input_files, run_text_extraction_pipeline
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "phase2.json"
+TOLERANCE = 0.15
+# Timing differences below this are noise for stages that take milliseconds.
+NOISE_SECONDS = 0.005
+
+
+def _measure(name: str, megabytes: float, work) -> dict:
+    with PeakRssSampler(interval=0.02) as sampler:
+        start = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - start
+    return {
+        "stage": name,
+        "seconds": round(elapsed, 3),
+        "mb_per_sec": round(megabytes / elapsed, 2),
+        "peak_rss_mb": round(sampler.peak / 1e6, 1),
+    }
+
+
+def run_benchmarks(root: Path) -> list:
+    """
+    Runs every stage over the corpus under `root/data`.
+    """
+    files = sorted(find_input_files(root / "data"))
+    input_mb = sum(f.stat().st_size for f in files) / 1e6
+    texts = {}
+
+    def extract():
+        for file_path in files:
+            texts[file_path] = extract_text(str(file_path))
+
+    results = [_measure("extract_text", input_mb, extract)]
+    text_mb = sum(len(text.encode("utf-8")) for text in texts.values()) / 1e6
+
+    results.append(_measure("chunk_text_by_paragraph", text_mb,
+                            lambda: [chunk_text_by_paragraph(text) for text in texts.values()]))
+    results.append(_measure("chunk_spans", text_mb,
+                            lambda: [list(chunk_spans(text)) for text in texts.values()]))
+    results.append(_measure("extract_metadata", text_mb,
+                            lambda: [extract_metadata(path, text) for path, text in texts.items()]))
+    results.extend(entity_type_stages(list(texts.values()), text_mb))
+    texts.clear()
+
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        shutil.rmtree("data/index", ignore_errors=True)
+        results.append(_measure("run_text_extraction_pipeline", input_mb, run_text_extraction_pipeline))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def entity_type_stages(texts: list, megabytes: float) -> list:
+    """
+    Times each entity type's anchored search, and a plain `finditer` pass
+    with its pattern for comparison.
+    """
+    results = []
+    for kind, pattern in ENTITY_PATTERNS.items():
+        compiled = re.compile(pattern)
+        results.append(_measure(f"entities.{kind}", megabytes,
+                                lambda kind=kind: [list(find_entity(text, kind)) for text in texts]))
+        results.append(_measure(f"entities.{kind}.full_scan", megabytes,
+                                lambda compiled=compiled: [list(compiled.finditer(text)) for text in texts]))
+    return results
+
+
+def check_entity_costs(results: list, tolerance: float) -> list:
+    """
+    Returns a description of every entity type whose anchored search is
+    slower than a full regex pass, which would make each added entity type
+    cost another pass over the text. Differences under `NOISE_SECONDS` are
+    ignored.
+    """
+    by_stage = {result["stage"]: result for result in results}
+    slow = []
+    for kind in ENTITY_PATTERNS:
+        anchored, full_scan = by_stage.get(f"entities.{kind}"), by_stage.get(f"entities.{kind}.full_scan")
+        if (anchored and full_scan and anchored["seconds"] > full_scan["seconds"] * (1 + tolerance)
+                and anchored["seconds"] - full_scan["seconds"] > NOISE_SECONDS):
+            slow.append(f"entities.{kind}: {anchored['seconds']}s anchored vs {full_scan['seconds']}s for a full scan")
+    return slow
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a description of every stage that regressed against the baseline.
+
+    A stage missing from the baseline is reported too, so a lost or stale
+    baseline fails the run instead of passing it unchecked.
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result["stage"])
+        if not expected:
+            regressions.append(f"{result['stage']}: no baseline; run with --save-baseline to record one")
+            continue
+        if result["mb_per_sec"] < expected["mb_per_sec"] * (1 - tolerance):
+            regressions.append(f"{result['stage']}: {result['mb_per_sec']} MB/s vs baseline {expected['mb_per_sec']} MB/s")
+        if result["peak_rss_mb"] > expected["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['stage']}: {result['peak_rss_mb']} MB peak vs baseline {expected['peak_rss_mb']} MB")
+    return regressions
+
+
+def print_report(results: list, baseline: dict) -> None:
+    print(f"{'stage':30} {'seconds':>8} {'MB/s':>9} {'baseline':>9} {'peak MB':>8}")
+    for result in results:
+        expected = baseline.get(result["stage"], {}).get("mb_per_sec", "-")
+        print(f"{result['stage']:30} {result['seconds']:8} {result['mb_per_sec']:9} {expected:>9} {result['peak_rss_mb']:8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Phase 2 processing stages.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Corpus size multiplier.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", type=Path, help="Reuse a corpus generated by benchmarks/corpus.py.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed fractional regression.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's info logging.")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory(prefix="bench-phase2-") as workdir:
+        root = args.corpus or Path(workdir)
+        if not (root / "data").exists():
+            generate_corpus(root, scale=args.scale, seed=args.seed)
+        results = run_benchmarks(root)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    print_report(results, baseline)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({r["stage"]: r for r in results}, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance) + check_entity_costs(results, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
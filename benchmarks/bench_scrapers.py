@@ -0,0 +1,134 @@
+"""
+Benchmarks the scrapers against the local site simulator.
+
+Each scraper runs in a fresh temporary working directory with all of its
+traffic redirected to the simulator, and is reported as pages/s,
+downloads/s, peak RSS of the process tree (Python, the Playwright driver and
+the browsers), the number of browsers launched, the peak number of open
+pages and how often page pools recycled their browser context. Browser
+counts cover this process only, so they leave out the worker processes of
+multi-process scrapers.
+
+    python benchmarks/bench_scrapers.py --scale 50 --latency-ms 80 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.measure import PeakRssSampler
+from benchmarks.site_simulator import SiteSimulator
+
+# Benchmark name -> (module, coroutine function[, keyword arguments]).
+SCRAPERS = {
+    "nnols-base-code": ("scrapers.nnols_scrapers", "scrape_base_code"),
+    "nnols-amendments": ("scrapers.nnols_scrapers", "scrape_amendments"),
+    "dibb": ("scrapers.dibb_scrapers", "scrape_legislative_metadata"),
+    "dibb-4-processes": ("scrapers.dibb_scrapers", "scrape_legislative_metadata", {"processes": 4}),
+    "council-legislation": ("scrapers.navajonationcouncil_scrapers", "scrape_bills_and_resolutions"),
+    "council-members": ("scrapers.navajonationcouncil_scrapers", "scrape_council_member_data"),
+    "council-press": ("scrapers.nnc_press_scrapers", "scrape_press_releases"),
+    "council-press-browser": ("scrapers.nnc_press_scrapers", "scrape_press_releases_browser"),
+    "courts": ("scrapers.courts_scrapers", "scrape_supreme_court_opinions"),
+    "opvp-roster": ("scrapers.opvp_scrapers", "scrape_opvp_roster"),
+    "opvp-press": ("scrapers.opvp_scrapers", "scrape_opvp_press_releases"),
+    "opvp-press-browser": ("scrapers.opvp_scrapers", "scrape_opvp_press_releases_browser"),
+    "nndoj": ("scrapers.nndoj_scrapers", "scrape_nndoj_roster"),
+}
+
+
+def run_scraper(name: str, simulator: SiteSimulator) -> dict:
+    """
+    Runs one scraper against the simulator and returns its measurements.
+    """
+    from scrapers.browser import browser_stats
+
+    module_name, function_name, *kwargs = SCRAPERS[name]
+    scraper = getattr(importlib.import_module(module_name), function_name)
+    simulator.reset_stats()
+    launched_before = browser_stats["launched"]
+    recycled_before = browser_stats["contexts_recycled"]
+    blocked_before = browser_stats["requests_blocked"]
+    browser_stats["peak_open"] = browser_stats["open"]
+    browser_stats["peak_pages_open"] = browser_stats["pages_open"]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+        os.chdir(workdir)
+        try:
+            with PeakRssSampler() as sampler:
+                start = time.perf_counter()
+                asyncio.run(scraper(**(kwargs[0] if kwargs else {})))
+                elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    stats = simulator.stats
+    return {
+        "scraper": name,
+        "seconds": round(elapsed, 3),
+        "pages": stats["pages"],
+        "downloads": stats["downloads"],
+        "pages_per_sec": round(stats["pages"] / elapsed, 2),
+        "downloads_per_sec": round(stats["downloads"] / elapsed, 2),
+        "errors_injected": stats["errors"],
+        "megabytes": round(stats["bytes"] / 1e6, 2),
+        "peak_rss_mb": round(sampler.peak / 1e6, 1),
+        "browsers_launched": browser_stats["launched"] - launched_before,
+        "peak_open_browsers": browser_stats["peak_open"],
+        "peak_open_pages": browser_stats["peak_pages_open"],
+        "contexts_recycled": browser_stats["contexts_recycled"] - recycled_before,
+        "requests_blocked": browser_stats["requests_blocked"] - blocked_before,
+    }
+
+
+def print_report(results) -> None:
+    columns = ["scraper", "seconds", "pages_per_sec", "downloads_per_sec", "errors_injected",
+               "peak_rss_mb", "browsers_launched", "peak_open_browsers",
+               "peak_open_pages", "contexts_recycled", "requests_blocked"]
+    widths = [max(len(column), *(len(str(r[column])) for r in results)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against a local site simulator.")
+    parser.add_argument("scrapers", nargs="*", help=f"Scrapers to run (default: all): {', '.join(SCRAPERS)}.")
+    parser.add_argument("--scale", type=int, default=20, help="Items per simulated listing.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every response.")
+    parser.add_argument("--bandwidth-kbps", type=float, help="Per-response bandwidth cap in kilobytes per second.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of responses that fail or are truncated.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the results to this file.")
+    args = parser.parse_args()
+    unknown = set(args.scrapers) - set(SCRAPERS)
+    if unknown:
+        parser.error(f"unknown scrapers: {', '.join(sorted(unknown))}")
+
+    simulator = SiteSimulator(
+        scale=args.scale,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_kbps * 1000 if args.bandwidth_kbps else None,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    with simulator:
+        os.environ["ZHIN_SITE_OVERRIDE"] = simulator.url
+        results = [run_scraper(name, simulator) for name in (args.scrapers or SCRAPERS)]
+
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
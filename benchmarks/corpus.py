@@ -0,0 +1,141 @@
+"""
+Generates a synthetic Phase 2 corpus.
+
+The corpus mirrors the shape of the real data directory: long Navajo Nation
+Code volumes (many pages of titled, chaptered sections full of N.N.C.
+citations), short council resolutions (resolution numbers, sponsors, dates)
+and press releases as both PDFs and OPVP Markdown. PDFs are written with
+PyMuPDF so that text extraction does real work.
+
+    python benchmarks/corpus.py /tmp/corpus --scale 2
+"""
+import argparse
+import random
+from pathlib import Path
+import fitz  # PyMuPDF
+
+# Documents generated at scale 1.0: (count, pages per PDF).
+CODE_VOLUMES = (4, 120)
+RESOLUTIONS = (60, 4)
+PRESS_RELEASE_PDFS = (30, 2)
+PRESS_RELEASE_MARKDOWN = 60
+
+LINES_PER_PAGE = 64
+LINE_WIDTH = 95
+
+_WORDS = (
+    "the nation council shall may grazing permit land water chapter delegate committee resources approve "
+    "agreement lease right-of-way tribal court jurisdiction enforcement section provided however person "
+    "entity department authority budget appropriation fiscal year program health education housing "
+    "president vice office law order regulation amend repeal enact navajo public hearing notice"
+).split()
+_NAMES = ["Begay", "Yazzie", "Tsosie", "Benally", "Nez", "Charley", "Etsitty", "Slater", "Tso", "Wauneka"]
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+           "October", "November", "December"]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(8, 24))
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), f"{rng.randint(1, 26)} N.N.C. § {rng.randint(1, 3000)}")
+    return " ".join(words).capitalize() + "."
+
+
+def _wrap(paragraph: str):
+    line = ""
+    for word in paragraph.split(" "):
+        if line and len(line) + len(word) + 1 > LINE_WIDTH:
+            yield line
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        yield line
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.choice(_MONTHS)} {rng.randint(1, 28)}, {rng.randint(2010, 2025)}"
+
+
+def code_volume_lines(rng: random.Random, title: int, pages: int):
+    lines = [f"TITLE {title}", ""]
+    chapter = section = 0
+    while len(lines) < pages * LINES_PER_PAGE:
+        if section % 12 == 0:
+            chapter += 1
+            lines += [f"CHAPTER {chapter}", ""]
+        section += 1
+        lines.append(f"§ {chapter * 100 + section}. {' '.join(rng.choices(_WORDS, k=4)).title()}")
+        for _ in range(rng.randint(1, 4)):
+            lines += list(_wrap(" ".join(_sentence(rng) for _ in range(rng.randint(2, 6))))) + [""]
+    return lines
+
+
+def resolution_lines(rng: random.Random, number: str, pages: int):
+    lines = [f"RESOLUTION OF THE NAVAJO NATION COUNCIL {number}", "",
+             f"Sponsored by Honorable {rng.choice(_NAMES)} {rng.choice(_NAMES)}", f"Passed {_date(rng)}", ""]
+    while len(lines) < pages * LINES_PER_PAGE:
+        lines += list(_wrap("WHEREAS: " + " ".join(_sentence(rng) for _ in range(rng.randint(2, 5))))) + [""]
+    return lines
+
+
+def press_release_lines(rng: random.Random, pages: int):
+    lines = [f"FOR IMMEDIATE RELEASE {_date(rng)}", ""]
+    while len(lines) < pages * LINES_PER_PAGE:
+        lines += list(_wrap(" ".join(_sentence(rng) for _ in range(rng.randint(3, 7))))) + [""]
+    return lines
+
+
+def write_pdf(path: Path, lines) -> None:
+    """
+    Writes lines of text to a PDF, LINES_PER_PAGE per page.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        page = doc.new_page()
+        page.insert_text((36, 40), "\n".join(lines[start:start + LINES_PER_PAGE]), fontsize=8)
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def generate_corpus(root: Path, scale: float = 1.0, seed: int = 0) -> Path:
+    """
+    Writes a synthetic corpus under `root/data` and returns that directory.
+    """
+    rng = random.Random(seed)
+    data_dir = Path(root) / "data"
+    count = lambda base: max(1, round(base * scale))
+
+    for title in range(1, count(CODE_VOLUMES[0]) + 1):
+        write_pdf(data_dir / "nnols/base_code" / f"title-{title}.pdf",
+                  code_volume_lines(rng, title, CODE_VOLUMES[1]))
+    for i in range(count(RESOLUTIONS[0])):
+        number = f"CJA-{i + 1:02d}-{rng.randint(10, 25)}"
+        write_pdf(data_dir / "navajonationcouncil/bills_and_resolutions" / f"{number}.pdf",
+                  resolution_lines(rng, number, RESOLUTIONS[1]))
+    for i in range(count(PRESS_RELEASE_PDFS[0])):
+        write_pdf(data_dir / "nnc_press_releases" / f"press-{i}.pdf", press_release_lines(rng, PRESS_RELEASE_PDFS[1]))
+    markdown_dir = data_dir / "opvp/press_releases"
+    markdown_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count(PRESS_RELEASE_MARKDOWN)):
+        paragraphs = "\n\n".join(" ".join(_sentence(rng) for _ in range(rng.randint(3, 7))) for _ in range(8))
+        (markdown_dir / f"release-{i}.md").write_text(
+            f"# Press Release {i}\n\n**{_date(rng)}**\n\n{paragraphs}\n", encoding="utf-8"
+        )
+    return data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Phase 2 corpus.")
+    parser.add_argument("root", type=Path, help="Directory to create the data/ tree in.")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    data_dir = generate_corpus(args.root, scale=args.scale, seed=args.seed)
+    size = sum(f.stat().st_size for f in data_dir.rglob("*") if f.is_file())
+    print(f"Wrote {size / 1e6:.1f} MB to {data_dir}")
+
+
+if __name__ == "__main__":
+    main()
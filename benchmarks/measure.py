@@ -0,0 +1,39 @@
+"""
+Memory measurement shared by the benchmarks.
+"""
+import os
+import resource
+import threading
+from pathlib import Path
+from profiling import process_tree_rss
+
+
+class PeakRssSampler:
+    """
+    Samples the RSS of this process tree in a background thread.
+
+    Falls back to the process's own peak from getrusage where /proc is
+    unavailable.
+    """
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if Path("/proc/self/statm").exists():
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        else:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
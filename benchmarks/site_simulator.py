@@ -0,0 +1,426 @@
+"""
+A local stand-in for the government sites the scrapers crawl.
+
+The simulator is a threaded HTTP server that answers requests rewritten by
+`scrapers.browser` (`/<host>/<path>`). Recorded pages are served from
+`benchmarks/fixtures/<host>/<path>` when present; everything else is
+generated from templates that reproduce the markup each scraper selects on,
+at a configurable number of items per listing. Latency, bandwidth and error
+injection apply to every response. PDFs carry an ETag and honour single
+open-ended Range requests, so resumed downloads can be exercised.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Size of the generated PDFs; real documents range from tens of KB to a few MB.
+PDF_SIZE = 64 * 1024
+CHUNK_SIZE = 16 * 1024
+OPVP_POSTS_PER_PAGE = 10
+OPVP_AUTHOR = "OPVP Communications"
+OPVP_CATEGORY = "Press Releases"
+NNDOJ_DEPARTMENTS = [
+    "Chapter-Unit", "Economic-Community-Development", "Human-Services-Government", "Litigation-Unit",
+    "Natural-Resources", "Office-of-Attorney-General", "Tax-and-Finance", "Water-Rights",
+]
+
+
+def fake_pdf(name: str, size: int = PDF_SIZE) -> bytes:
+    """
+    Returns a single-page PDF padded to roughly `size` bytes.
+    """
+    text = f"BT /F1 12 Tf 72 720 Td ({name}) Tj ET"
+    padding = "%" + "x" * 78 + "\n"
+    body = (padding * max(0, (size - 600) // len(padding))).encode()
+    return (
+        b"%PDF-1.4\n"
+        b"1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+        b"2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj\n"
+        b"3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R >> endobj\n"
+        + f"4 0 obj << /Length {len(text)} >> stream\n{text}\nendstream endobj\n".encode()
+        + body
+        + b"trailer << /Root 1 0 R >>\n%%EOF\n"
+    )
+
+
+def _range_start(header):
+    """
+    Returns N for a `bytes=N-` Range header, or None for anything else.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    start, _, end = header[len("bytes="):].partition("-")
+    return int(start) if start.isdigit() and not end else None
+
+
+def _page(title: str, body: str) -> str:
+    return f"<!DOCTYPE html><html><head><title>{title}</title></head><body>{body}</body></html>"
+
+
+def _pdf_links(urls) -> str:
+    return "".join(f'<p><a href="{url}">{url.rsplit("/", 1)[-1]}</a></p>' for url in urls)
+
+
+def opvp_post_meta_html() -> str:
+    """
+    Returns a release's byline in the markup Divi renders for `p.post-meta`.
+    """
+    return (
+        '<p class="post-meta"> by <span class="author vcard">'
+        f'<a href="https://opvp.navajo-nsn.gov/author/opvp/" title="Posts by {OPVP_AUTHOR}" rel="author">{OPVP_AUTHOR}</a>'
+        '</span> | <span class="published">Jan 1, 2025</span> | '
+        f'<a href="https://opvp.navajo-nsn.gov/category/press-releases/" rel="category tag">{OPVP_CATEGORY}</a></p>'
+    )
+
+
+def _accordion(items) -> str:
+    return "".join(
+        f'<div class="et_pb_accordion_item"><h5 class="et_pb_toggle_title">{title}</h5>'
+        f'<div class="et_pb_toggle_content">{content}</div></div>'
+        for title, content in items
+    )
+
+
+class _Sites:
+    """
+    Generates the pages of every simulated site at a given scale.
+    """
+    def __init__(self, scale: int):
+        self.scale = scale
+
+    def render(self, host: str, path: str, query: dict):
+        """
+        Returns (content type, body) for a request, or None for a 404.
+        """
+        if path.endswith(".pdf") or path.startswith("/api/FileInfo/GetUri"):
+            return "application/pdf", fake_pdf(f"{host}{path}")
+        if path.startswith("/wp-json/"):
+            return self._wp_json(host, path.rstrip("/"), query)
+        handler = getattr(self, "_" + host.replace("www.", "").split(".")[0], None)
+        html = handler(path.rstrip("/") or "/", query) if handler else None
+        return ("text/html; charset=utf-8", html.encode()) if html is not None else None
+
+    def _nnols(self, path, query):
+        if path == "/navajo-nation-code":
+            urls = [f"http://nnols.org/wp-content/uploads/code/title-{i}.pdf" for i in range(self.scale)]
+            return _page("Navajo Nation Code", _pdf_links(urls))
+        if path == "/navajo-nation-code/amendments":
+            urls = [f"http://nnols.org/wp-content/uploads/amendments/amendment-{i}.pdf" for i in range(self.scale)]
+            return _page("Amendments", _pdf_links(urls))
+        return None
+
+    def _dibb(self, path, query):
+        if path == "/publicreporting.aspx":
+            # The real table is paginated client-side by DataTables.
+            return _page("Public Reporting", f"""
+                <select name="LegislationInfoTable_length"><option>10</option><option>25</option><option>100</option></select>
+                <table id="LegislationInfoTable"><tbody></tbody></table>
+                <a id="LegislationInfoTable_next" class="paginate_button next">Next</a>
+                <script>
+                const total = {self.scale}; let size = 10, page = 0;
+                const select = document.querySelector("select"), next = document.getElementById("LegislationInfoTable_next");
+                function render() {{
+                    let rows = "";
+                    for (let i = page * size; i < Math.min(total, (page + 1) * size); i++) {{
+                        rows += `<tr><td>${{String(i).padStart(4, "0")}}-25</td><td><a href="Legislation.aspx?LegislationID=${{i}}">View</a></td></tr>`;
+                    }}
+                    document.querySelector("#LegislationInfoTable tbody").innerHTML = rows;
+                    next.className = (page + 1) * size >= total ? "paginate_button next disabled" : "paginate_button next";
+                }}
+                select.onchange = () => {{ size = parseInt(select.value, 10); page = 0; render(); }};
+                next.onclick = () => {{ if ((page + 1) * size < total) {{ page++; render(); }} }};
+                render();
+                </script>""")
+        if path == "/Legislation.aspx":
+            bill = query.get("LegislationID", ["0"])[0]
+            documents = "".join(
+                f'<tr><td class="TableLnks"><a href="/api/FileInfo/GetUri/?fileId=BILL{bill}DOC{j}">Document {j}</a></td></tr>'
+                for j in range(2)
+            )
+            return _page(f"Bill {bill}", f"""
+                <div id="ContentPlaceHolder1_divLegislationNumber">{int(bill):04d}-25</div>
+                <div id="ContentPlaceHolder1_divLegislationTitle">An Action Relating to Item {bill}</div>
+                <div id="ContentPlaceHolder1_divLegislationDescription">Approving item {bill}.</div>
+                <div id="ContentPlaceHolder1_divSponsor">Honorable Sponsor {int(bill) % 24}</div>
+                <div id="ContentPlaceHolder1_divCoSponsor"></div>
+                <div id="ContentPlaceHolder1_divStatus">Passed</div>
+                <select name="DataTables_Table_0_length"><option>10</option><option>100</option></select>
+                <table>{documents}</table>""")
+        return None
+
+    def _navajonationcouncil(self, path, query):
+        if path == "/legislation-2025":
+            items = [
+                (f"Resolution {i}", _pdf_links([f"https://www.navajonationcouncil.org/wp-content/uploads/2025/legislation-{i}.pdf"]))
+                for i in range(self.scale)
+            ]
+            return _page("Legislation", _accordion(items))
+        if path == "/council":
+            items = [
+                (f"Council Delegate {i}",
+                 f'<img src="https://www.navajonationcouncil.org/photos/{i}.jpg">'
+                 f"<p><strong>Delegate {i} is representing:</strong></p><p>(Chapter {i})</p>"
+                 f"<p><strong>Committee:</strong> Resources<br></p><p><em>delegate{i}@navajo-nsn.gov</em></p>"
+                 f"<p><strong>Hometown: </strong>Town {i}</p>")
+                for i in range(self.scale)
+            ]
+            return _page("Council", _accordion(items))
+        if path == "/press-releases-archive":
+            return _page("Press Releases", self._press_archive())
+        return None
+
+    def _press_archive(self) -> str:
+        years = range(2016, 2026)
+        controls = "".join(f"<li><a>{year} Press Releases</a></li>" for year in years)
+        panels = ""
+        for year in years:
+            releases = "".join(
+                f'<li>1/{k % 28 + 1}/{year} – <a href="https://www.navajonationcouncil.org/wp-content/uploads/{year}/press-{k}.pdf">Release {k}</a></li>'
+                for k in range(self.scale) if k % len(years) == year - years.start
+            )
+            panels += f'<div class="et_pb_tab"><ul>{releases}</ul></div>'
+        return f'<ul class="et_pb_tabs_controls">{controls}</ul>{panels}'
+
+    def _wp_json(self, host, path, query):
+        """
+        Answers the WordPress REST API calls the press release scrapers make.
+        """
+        def arg(name, default=None):
+            return query.get(name, [default])[0]
+
+        modified_after = arg("modified_after")
+        if host == "opvp.navajo-nsn.gov" and path == "/wp-json/wp/v2/posts":
+            posts = [
+                {
+                    "id": i,
+                    "link": f"https://opvp.navajo-nsn.gov/release-{i}/",
+                    "date": "2025-01-01T09:00:00",
+                    "modified": f"2025-01-01T{10 + i // 3600 % 14:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                    # The site's clock runs at UTC-7.
+                    "modified_gmt": f"2025-01-01T{17 + i // 3600 % 7:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                    "title": {"rendered": f"Release {i}"},
+                    "content": {"rendered": "".join(f"<p>Paragraph {k} of release {i}.</p>" for k in range(8))},
+                    "_embedded": {
+                        "author": [{"name": OPVP_AUTHOR}],
+                        "wp:term": [[{"taxonomy": "category", "name": OPVP_CATEGORY}], []],
+                    },
+                }
+                for i in range(self.scale)
+            ]
+            # Like WordPress, compare modified_after with the local time, not the GMT one.
+            posts = [post for post in posts if not modified_after or post["modified"] > modified_after]
+            per_page, page = int(arg("per_page", "10")), int(arg("page", "1"))
+            total_pages = max(1, -(-len(posts) // per_page))
+            batch = posts[(page - 1) * per_page:page * per_page]
+            headers = {"X-WP-Total": str(len(posts)), "X-WP-TotalPages": str(total_pages)}
+            return "application/json", json.dumps(batch).encode(), headers
+        if host == "www.navajonationcouncil.org" and path == "/wp-json/wp/v2/pages":
+            pages = []
+            if arg("slug") == "press-releases-archive" and (not modified_after or modified_after < "2025-01-01T00:00:00"):
+                pages.append({"slug": "press-releases-archive", "modified": "2025-01-01T00:00:00",
+                              "modified_gmt": "2025-01-01T07:00:00",
+                              "content": {"rendered": self._press_archive()}})
+            return "application/json", json.dumps(pages).encode()
+        return None
+
+    def _courts(self, path, query):
+        if path == "/supreme-court-opinions":
+            cards = "".join(
+                f'<div class="card"><h5 class="title"><span class="text">Opinions {2000 + i}</span></h5>'
+                f'<div class="card-body">{_pdf_links([f"http://courts.navajo-nsn.gov/wp-content/uploads/opinions/SC-{i}.pdf"])}</div></div>'
+                for i in range(self.scale)
+            )
+            return _page("Supreme Court Opinions", cards)
+        return None
+
+    def _opvp(self, path, query):
+        if path == "/administration":
+            members = "".join(
+                f'<div class="et_pb_team_member"><div class="et_pb_team_member_image"><img src="https://opvp.navajo-nsn.gov/staff/{i}.jpg"></div>'
+                f'<h4 class="et_pb_module_header">Staff Member {i}</h4><p class="et_pb_member_position">Advisor</p>'
+                f'<div class="et_pb_team_member_description"><a href="mailto:staff{i}@opvp.navajo-nsn.gov">staff{i}@opvp.navajo-nsn.gov</a></div></div>'
+                for i in range(self.scale)
+            )
+            return _page("Administration", f'<div class="et_pb_section et_section_regular">'
+                                           f'<h1 class="et_pb_module_heading">Executive Staff</h1>{members}</div>')
+        page_no = 1
+        if path.startswith("/press-room/page/"):
+            page_no = int(path.rsplit("/", 1)[-1])
+            path = "/press-room"
+        if path == "/press-room":
+            first = (page_no - 1) * OPVP_POSTS_PER_PAGE
+            articles = "".join(
+                f'<article class="et_pb_post"><h2 class="entry-title"><a href="https://opvp.navajo-nsn.gov/release-{i}/">Release {i}</a></h2></article>'
+                for i in range(first, min(self.scale, first + OPVP_POSTS_PER_PAGE))
+            )
+            if first + OPVP_POSTS_PER_PAGE < self.scale:
+                articles += f'<a href="/press-room/page/{page_no + 1}/">« Older Entries</a>'
+            return _page("Press Room", articles)
+        if path.startswith("/release-"):
+            number = path.rsplit("-", 1)[-1]
+            paragraphs = "".join(f"<p>Paragraph {k} of release {number}.</p>" for k in range(8))
+            return _page(f"Release {number}", f'<h1 class="entry-title">Release {number}</h1>'
+                                              f'{opvp_post_meta_html()}<div class="entry-content">{paragraphs}</div>')
+        return None
+
+    def _nndoj(self, path, query):
+        if path.startswith("/Directory/") and path.rsplit("/", 1)[-1] in NNDOJ_DEPARTMENTS:
+            rows = "".join(
+                f'<div class="row mt-3"><div class="col-md-4"><img src="/images/staff-{i}.jpg"></div>'
+                f'<div class="col-md-8"><h2>Attorney {i}</h2><h3>Assistant Attorney General</h3><p>Biography {i}.</p></div></div>'
+                for i in range(self.scale)
+            )
+            return _page("Directory", rows)
+        return None
+
+
+class SiteSimulator:
+    """
+    Serves simulated sites on localhost from a background thread.
+
+    Args:
+        scale: Items per generated listing (bills, PDFs, releases...).
+        latency: Seconds added before every response.
+        bandwidth: Bytes per second each response is throttled to, or None.
+        error_rate: Fraction of responses replaced by a 503 or cut short.
+        fixtures_dir: Directory of recorded pages that take precedence.
+        seed: Seed for error injection.
+    """
+    def __init__(self, scale: int = 20, latency: float = 0.0, bandwidth=None, error_rate: float = 0.0,
+                 fixtures_dir: Path = FIXTURES_DIR, seed: int = 0):
+        self.sites = _Sites(scale)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.fixtures_dir = Path(fixtures_dir)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.reset_stats()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"requests": 0, "pages": 0, "downloads": 0, "bytes": 0, "errors": 0, "not_found": 0}
+
+    def start(self) -> str:
+        """
+        Starts serving on a free port and returns the base URL.
+        """
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                simulator._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def _lookup(self, host: str, path: str, query: dict):
+        fixture = self.fixtures_dir / host / path.lstrip("/")
+        if fixture.is_dir():
+            fixture = fixture / "index.html"
+        if fixture.is_file():
+            content_type = "application/pdf" if fixture.suffix == ".pdf" else "text/html; charset=utf-8"
+            return content_type, fixture.read_bytes()
+        return self.sites.render(host, path, query)
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        parts = urlsplit(handler.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        self._count(requests=1)
+        if self.latency:
+            time.sleep(self.latency)
+
+        response = self._lookup(host, "/" + path, parse_qs(parts.query))
+        if response is None:
+            self._count(not_found=1)
+            self._send(handler, 404, "text/plain", b"Not Found")
+            return
+
+        with self._lock:
+            inject = self._random.random() < self.error_rate
+            truncate = inject and self._random.random() < 0.5
+        if inject and not truncate:
+            self._count(errors=1)
+            self._send(handler, 503, "text/plain", b"Service Unavailable")
+            return
+
+        content_type, body, *extra = response
+        status, headers = 200, dict(*extra)
+        if content_type == "application/pdf":
+            # Documents support resumed downloads, validated by their ETag.
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            headers = {"Accept-Ranges": "bytes", "ETag": etag}
+            offset = _range_start(handler.headers.get("Range"))
+            if offset is not None and handler.headers.get("If-Range", etag) == etag and offset < len(body):
+                status = 206
+                headers["Content-Range"] = f"bytes {offset}-{len(body) - 1}/{len(body)}"
+                body = body[offset:]
+        if truncate:
+            self._count(errors=1)
+        elif content_type == "application/pdf":
+            self._count(downloads=1)
+        else:
+            self._count(pages=1)
+        self._send(handler, status, content_type, body, truncate=truncate, headers=headers)
+
+    def _send(self, handler, status, content_type, body, truncate=False, headers=None) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        if truncate:
+            handler.send_header("Connection", "close")
+            handler.close_connection = True
+        handler.end_headers()
+        payload = body[:len(body) // 2] if truncate else body
+        try:
+            for start in range(0, len(payload), CHUNK_SIZE):
+                chunk = payload[start:start + CHUNK_SIZE]
+                handler.wfile.write(chunk)
+                if self.bandwidth:
+                    time.sleep(len(chunk) / self.bandwidth)
+            self._count(bytes=len(payload))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
@@ -0,0 +1,200 @@
+"""
+An indexed SQLite catalog of bills and their documents.
+
+Scrapers write each bill and its documents in a single transaction, and
+tools query by status, sponsor or download state instead of globbing and
+parsing one JSON file per bill.
+"""
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from config import sqlite_journal_mode
+from logger import get_logger
+
+log = get_logger(__name__)
+
+CATALOG_PATH = Path("data/dibb/catalog.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    legislation_number TEXT PRIMARY KEY,
+    url TEXT,
+    title TEXT,
+    description TEXT,
+    sponsor TEXT,
+    co_sponsors TEXT,
+    status TEXT,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS documents (
+    url TEXT NOT NULL,
+    legislation_number TEXT NOT NULL REFERENCES bills (legislation_number) ON DELETE CASCADE,
+    title TEXT,
+    local_path TEXT,
+    download_status TEXT,
+    size INTEGER,
+    sha256 TEXT,
+    PRIMARY KEY (legislation_number, url)
+);
+CREATE INDEX IF NOT EXISTS bills_status ON bills (status);
+CREATE INDEX IF NOT EXISTS bills_sponsor ON bills (sponsor);
+CREATE INDEX IF NOT EXISTS documents_url ON documents (url);
+CREATE INDEX IF NOT EXISTS documents_download_status ON documents (download_status);
+"""
+
+# Catalogs created before documents could belong to several bills keyed
+# them by URL alone; their rows are copied into the current table.
+_MIGRATE_DOCUMENTS = """
+ALTER TABLE documents RENAME TO documents_by_url;
+DROP INDEX IF EXISTS documents_bill;
+DROP INDEX IF EXISTS documents_url;
+DROP INDEX IF EXISTS documents_download_status;
+{schema}
+INSERT INTO documents (url, legislation_number, title, local_path, download_status, size, sha256)
+    SELECT url, legislation_number, title, local_path, download_status, size, sha256 FROM documents_by_url;
+DROP TABLE documents_by_url;
+"""
+
+_BILL_FIELDS = ("legislation_number", "url", "title", "description", "sponsor", "co_sponsors", "status")
+_DOCUMENT_FIELDS = ("url", "legislation_number", "title", "local_path", "download_status", "size", "sha256")
+
+
+class BillCatalog:
+    """
+    A SQLite-backed catalog of bills and documents.
+    """
+    def __init__(self, path: Path = CATALOG_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(f"PRAGMA journal_mode={sqlite_journal_mode()}")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        # Catalogs created before size/hash tracking lack these columns.
+        columns = {row["name"]: row for row in self._db.execute("PRAGMA table_info(documents)")}
+        for column, kind in (("size", "INTEGER"), ("sha256", "TEXT")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE documents ADD COLUMN {column} {kind}")
+        if columns["url"]["pk"] and not columns["legislation_number"]["pk"]:
+            self._db.executescript("BEGIN;" + _MIGRATE_DOCUMENTS.format(schema=_SCHEMA) + "COMMIT;")
+
+    def upsert_bill(self, metadata: Dict[str, Any]) -> None:
+        """
+        Writes a bill and replaces its documents in one transaction.
+
+        Args:
+            metadata: The bill fields plus a `documents` list, in the shape
+                `process_bill_page` produces.
+        """
+        with self._db:
+            self._db.execute(
+                f"INSERT INTO bills ({', '.join(_BILL_FIELDS)}) VALUES ({', '.join('?' * len(_BILL_FIELDS))}) "
+                "ON CONFLICT (legislation_number) DO UPDATE SET "
+                + ", ".join(f"{field} = excluded.{field}" for field in _BILL_FIELDS[1:])
+                + ", updated_at = CURRENT_TIMESTAMP",
+                tuple(metadata.get(field) for field in _BILL_FIELDS),
+            )
+            # Keep the size and hash recorded when a document was first
+            # downloaded unless the new metadata carries fresh values.
+            recorded = {
+                row["url"]: (row["size"], row["sha256"])
+                for row in self._db.execute(
+                    "SELECT url, size, sha256 FROM documents WHERE legislation_number = ?",
+                    (metadata["legislation_number"],),
+                )
+            }
+            self._db.execute("DELETE FROM documents WHERE legislation_number = ?", (metadata["legislation_number"],))
+            rows = []
+            for doc in metadata.get("documents", []):
+                size, sha256 = recorded.get(doc.get("url"), (None, None))
+                rows.append((
+                    doc.get("url"), metadata["legislation_number"], doc.get("title"), doc.get("local_path"),
+                    doc.get("download_status"), doc.get("size", size), doc.get("sha256", sha256),
+                ))
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO documents ({', '.join(_DOCUMENT_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(_DOCUMENT_FIELDS))})",
+                rows,
+            )
+
+    def set_download_status(self, url: str, status: str, size: Optional[int] = None, sha256: Optional[str] = None) -> None:
+        """
+        Records the outcome of a (re-)download, and the file's size and hash when given.
+        """
+        with self._db:
+            self._db.execute(
+                "UPDATE documents SET download_status = ?, size = COALESCE(?, size), sha256 = COALESCE(?, sha256) WHERE url = ?",
+                (status, size, sha256, url),
+            )
+
+    def bill(self, legislation_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a bill with its documents, or None.
+        """
+        row = self._db.execute("SELECT * FROM bills WHERE legislation_number = ?", (legislation_number,)).fetchone()
+        if row is None:
+            return None
+        bill = dict(row)
+        bill["documents"] = self.documents(legislation_number=legislation_number)
+        return bill
+
+    def bills(self, status: Optional[str] = None, sponsor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns bills, optionally filtered by exact status and/or sponsor.
+        """
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if sponsor is not None:
+            clauses.append("sponsor = ?")
+            params.append(sponsor)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return [dict(row) for row in self._db.execute(f"SELECT * FROM bills{where} ORDER BY legislation_number", params)]
+
+    def documents(self, download_status: Optional[str] = None, legislation_number: Optional[str] = None,
+                  exclude_status: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns documents, filtered by download status and/or bill.
+        """
+        clauses, params = [], []
+        if download_status is not None:
+            clauses.append("download_status = ?")
+            params.append(download_status)
+        if legislation_number is not None:
+            clauses.append("legislation_number = ?")
+            params.append(legislation_number)
+        if exclude_status:
+            clauses.append(f"download_status NOT IN ({', '.join('?' * len(exclude_status))})")
+            params.extend(exclude_status)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return [dict(row) for row in self._db.execute(f"SELECT * FROM documents{where} ORDER BY url", params)]
+
+    def is_empty(self) -> bool:
+        return self._db.execute("SELECT 1 FROM bills LIMIT 1").fetchone() is None
+
+    def import_json_files(self, metadata_dir: Path) -> int:
+        """
+        Imports the per-bill JSON files written by earlier scraper versions.
+
+        Returns:
+            The number of bills imported.
+        """
+        count = 0
+        for json_file in sorted(Path(metadata_dir).glob("*.json")):
+            try:
+                with open(json_file, "r") as f:
+                    metadata = json.load(f)
+                if metadata.get("legislation_number"):
+                    self.upsert_bill(metadata)
+                    count += 1
+            except json.JSONDecodeError:
+                log.error(f"Could not decode JSON from {json_file}")
+        log.info(f"Imported {count} bills from {metadata_dir} into the catalog.")
+        return count
+
+    def close(self) -> None:
+        self._db.close()
@@ -1,16 +1,41 @@
 """
 Configuration management.
+
+`config.toml` is read on first use rather than at import time, so commands
+that never consult it do not pay for parsing it.
 """
-import toml
+from functools import lru_cache
 
 def load_config():
     """
     Loads the config.toml file.
     """
+    import toml
     try:
         with open("config.toml", "r") as f:
             return toml.load(f)
     except FileNotFoundError:
         return {}
 
-config = load_config()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_config():
+    """
+    Returns the configuration, loading it on the first call.
+    """
+    return load_config()
+
+def sqlite_journal_mode():
+    """
+    Returns the journal mode for the SQLite files under `data/`.
+
+    WAL relies on shared memory that network filesystems do not provide, so
+    a data directory that `[storage] shared` marks as shared between
+    machines uses the rollback journal instead.
+    """
+    return "DELETE" if get_config().get("storage", {}).get("shared") else "WAL"
+
+def __getattr__(name):
+    # Keeps `from config import config` working while loading lazily.
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,7 @@
 Logging configuration.
 """
 import logging
-from config import config
+from config import get_config
 
 from color_logger import ColorFormatter
 
@@ -10,7 +10,7 @@ def get_logger(name):
     """
     Returns a configured logger.
     """
-    log_level = config.get("logging", {}).get("level", "INFO")
+    log_level = get_config().get("logging", {}).get("level", "INFO")
     
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
@@ -1,94 +1,316 @@
 """
-Main script to run all scrapers.
+The `zhin` command line.
+
+`zhin <command>` runs one scraper group, the Phase 2 pipeline or a search.
+Each command imports the scrapers and processing modules it needs when it
+runs, so short invocations from cron or watch jobs do not load Playwright,
+httpx or PyMuPDF unless they use them. `zhin` with no command runs every
+scraper, and the older `zhin-*` scripts map onto the matching command.
 """
-import asyncio
-from scrapers.nnols_scrapers import scrape_base_code, scrape_amendments
-from scrapers.navajonationcouncil_scrapers import scrape_bills_and_resolutions, scrape_council_member_data
-from scrapers.dibb_scrapers import scrape_legislative_metadata
-from scrapers.courts_scrapers import scrape_supreme_court_opinions
-from scrapers.nnc_press_scrapers import scrape_press_releases
-from scrapers.opvp_scrapers import scrape_opvp_roster, scrape_opvp_press_releases
-from scrapers.nndoj_scrapers import scrape_nndoj_roster
-from processing.pipeline import run_text_extraction_pipeline
-from logger import get_logger
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
 
-log = get_logger(__name__)
+def add_profile_arguments(parser):
+    """
+    Adds the --profile and --trace options shared by every entry point.
+    """
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", action="store_true", help="Time each stage and write a report to data/profiles.")
+    group.add_argument("--profile-cprofile", action="store_true", help="With --profile, also collect cProfile stats per stage.")
+    group.add_argument("--profile-memory", action="store_true", help="With --profile, also record the top allocations per stage.")
+    group.add_argument("--slow-callback-ms", type=float, default=100.0,
+                       help="With --profile, report event-loop callbacks that block for longer than this.")
+    group.add_argument("--trace", type=Path, metavar="FILE",
+                       help="Write per-document trace spans to FILE in Chrome trace-event format (open in Perfetto).")
+    return parser
 
-async def async_main():
+@contextmanager
+def profiled(name, args):
+    """
+    Profiles and/or traces an entry point run, as requested on the command line.
+    """
+    from profiling import profile_run
+    from tracing import trace_run
+    with trace_run(args.trace), profile_run(name, args.profile, cprofile=args.profile_cprofile,
+                                            memory=args.profile_memory,
+                                            slow_callback=args.slow_callback_ms / 1000) as profiler:
+        yield profiler
+
+async def async_main(processes=1):
     """
     Main asynchronous function to run all scrapers.
     """
-    await scrape_base_code()
-    await scrape_amendments()
-    await scrape_bills_and_resolutions()
-    await scrape_council_member_data()
-    await scrape_legislative_metadata()
-    await scrape_supreme_court_opinions()
+    from profiling import stage
+    from scrapers.nnols_scrapers import scrape_base_code, scrape_amendments
+    from scrapers.navajonationcouncil_scrapers import scrape_bills_and_resolutions, scrape_council_member_data
+    from scrapers.dibb_scrapers import scrape_legislative_metadata
+    from scrapers.courts_scrapers import scrape_supreme_court_opinions
+    with stage("scrape.base_code"):
+        await scrape_base_code()
+    with stage("scrape.amendments"):
+        await scrape_amendments()
+    with stage("scrape.bills_and_resolutions"):
+        await scrape_bills_and_resolutions()
+    with stage("scrape.council_members"):
+        await scrape_council_member_data()
+    with stage("scrape.legislative_metadata"):
+        await scrape_legislative_metadata(processes=processes)
+    with stage("scrape.supreme_court_opinions"):
+        await scrape_supreme_court_opinions()
 
-def run_press_scraper():
+def scrape_command(args):
     """
-    Synchronous entry point for the press scraper.
+    Runs every scraper.
     """
-    try:
-        asyncio.run(scrape_press_releases())
-    except KeyboardInterrupt:
-        log.info("Exiting...")
+    from profiling import run_async
+    run_async(async_main(processes=args.processes))
 
-def run_council_scraper():
+def press_command(args):
     """
-    Synchronous entry point for the council scraper.
+    Runs the council press release scraper.
     """
-    try:
-        asyncio.run(scrape_council_member_data())
-    except KeyboardInterrupt:
-        log.info("Exiting...")
+    from profiling import run_async
+    from scrapers.nnc_press_scrapers import scrape_press_releases
+    run_async(scrape_press_releases(use_api=not args.browser, full=args.full))
 
+def council_command(args):
+    """
+    Runs the council member scraper.
+    """
+    from profiling import run_async
+    from scrapers.navajonationcouncil_scrapers import scrape_council_member_data
+    run_async(scrape_council_member_data())
 
-def run_opvp_scraper():
+def opvp_command(args):
     """
-    Synchronous entry point for the OPVP scraper.
+    Runs the OPVP roster and press release scrapers concurrently.
     """
+    import asyncio
+    from profiling import run_async, stage
+    from scrapers.opvp_scrapers import scrape_opvp_roster, scrape_opvp_press_releases
+
+    async def run_roster():
+        with stage("scrape.opvp_roster"):
+            await scrape_opvp_roster()
+
+    async def run_press_releases():
+        with stage("scrape.opvp_press_releases"):
+            await scrape_opvp_press_releases(use_api=not args.browser, full=args.full)
+
     async def opvp_main():
         # Run roster and press release scrapers concurrently
         await asyncio.gather(
-            scrape_opvp_roster(),
-            scrape_opvp_press_releases()
+            run_roster(),
+            run_press_releases()
         )
 
-    try:
-        asyncio.run(opvp_main())
-    except KeyboardInterrupt:
-        log.info("Exiting...")
+    run_async(opvp_main())
 
-def run_phase2_pipeline():
+def dibb_command(args):
     """
-    Synchronous entry point for the Phase 2 processing pipeline.
+    Runs the DiBB bill scraper, or joins a crawl another machine started.
     """
-    try:
-        run_text_extraction_pipeline()
-    except KeyboardInterrupt:
-        log.info("Exiting...")
+    if args.join:
+        from scrapers.dibb_scrapers import run_bill_processes
+        run_bill_processes(args.processes, args.lease_store)
+        return
+    from profiling import run_async
+    from scrapers.dibb_scrapers import scrape_legislative_metadata
+    run_async(scrape_legislative_metadata(processes=args.processes, lease_path=args.lease_store))
 
+def nndoj_command(args):
+    """
+    Runs the NNDOJ roster scraper.
+    """
+    from profiling import run_async
+    from scrapers.nndoj_scrapers import scrape_nndoj_roster
+    run_async(scrape_nndoj_roster(headless=args.headless))
 
-def run_nndoj_scraper():
+def dedupe_command(args):
     """
-    Synchronous entry point for the NNDOJ scraper.
+    Moves existing downloads into the content-addressed blob store.
     """
-    import argparse
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--headless", action="store_true")
-    args = parser.parse_args()
-    try:
-        asyncio.run(scrape_nndoj_roster(headless=args.headless))
-    except KeyboardInterrupt:
-        log.info("Exiting...")
+    from scrapers.blob_store import deduplicate_downloads
+    count, freed = deduplicate_downloads()
+    print(f"Adopted {count} files into the blob store and freed {freed / 1e6:.1f} MB.")
 
+def phase2_command(args):
+    """
+    Runs the Phase 2 processing pipeline once, or continuously with --watch.
+    """
+    from processing.pipeline import run_text_extraction_pipeline, watch_text_extraction_pipeline
+    if args.watch:
+        watch_text_extraction_pipeline(interval=args.interval)
+    else:
+        run_text_extraction_pipeline(full=args.full)
+
+def search_command(args):
+    """
+    Queries the search indexes.
 
-def main():
+    Runs a BM25 keyword search by default, or a semantic search over the
+    vector index with --semantic.
     """
-    Synchronous entry point for the main async function.
+    from profiling import run_async, stage
+    query = " ".join(args.query)
+    if args.semantic:
+        from processing import embeddings
+        from processing.vector_index import VectorIndex
+        backend = embeddings.get_backend(task_type="RETRIEVAL_QUERY")
+        with stage("search.embed_query"):
+            query_vector = run_async(backend.embed([query]))[0]
+        with stage("search.vector_index"):
+            results = VectorIndex().search(query_vector, top_k=args.top_k, source=args.source,
+                                           date_from=args.since, date_to=args.until)
+    else:
+        from processing.search_index import SearchIndex
+        search_index = SearchIndex()
+        try:
+            with stage("search.bm25"):
+                results = search_index.search(query, top_k=args.top_k)
+        finally:
+            search_index.close()
+    if not results:
+        print("No matches found.")
+    for result in results:
+        print(f"{result['score']:7.3f}  {result.get('path', result.get('key'))} (chunk {result['chunk']})  [{result['source']}]")
+
+def diff_command(args):
+    """
+    Prints the section-by-section differences between two versions of a document.
+    """
+    from processing.diffing import DIFF_CACHE_DIR, diff_texts
+    from processing.text_extraction import extract_text
+    granularity = "word" if args.words else "line"
+    result = diff_texts(extract_text(str(args.old)), extract_text(str(args.new)), granularity=granularity,
+                        cache_dir=None if args.no_cache else DIFF_CACHE_DIR)
+    if not result:
+        print("No differences.")
+    for entry in result:
+        print(f"§ {entry['section'] or '(preamble)'}: {entry['status']}")
+        for change in entry["changes"]:
+            for line in change["old"].splitlines() if change["old"] else []:
+                print(f"  - {line}")
+            for line in change["new"].splitlines() if change["new"] else []:
+                print(f"  + {line}")
+
+def build_parser():
+    """
+    Builds the `zhin` argument parser with one subcommand per entry point.
+    """
+    parser = argparse.ArgumentParser(prog="zhin", description="Navajo Nation Governance Tracker.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    def add(name, handler, help):
+        command = commands.add_parser(name, help=help, description=help)
+        command.set_defaults(handler=handler)
+        add_profile_arguments(command)
+        return command
+
+    scrapers = [
+        add("scrape", scrape_command, "Run every scraper (the default)."),
+        add("press", press_command, "Scrape council press releases."),
+        add("council", council_command, "Scrape council member data."),
+        add("opvp", opvp_command, "Scrape the OPVP roster and press releases."),
+        add("nndoj", nndoj_command, "Scrape the NNDOJ staff roster."),
+        add("dibb", dibb_command, "Scrape DiBB bill metadata and documents."),
+    ]
+    scrapers[4].add_argument("--headless", action="store_true")
+    for command in (scrapers[0], scrapers[5]):  # scrape and dibb
+        command.add_argument("--processes", type=int, default=1,
+                             help="Crawl DiBB bill pages in this many worker processes, each with its own browser.")
+    scrapers[5].add_argument("--join", action="store_true",
+                             help="Add worker processes to a crawl started elsewhere on the shared data directory "
+                                  "(set [storage] shared in config.toml on every machine).")
+    scrapers[5].add_argument("--lease-store", type=Path, default=Path("data/dibb/leases.sqlite"),
+                             help="The SQLite file the bill crawl is coordinated through.")
+    for command in (scrapers[1], scrapers[3]):  # press and opvp
+        command.add_argument("--browser", action="store_true",
+                             help="Scrape press releases in the browser instead of through the WordPress REST API.")
+        command.add_argument("--full", action="store_true",
+                             help="Fetch every press release, not just those changed since the last run.")
+    for command in scrapers:
+        command.add_argument("--page-cache", choices=["off", "on", "record", "replay"],
+                             help="Override the [page_cache] mode from config.toml for this run.")
+        command.add_argument("--no-resource-blocking", action="store_true",
+                             help="Let browsers load images, fonts, stylesheets and third-party requests.")
+
+    add("dedupe", dedupe_command, "Move existing downloads into the blob store, linking identical files to one copy.")
+
+    phase2 = add("phase2", phase2_command, "Extract, index and embed downloaded documents.")
+    phase2.add_argument("--full", action="store_true", help="Reprocess every file, not just new and changed ones.")
+    phase2.add_argument("--watch", action="store_true", help="Keep running and process new downloads as they appear.")
+    phase2.add_argument("--interval", type=float, default=5.0, help="Seconds between polls in watch mode.")
+
+    diff = add("diff", diff_command, "Compare two versions of a statute section by section, e.g. base code and an amendment.")
+    diff.add_argument("old", type=Path, help="The earlier version (PDF or Markdown).")
+    diff.add_argument("new", type=Path, help="The later version (PDF or Markdown).")
+    diff.add_argument("--words", action="store_true", help="Diff changed sections word by word instead of line by line.")
+    diff.add_argument("--no-cache", action="store_true", help="Do not read or write the diff cache in data/index/diffs.")
+
+    search = add("search", search_command, "Search the processed corpus.")
+    search.add_argument("query", nargs="+", help='Search terms; wrap phrases in double quotes, e.g. \'"grazing permits"\'.')
+    search.add_argument("--top-k", type=int, default=10)
+    search.add_argument("--semantic", action="store_true", help="Rank by embedding similarity instead of BM25.")
+    search.add_argument("--source", help="Semantic search only: restrict to one source, e.g. 'Navajo Nation Courts'.")
+    search.add_argument("--since", help="Semantic search only: earliest document date (YYYY-MM-DD).")
+    search.add_argument("--until", help="Semantic search only: latest document date (YYYY-MM-DD).")
+    return parser
+
+def main(argv=None):
+    """
+    Synchronous entry point for the `zhin` command.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "scrape")
+    args = build_parser().parse_args(argv)
+    if getattr(args, "page_cache", None):
+        os.environ["ZHIN_PAGE_CACHE"] = args.page_cache
+    if getattr(args, "no_resource_blocking", False):
+        os.environ["ZHIN_RESOURCE_BLOCKING"] = "off"
+    with profiled(f"zhin-{args.command}", args):
+        try:
+            args.handler(args)
+        except KeyboardInterrupt:
+            from logger import get_logger
+            get_logger(__name__).info("Exiting...")
+
+def run_press_scraper():
+    """
+    Synchronous entry point for the press scraper.
+    """
+    main(["press", *sys.argv[1:]])
+
+def run_council_scraper():
+    """
+    Synchronous entry point for the council scraper.
+    """
+    main(["council", *sys.argv[1:]])
+
+def run_opvp_scraper():
+    """
+    Synchronous entry point for the OPVP scraper.
+    """
+    main(["opvp", *sys.argv[1:]])
+
+def run_phase2_pipeline():
+    """
+    Synchronous entry point for the Phase 2 processing pipeline.
+    """
+    main(["phase2", *sys.argv[1:]])
+
+def run_search():
+    """
+    Synchronous entry point for querying the search indexes.
+    """
+    main(["search", *sys.argv[1:]])
+
+def run_nndoj_scraper():
+    """
+    Synchronous entry point for the NNDOJ scraper.
     """
-    try:
-        asyncio.run(async_main())
-    except KeyboardInterrupt:
-        log.info("Exiting...")
\ No newline at end of file
+    main(["nndoj", *sys.argv[1:]])
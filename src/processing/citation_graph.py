@@ -0,0 +1,242 @@
+"""
+A citation graph linking documents to the Navajo Nation Code sections they cite.
+
+Edges are stored in compressed sparse row (CSR) form: for each node, an
+`indptr` array gives the slice of a flat `indices` array holding its
+neighbours. Both directions are kept, so "what does this opinion cite" and
+"what cites 7 N.N.C. § 204" are each a single array slice.
+
+New or re-processed documents go into an in-memory delta that queries
+consult alongside the CSR arrays. The delta is folded into the arrays in one
+linear pass once it grows large or when the graph is saved, so new opinions
+never require re-extracting citations from the rest of the corpus.
+
+Each save writes the arrays under a new generation number, then switches
+graph.json to it, so a crash mid-save leaves the previous graph intact.
+"""
+from array import array
+from collections import Counter
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from logger import get_logger
+
+log = get_logger(__name__)
+
+GRAPH_DIR = Path("data/index/citations")
+
+# Number of updated documents held in the delta before it is compacted.
+COMPACT_THRESHOLD = 1000
+
+_CITATION_RE = re.compile(r"(\d{1,2}[A-Z]?)\s+N\.\s?N\.\s?C\.\s*§§?\s*(\d+(?:\.\d+)?)")
+_ARRAY_FILES = ("fwd_indptr", "fwd_indices", "rev_indptr", "rev_indices")
+
+
+def normalize_citation(citation: str) -> Optional[str]:
+    """
+    Normalizes an N.N.C. citation to the form "7 N.N.C. § 204".
+
+    Subsection markers are dropped so that citations to any part of a section
+    link to the same node. Returns None if the text is not a citation.
+    """
+    match = _CITATION_RE.search(citation)
+    if not match:
+        return None
+    return f"{match.group(1)} N.N.C. § {match.group(2)}"
+
+
+def _build_csr(num_nodes: int, adjacency: Iterable[Tuple[int, List[int]]]) -> Tuple[array, array, array, array]:
+    """
+    Builds forward and reverse CSR arrays from (source, targets) pairs.
+    """
+    targets_by_source = [[] for _ in range(num_nodes)]
+    for source, targets in adjacency:
+        targets_by_source[source] = sorted(set(targets))
+
+    fwd_indptr = array("i", [0])
+    fwd_indices = array("i")
+    in_degree = [0] * num_nodes
+    for targets in targets_by_source:
+        fwd_indices.extend(targets)
+        fwd_indptr.append(len(fwd_indices))
+        for target in targets:
+            in_degree[target] += 1
+
+    rev_indptr = array("i", [0])
+    for degree in in_degree:
+        rev_indptr.append(rev_indptr[-1] + degree)
+    rev_indices = array("i", bytes(4 * len(fwd_indices)))
+    cursor = list(rev_indptr[:-1])
+    for source, targets in enumerate(targets_by_source):
+        for target in targets:
+            rev_indices[cursor[target]] = source
+            cursor[target] += 1
+    return fwd_indptr, fwd_indices, rev_indptr, rev_indices
+
+
+class CitationGraph:
+    """
+    An incrementally updatable document -> statute citation graph.
+    """
+    def __init__(self, graph_dir: Path = GRAPH_DIR):
+        """
+        Loads the graph stored in `graph_dir`, or starts an empty one.
+        """
+        self.graph_dir = Path(graph_dir)
+        self.nodes: List[str] = []
+        self.node_ids: Dict[str, int] = {}
+        self._fwd_indptr = array("i", [0])
+        self._fwd_indices = array("i")
+        self._rev_indptr = array("i", [0])
+        self._rev_indices = array("i")
+        # Documents whose edges were replaced since the last compaction.
+        self._delta_fwd: Dict[int, List[int]] = {}
+        self._delta_rev: Dict[int, set] = {}
+        self._generation: Optional[int] = None
+
+        meta_path = self.graph_dir / "graph.json"
+        if meta_path.exists():
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            self.nodes = meta["nodes"]
+            self._generation = meta.get("generation")
+            self.node_ids = {node: i for i, node in enumerate(self.nodes)}
+            for name in _ARRAY_FILES:
+                path = self._array_path(name, self._generation)
+                values = array("i")
+                with open(path, "rb") as f:
+                    values.frombytes(f.read())
+                setattr(self, f"_{name}", values)
+
+    def _array_path(self, name: str, generation: Optional[int]) -> Path:
+        # Graphs saved before generations were introduced have unnumbered arrays.
+        if generation is None:
+            return self.graph_dir / f"{name}.bin"
+        return self.graph_dir / f"{name}.{generation}.bin"
+
+    def _node_id(self, node: str) -> int:
+        node_id = self.node_ids.get(node)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.nodes.append(node)
+            self.node_ids[node] = node_id
+        return node_id
+
+    def _base_neighbors(self, indptr: array, indices: array, node_id: int) -> array:
+        if node_id + 1 >= len(indptr):
+            return array("i")
+        return indices[indptr[node_id]:indptr[node_id + 1]]
+
+    def update_document(self, document: str, citations: Iterable[str]) -> None:
+        """
+        Replaces the set of statutes cited by a document.
+
+        Args:
+            document: The document key, usually its file path.
+            citations: Raw citation strings; they are normalized here.
+        """
+        statutes = {normalize_citation(c) for c in citations}
+        statutes.discard(None)
+        doc_id = self._node_id(document)
+        for old in self._outgoing(doc_id):
+            self._delta_rev.get(old, set()).discard(doc_id)
+        targets = sorted(self._node_id(statute) for statute in statutes)
+        self._delta_fwd[doc_id] = targets
+        for target in targets:
+            self._delta_rev.setdefault(target, set()).add(doc_id)
+        if len(self._delta_fwd) >= COMPACT_THRESHOLD:
+            self.compact()
+
+    def _outgoing(self, node_id: int) -> List[int]:
+        if node_id in self._delta_fwd:
+            return self._delta_fwd[node_id]
+        return list(self._base_neighbors(self._fwd_indptr, self._fwd_indices, node_id))
+
+    def _incoming(self, node_id: int) -> List[int]:
+        incoming = [
+            source for source in self._base_neighbors(self._rev_indptr, self._rev_indices, node_id)
+            if source not in self._delta_fwd
+        ]
+        incoming.extend(self._delta_rev.get(node_id, ()))
+        return incoming
+
+    def cited_by(self, document: str) -> List[str]:
+        """
+        Returns the statutes cited by a document.
+        """
+        node_id = self.node_ids.get(document)
+        if node_id is None:
+            return []
+        return sorted(self.nodes[target] for target in self._outgoing(node_id))
+
+    def citing(self, citation: str) -> List[str]:
+        """
+        Returns the documents citing a statute, e.g. "7 N.N.C. § 204".
+        """
+        node_id = self.node_ids.get(normalize_citation(citation) or citation)
+        if node_id is None:
+            return []
+        return sorted(self.nodes[source] for source in self._incoming(node_id))
+
+    def co_cited(self, citation: str, top_k: int = 10) -> List[Tuple[str, int]]:
+        """
+        Two-hop query: the statutes most often cited alongside a given statute.
+
+        Returns (statute, number of shared citing documents) pairs.
+        """
+        node_id = self.node_ids.get(normalize_citation(citation) or citation)
+        if node_id is None:
+            return []
+        counts = Counter()
+        for source in self._incoming(node_id):
+            counts.update(target for target in self._outgoing(source) if target != node_id)
+        return [(self.nodes[target], count) for target, count in counts.most_common(top_k)]
+
+    def compact(self) -> None:
+        """
+        Folds the delta into the CSR arrays in a single linear pass.
+        """
+        if not self._delta_fwd:
+            return
+        num_nodes = len(self.nodes)
+        base_sources = len(self._fwd_indptr) - 1
+        adjacency = [
+            (source, list(self._base_neighbors(self._fwd_indptr, self._fwd_indices, source)))
+            for source in range(base_sources)
+            if source not in self._delta_fwd
+        ]
+        adjacency.extend(self._delta_fwd.items())
+        (self._fwd_indptr, self._fwd_indices,
+         self._rev_indptr, self._rev_indices) = _build_csr(num_nodes, adjacency)
+        log.debug(f"Compacted citation graph with {len(self._delta_fwd)} updated documents.")
+        self._delta_fwd = {}
+        self._delta_rev = {}
+
+    def save(self) -> None:
+        """
+        Compacts the graph and writes it to disk.
+
+        The arrays go to files of a new generation and graph.json is replaced
+        last, so readers and crashes only ever see a complete graph. The
+        previous generation's arrays are removed afterwards.
+        """
+        self.compact()
+        self.graph_dir.mkdir(parents=True, exist_ok=True)
+        previous = self._generation
+        generation = (previous or 0) + 1
+        for name in _ARRAY_FILES:
+            path = self._array_path(name, generation)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                getattr(self, f"_{name}").tofile(f)
+            os.replace(tmp_path, path)
+        tmp_path = self.graph_dir / "graph.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"nodes": self.nodes, "generation": generation}, f)
+        os.replace(tmp_path, self.graph_dir / "graph.json")
+        self._generation = generation
+        for name in _ARRAY_FILES:
+            self._array_path(name, previous).unlink(missing_ok=True)
+        log.info(f"Saved citation graph with {len(self.nodes)} nodes and {len(self._fwd_indices)} edges.")
@@ -0,0 +1,163 @@
+"""
+Near-duplicate detection for ingested documents.
+
+Each document is reduced to a MinHash signature over word 5-gram shingles,
+so that the fraction of equal signature values estimates the Jaccard
+similarity of two documents. Signatures are split into LSH bands stored in
+SQLite; documents sharing any band are candidates, and candidates whose
+estimated similarity passes the threshold are linked to the first copy seen,
+the canonical one. Later stages can then skip the duplicate entirely.
+
+Texts shorter than MIN_WORDS words (empty scans, page headers) are not
+fingerprinted: their few shingles would make unrelated boilerplate look
+identical, so they are never linked and are indexed as usual.
+"""
+import sqlite3
+import re
+import zlib
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from logger import get_logger
+
+log = get_logger(__name__)
+
+DEDUP_DB = Path("data/index/dedup.sqlite")
+
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a band.
+BANDS = 16
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+# Texts with fewer words are too short to fingerprint reliably.
+MIN_WORDS = SHINGLE_SIZE * 4
+
+_WORD_RE = re.compile(r"\w+")
+_rng = np.random.default_rng(0x5A1)
+_MULTIPLIERS = _rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_ADDENDS = _rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    Computes the MinHash signature of a text's word shingles.
+
+    Shingles are hashed with CRC-32 and permuted with multiply-shift hashing,
+    all permutations at once.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in set(shingles)), dtype=np.uint64)
+    signature = np.full(NUM_PERMUTATIONS, np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, len(hashes), 4096):
+        block = hashes[start:start + 4096, None]
+        permuted = ((block * _MULTIPLIERS + _ADDENDS) >> np.uint64(32)).astype(np.uint32)
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Estimates the Jaccard similarity of two documents from their signatures.
+    """
+    return float(np.mean(a == b))
+
+
+class DuplicateIndex:
+    """
+    A persistent MinHash LSH index that links near-duplicates to a canonical copy.
+    """
+    def __init__(self, path: Path = DEDUP_DB, threshold: float = SIMILARITY_THRESHOLD):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, canonical TEXT, signature BLOB NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket BLOB, key TEXT)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (key)")
+
+    def check(self, key: str, text: str) -> Optional[str]:
+        """
+        Registers a document and returns the canonical key it duplicates, if any.
+
+        Documents that are not near-duplicates of anything become canonical
+        themselves and are added to the LSH bands; duplicates are only linked.
+        Texts under MIN_WORDS words are not registered. Re-checking a key
+        replaces its earlier registration; callers that need the documents
+        this unlinks should call `remove` first.
+        """
+        self.remove(key)
+        if len(_WORD_RE.findall(text)) < MIN_WORDS:
+            return None
+        signature = minhash_signature(text)
+        rows = NUM_PERMUTATIONS // BANDS
+        buckets = [signature[b * rows:(b + 1) * rows].tobytes() for b in range(BANDS)]
+
+        candidates = set()
+        for band, bucket in enumerate(buckets):
+            for (candidate,) in self._db.execute("SELECT key FROM bands WHERE band = ? AND bucket = ?", (band, bucket)):
+                candidates.add(candidate)
+
+        best_key, best_similarity = None, 0.0
+        for candidate in sorted(candidates):
+            row = self._db.execute("SELECT signature FROM documents WHERE key = ?", (candidate,)).fetchone()
+            similarity = estimate_similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+            if similarity > best_similarity:
+                best_key, best_similarity = candidate, similarity
+
+        with self._db:
+            if best_key is not None and best_similarity >= self.threshold:
+                self._db.execute(
+                    "INSERT INTO documents (key, canonical, signature) VALUES (?, ?, ?)",
+                    (key, best_key, signature.tobytes()),
+                )
+                log.info(f"{key} is a near-duplicate of {best_key} (similarity {best_similarity:.2f}).")
+                return best_key
+            self._db.execute(
+                "INSERT INTO documents (key, canonical, signature) VALUES (?, NULL, ?)",
+                (key, signature.tobytes()),
+            )
+            self._db.executemany(
+                "INSERT INTO bands (band, bucket, key) VALUES (?, ?, ?)",
+                ((band, bucket, key) for band, bucket in enumerate(buckets)),
+            )
+        return None
+
+    def canonical_of(self, key: str) -> Optional[str]:
+        """
+        Returns the canonical key a document was linked to, or None.
+        """
+        row = self._db.execute("SELECT canonical FROM documents WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def duplicates_of(self, key: str) -> List[str]:
+        """
+        Returns the documents linked to a canonical document.
+        """
+        return [row[0] for row in self._db.execute(
+            "SELECT key FROM documents WHERE canonical = ? ORDER BY key", (key,)
+        )]
+
+    def remove(self, key: str) -> List[str]:
+        """
+        Forgets a document and unlinks the duplicates of it.
+
+        Returns:
+            The unlinked duplicates, which are no longer indexed anywhere and
+            need to be checked again.
+        """
+        duplicates = self.duplicates_of(key)
+        with self._db:
+            self._db.execute("DELETE FROM documents WHERE key = ? OR canonical = ?", (key, key))
+            self._db.execute("DELETE FROM bands WHERE key = ?", (key,))
+        return duplicates
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,307 @@
+"""
+Section-aligned diffing of statute versions for the "living code".
+
+Texts are first split on section anchors ("§ 204.") and aligned by section
+number, so unchanged sections are skipped after a plain comparison. Only the
+sections that differ are diffed, using the linear-space variant of Myers'
+O((N+M)D) algorithm over lines or words. Like git's xdiff, the search gives
+up on a range once its edit cost passes a cap and anchors it on the lines
+that occur once on both sides instead (as patience diff does), or reports
+it as one replacement, so a rewritten text without section anchors cannot
+make it quadratic. Results are cached on disk keyed
+by the hashes of both versions, so re-running a batch of amendments only
+diffs what is new. `zhin diff` runs it on two documents.
+"""
+import bisect
+import hashlib
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from logger import get_logger
+
+log = get_logger(__name__)
+
+DIFF_CACHE_DIR = Path("data/index/diffs")
+
+_SECTION_RE = re.compile(r"^[ \t]*§+[ \t]*(\d+(?:\.\d+)?)", re.MULTILINE)
+
+Opcode = Tuple[str, int, int, int, int]
+
+# The least edit cost searched before giving up on a range, as in xdiff.
+MIN_MAX_COST = 256
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """
+    Splits a statute into sections keyed by section number.
+
+    Text before the first anchor is keyed by "". A section number that occurs
+    more than once (e.g. in different chapters) gets a "#2", "#3"... suffix.
+    """
+    sections = {}
+    starts = [(m.start(), m.group(1)) for m in _SECTION_RE.finditer(text)]
+    if not starts or starts[0][0] > 0:
+        preamble_end = starts[0][0] if starts else len(text)
+        if text[:preamble_end].strip():
+            sections[""] = text[:preamble_end]
+    for i, (start, number) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        key = number
+        occurrence = 1
+        while key in sections:
+            occurrence += 1
+            key = f"{number}#{occurrence}"
+        sections[key] = text[start:end]
+    return sections
+
+
+def _tokens(text: str, granularity: str) -> List[str]:
+    if granularity == "word":
+        return text.split()
+    return text.splitlines()
+
+
+def _middle_snake(a: Sequence[int], a_lo: int, a_hi: int,
+                  b: Sequence[int], b_lo: int, b_hi: int,
+                  max_cost: int) -> Optional[Tuple[int, int, int, int, int]]:
+    """
+    Finds the middle snake of a shortest edit script between two ranges.
+
+    Searches forwards from the start and backwards from the end at once
+    until the paths overlap, keeping only the current frontier of each.
+
+    Returns:
+        The edit distance D and the snake's start and end points (x, y, u, v),
+        relative to the range starts, or None if each search passed
+        `max_cost` edits first.
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    delta = n - m
+    odd = delta % 2 != 0
+    forward = {1: 0}
+    backward = {1: 0}
+    for d in range(min((n + m + 1) // 2, max_cost) + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[k - 1] < forward[k + 1]):
+                x = forward[k + 1]
+            else:
+                x = forward[k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[k] = x
+            # Backward diagonal c is forward diagonal delta - c.
+            c = delta - k
+            if odd and -(d - 1) <= c <= d - 1 and x + backward[c] >= n:
+                return 2 * d - 1, start_x, start_y, x, y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[k - 1] < backward[k + 1]):
+                x = backward[k + 1]
+            else:
+                x = backward[k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[k] = x
+            c = delta - k
+            if not odd and -d <= c <= d and x + forward[c] >= n:
+                return 2 * d, n - x, m - y, n - start_x, m - start_y
+    return None
+
+
+def _unique_anchors(a: Sequence[int], a_lo: int, a_hi: int,
+                    b: Sequence[int], b_lo: int, b_hi: int) -> List[Tuple[int, int]]:
+    """
+    Matches the elements that occur exactly once in each range.
+
+    Of those pairs, keeps the longest run that is in order on both sides,
+    as patience diff does.
+    """
+    counts: Dict[int, List[int]] = {}
+    for i in range(a_lo, a_hi):
+        entry = counts.setdefault(a[i], [0, 0, i, -1])
+        entry[0] += 1
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = j
+    pairs = sorted((i, j) for count_a, count_b, i, j in counts.values() if count_a == 1 and count_b == 1)
+
+    # Longest increasing subsequence of the b positions.
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[k] = j
+            tail_index[k] = index
+        previous[index] = tail_index[k - 1] if k else -1
+    anchors = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _myers_matches(a: Sequence[int], b: Sequence[int]) -> List[Tuple[int, int]]:
+    """
+    Returns the index pairs of a shortest edit script's matching elements.
+
+    Uses the linear-space variant: each range is split at its middle snake
+    and the halves are solved independently, so memory stays O(N + M)
+    rather than keeping a frontier per edit step. A range whose edit cost
+    passes the cap is split at its unique common elements instead, and
+    left unmatched if it has none, so the script may not be minimal there.
+    """
+    max_cost = max(MIN_MAX_COST, math.isqrt(len(a) + len(b)))
+    matches = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        a_lo, a_hi, b_lo, b_hi = ranges.pop()
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        snake = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_cost)
+        if snake is None:
+            i, j = a_lo, b_lo
+            for anchor_i, anchor_j in _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi):
+                ranges.append((i, anchor_i, j, anchor_j))
+                matches.append((anchor_i, anchor_j))
+                i, j = anchor_i + 1, anchor_j + 1
+            if i > a_lo:
+                ranges.append((i, a_hi, j, b_hi))
+            continue
+        d, x, y, u, v = snake
+        if d > 1:
+            ranges.append((a_lo, a_lo + x, b_lo, b_lo + y))
+            matches.extend((a_lo + i, b_lo + y + i - x) for i in range(x, u))
+            ranges.append((a_lo + u, a_hi, b_lo + v, b_hi))
+        else:
+            # At most one insertion or deletion: match greedily, skipping
+            # the extra element in the longer range.
+            i, j = a_lo, b_lo
+            while i < a_hi and j < b_hi:
+                if a[i] == b[j]:
+                    matches.append((i, j))
+                    i += 1
+                    j += 1
+                elif a_hi - a_lo > b_hi - b_lo:
+                    i += 1
+                else:
+                    j += 1
+    matches.sort()
+    return matches
+
+
+def myers_diff(a: Sequence[str], b: Sequence[str]) -> List[Opcode]:
+    """
+    Diffs two token sequences with Myers' algorithm.
+
+    Returns `difflib`-style opcodes: (tag, i1, i2, j1, j2) with tags "equal",
+    "replace", "delete" and "insert".
+    """
+    # Intern tokens as ints so comparisons in the inner loop are cheap.
+    ids = {}
+    a_ids = [ids.setdefault(token, len(ids)) for token in a]
+    b_ids = [ids.setdefault(token, len(ids)) for token in b]
+
+    prefix = 0
+    while prefix < len(a_ids) and prefix < len(b_ids) and a_ids[prefix] == b_ids[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < len(a_ids) - prefix and suffix < len(b_ids) - prefix
+           and a_ids[-1 - suffix] == b_ids[-1 - suffix]):
+        suffix += 1
+
+    core = _myers_matches(a_ids[prefix:len(a_ids) - suffix], b_ids[prefix:len(b_ids) - suffix])
+    matches = [(i, i) for i in range(prefix)]
+    matches += [(i + prefix, j + prefix) for i, j in core]
+    matches += [(len(a_ids) - suffix + i, len(b_ids) - suffix + i) for i in range(suffix)]
+
+    opcodes = []
+    i = j = 0
+    for mi, mj in matches + [(len(a_ids), len(b_ids))]:
+        if mi > i and mj > j:
+            opcodes.append(("replace", i, mi, j, mj))
+        elif mi > i:
+            opcodes.append(("delete", i, mi, j, j))
+        elif mj > j:
+            opcodes.append(("insert", i, i, j, mj))
+        if mi < len(a_ids):
+            if opcodes and opcodes[-1][0] == "equal":
+                tag, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = (tag, i1, mi + 1, j1, mj + 1)
+            else:
+                opcodes.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _diff_section(old: str, new: str, granularity: str) -> List[Dict[str, Any]]:
+    joiner = " " if granularity == "word" else "\n"
+    a, b = _tokens(old, granularity), _tokens(new, granularity)
+    return [
+        {"tag": tag, "old": joiner.join(a[i1:i2]), "new": joiner.join(b[j1:j2])}
+        for tag, i1, i2, j1, j2 in myers_diff(a, b)
+        if tag != "equal"
+    ]
+
+
+def diff_texts(old_text: str, new_text: str, granularity: str = "line", cache_dir: Optional[Path] = DIFF_CACHE_DIR) -> List[Dict[str, Any]]:
+    """
+    Diffs two versions of a statute section by section.
+
+    Args:
+        old_text: The base version.
+        new_text: The amended version.
+        granularity: "line" or "word".
+        cache_dir: Where to cache results, or None to disable caching.
+
+    Returns:
+        One entry per section that was added, removed or changed, with its
+        `section` number, `status` and the non-equal `changes` between the
+        two versions.
+    """
+    cache_path = None
+    if cache_dir is not None:
+        key = _hash(f"{_hash(old_text)}:{_hash(new_text)}:{granularity}")
+        cache_path = Path(cache_dir) / key[:2] / f"{key}.json"
+        if cache_path.exists():
+            with open(cache_path, "r") as f:
+                return json.load(f)
+
+    old_sections = split_sections(old_text)
+    new_sections = split_sections(new_text)
+    result = []
+    for section, old in old_sections.items():
+        new = new_sections.get(section)
+        if new is None:
+            result.append({"section": section, "status": "removed", "changes": [{"tag": "delete", "old": old, "new": ""}]})
+        elif new != old:
+            result.append({"section": section, "status": "changed", "changes": _diff_section(old, new, granularity)})
+    for section in new_sections:
+        if section not in old_sections:
+            result.append({"section": section, "status": "added", "changes": [{"tag": "insert", "old": "", "new": new_sections[section]}]})
+    log.debug(f"Diffed {len(old_sections)} -> {len(new_sections)} sections; {len(result)} differ.")
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(result, f)
+    return result
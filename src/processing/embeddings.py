@@ -0,0 +1,214 @@
+"""
+Generates vector embeddings for text chunks.
+
+Chunks are embedded in batches through a pluggable backend, with a bounded
+number of batches in flight and retries on failure. Every vector is cached
+in SQLite under a hash of the backend name and chunk text, so chunks that
+have not changed are never sent to the backend again.
+"""
+import asyncio
+import hashlib
+import math
+import re
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from config import get_config
+from logger import get_logger
+from queue_system import QueueManager
+
+log = get_logger(__name__)
+
+EMBEDDINGS_DIR = Path("data/index/embeddings")
+
+_settings = get_config().get("embeddings", {})
+ENABLED = _settings.get("enabled", False)
+BACKEND = _settings.get("backend", "genai")
+MODEL = _settings.get("model", "gemini-embedding-001")
+DIMENSIONS = _settings.get("dimensions", 768)
+# The Gemini API accepts at most 100 texts per embedding request.
+BATCH_SIZE = _settings.get("batch_size", 100)
+CONCURRENCY = _settings.get("concurrency", 4)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class EmbeddingBackend:
+    """
+    Base class for embedding backends.
+    """
+    name = "base"
+    dimensions = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Returns one vector per input text.
+        """
+        raise NotImplementedError
+
+
+class GenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    Embeds text with the Gemini API via google-genai.
+
+    The API key is read from the GEMINI_API_KEY or GOOGLE_API_KEY environment
+    variable by the client.
+    """
+    def __init__(self, model: str = MODEL, dimensions: int = DIMENSIONS, task_type: str = "RETRIEVAL_DOCUMENT"):
+        from google import genai
+        from google.genai import types
+
+        self.name = f"genai:{model}:{dimensions}"
+        self.dimensions = dimensions
+        self._model = model
+        self._client = genai.Client()
+        self._config = types.EmbedContentConfig(
+            task_type=task_type,
+            output_dimensionality=dimensions,
+        )
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self._client.aio.models.embed_content(
+            model=self._model,
+            contents=texts,
+            config=self._config,
+        )
+        return [embedding.values for embedding in response.embeddings]
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    A deterministic, offline stand-in that hashes tokens into a vector.
+
+    Texts that share words get similar vectors, which is enough for tests and
+    for exercising the pipeline without network access.
+    """
+    def __init__(self, dimensions: int = DIMENSIONS):
+        self.name = f"local:{dimensions}"
+        self.dimensions = dimensions
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+def get_backend(name: str = BACKEND, task_type: str = "RETRIEVAL_DOCUMENT") -> EmbeddingBackend:
+    """
+    Returns the embedding backend configured under `[embeddings]`.
+
+    `task_type` lets the Gemini backend embed search queries
+    ("RETRIEVAL_QUERY") differently from documents; the local backend ignores it.
+    """
+    if name == "local":
+        return LocalEmbeddingBackend()
+    if name == "genai":
+        return GenAIEmbeddingBackend(task_type=task_type)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+class EmbeddingCache:
+    """
+    A SQLite cache of embeddings keyed by content hash.
+    """
+    def __init__(self, path: Path = EMBEDDINGS_DIR / "cache.sqlite"):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    @staticmethod
+    def key(backend: EmbeddingBackend, text: str) -> str:
+        return hashlib.sha256(f"{backend.name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        for i in range(0, len(keys), 500):
+            batch = list(keys[i:i + 500])
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ):
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, array("f", vector).tobytes()) for key, vector in items.items()),
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+async def embed_chunks(chunks: List[str], backend: Optional[EmbeddingBackend] = None,
+                       cache: Optional[EmbeddingCache] = None, batch_size: int = BATCH_SIZE,
+                       concurrency: int = CONCURRENCY, retries: int = 3, delay: float = 5) -> List[Optional[List[float]]]:
+    """
+    Embeds chunks, consulting the cache first and batching the rest.
+
+    Args:
+        chunks: The chunk texts to embed.
+        backend: The embedding backend; defaults to the configured one.
+        cache: The embedding cache; defaults to the one in EMBEDDINGS_DIR.
+        batch_size: Maximum texts per backend request.
+        concurrency: Maximum backend requests in flight.
+        retries: Attempts per batch before giving up on it.
+        delay: Base delay in seconds between attempts, doubled each retry.
+
+    Returns:
+        One vector per chunk, or None for chunks whose batch failed.
+    """
+    backend = backend or get_backend()
+    own_cache = cache is None
+    cache = cache or EmbeddingCache()
+    try:
+        keys = [EmbeddingCache.key(backend, chunk) for chunk in chunks]
+        vectors = cache.get_many(keys)
+
+        missing = {}
+        for key, chunk in zip(keys, chunks):
+            if key not in vectors:
+                missing.setdefault(key, chunk)
+        log.info(f"Embedding {len(missing)} of {len(chunks)} chunks ({len(chunks) - len(missing)} cached).")
+
+        items = list(missing.items())
+
+        async def embed_batch(start):
+            batch = items[start:start + batch_size]
+            for attempt in range(retries):
+                try:
+                    embedded = await backend.embed([text for _, text in batch])
+                    # Round to float32 so fresh and cached vectors are identical.
+                    results = {key: array("f", vector).tolist() for (key, _), vector in zip(batch, embedded)}
+                    cache.put_many(results)
+                    vectors.update(results)
+                    return
+                except Exception as e:
+                    log.error(f"Failed to embed batch of {len(batch)} chunks on attempt {attempt+1}: {e}")
+                    if attempt < retries - 1:
+                        await asyncio.sleep(delay * 2 ** attempt)
+            log.error(f"Giving up on batch of {len(batch)} chunks after {retries} attempts.")
+
+        if missing:
+            embed_queue = QueueManager(worker_coro=embed_batch, num_workers=concurrency, name="Embedder")
+            await embed_queue.start()
+            for start in range(0, len(items), batch_size):
+                await embed_queue.add_task(start)
+            await embed_queue.join()
+            await embed_queue.stop()
+
+        return [vectors.get(key) for key in keys]
+    finally:
+        if own_cache:
+            cache.close()
@@ -0,0 +1,142 @@
+"""
+Tracks which files Phase 2 has already processed.
+
+Each processed file is recorded with its size, modification time and
+SHA-256. A file whose size and mtime are unchanged is skipped without being
+read; one whose stat changed is hashed, and only reprocessed if its content
+actually differs. A file is recorded with the stat and digest taken before it
+was processed, so one rewritten during processing is seen as changed next run.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from logger import get_logger
+
+log = get_logger(__name__)
+
+MANIFEST_PATH = Path("data/index/phase2_manifest.json")
+
+
+def file_digest(path: Path) -> str:
+    """
+    Returns the SHA-256 of a file, read in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProcessedManifest:
+    """
+    A JSON manifest of processed files keyed by path.
+    """
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, object]] = {}
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        self._snapshots: Dict[str, Dict[str, object]] = {}
+
+    def plan(self, files: Iterable[Path], settle: float = 0.0) -> Tuple[List[Path], List[str]]:
+        """
+        Compares the current files against the manifest.
+
+        Args:
+            files: The files currently in the data directory.
+            settle: Defer files modified less than this many seconds ago,
+                without reading them, as they may still be downloading.
+
+        Returns:
+            The files that are new or whose content changed, and the keys of
+            recorded files that no longer exist.
+        """
+        to_process = []
+        seen = set()
+        cutoff = time.time() - settle
+        for file_path in files:
+            key = str(file_path)
+            seen.add(key)
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            entry = self.entries.get(key)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            if settle and stat.st_mtime >= cutoff:
+                continue
+            try:
+                snapshot = self.snapshot(file_path, stat)
+            except FileNotFoundError:
+                continue
+            if entry and entry["sha256"] == snapshot["sha256"]:
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+                self._snapshots.pop(key)
+                continue
+            to_process.append(file_path)
+        removed = [key for key in self.entries if key not in seen]
+        return to_process, removed
+
+    def snapshot(self, file_path: Path, stat=None) -> Dict[str, object]:
+        """
+        Takes the stat and digest a file will be recorded with once processed.
+
+        The stat is taken before hashing, so a write that lands while the file
+        is being read leaves a stat that no longer matches the file. Without a
+        stat, a snapshot already taken this run is reused.
+        """
+        if stat is None and str(file_path) in self._snapshots:
+            return self._snapshots[str(file_path)]
+        stat = stat or file_path.stat()
+        snapshot = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(file_path)}
+        self._snapshots[str(file_path)] = snapshot
+        return snapshot
+
+    def record(self, file_path: Path) -> None:
+        """
+        Marks a file as processed in the state it had before processing.
+
+        A file that disappeared while it was processed is not recorded, so
+        the next run sees it as removed.
+        """
+        key = str(file_path)
+        snapshot = self._snapshots.pop(key, None)
+        if not file_path.exists():
+            log.warning(f"{file_path} disappeared while it was being processed; not recording it.")
+            return
+        if snapshot is None:
+            try:
+                snapshot = self.snapshot(file_path)
+            except FileNotFoundError:
+                log.warning(f"{file_path} disappeared while it was being processed; not recording it.")
+                return
+            self._snapshots.pop(key)
+        self.entries[key] = snapshot
+
+    def discard_snapshots(self) -> None:
+        """
+        Drops the snapshots taken for files that were not recorded.
+        """
+        self._snapshots.clear()
+
+    def forget(self, key: str) -> None:
+        """
+        Removes a file from the manifest.
+        """
+        self.entries.pop(key, None)
+
+    def save(self) -> None:
+        """
+        Atomically writes the manifest to disk.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        tmp_path.replace(self.path)
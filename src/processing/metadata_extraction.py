@@ -1,13 +1,139 @@
 """
 Handles the extraction of metadata from text content and file paths.
+
+Each entity type is found in two steps. A cheap anchor pattern that every
+match contains, such as "N." for code citations or "SC-" for docket
+numbers, is searched for first; these start with a literal, which the
+regex engine finds about as fast as `str.find`. The full pattern is then
+only tried at the few positions just before each anchor. Scanning for an
+entity type thus costs a literal search plus work proportional to its
+candidates, instead of a full regex pass that tries every character of
+the text.
 """
+from datetime import datetime
+from functools import lru_cache
+import heapq
 from pathlib import Path
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from logger import get_logger
 
 log = get_logger(__name__)
 
+# Directory name -> source label, in order of precedence.
+SOURCE_DIRS = {
+    "opvp": "OPVP",
+    "navajonationcouncil": "Navajo Nation Council",
+    "courts": "Navajo Nation Courts",
+    "nndoj": "Navajo Nation Department of Justice",
+    "nnols": "Navajo Nation Office of Legislative Services",
+}
+
+_MONTH_NAMES = ("January", "February", "March", "April", "May", "June", "July", "August", "September",
+                "October", "November", "December")
+_MONTHS = f"(?:{'|'.join(_MONTH_NAMES)})"
+
+# Entity type -> pattern. A pattern may define a `<type>_value` group to
+# narrow the reported value; otherwise the whole match is reported.
+ENTITY_PATTERNS = {
+    "nnc_citation": r"\b\d{1,2}[A-Z]?\s{1,8}N\.\s?N\.\s?C\.\s*§§?\s*\d+(?:\.\d+)?(?:\s*\([A-Za-z0-9]+\))*",
+    "docket_number": r"\bSC-[A-Z]{2,3}-\d{1,3}-\d{2,4}\b",
+    # Not inside a docket number such as SC-CV-12-19.
+    "resolution_number": r"(?<![A-Z]-)\b[A-Z]{2,4}-\d{1,3}-\d{2}\b",
+    "date": rf"\b(?:{_MONTHS}\s+\d{{1,2}},\s+\d{{4}}|\d{{1,2}}/\d{{1,2}}/\d{{4}})\b",
+    "sponsor": r"(?:Sponsored\s+by|Sponsor:)\s*(?:Honorable\s+)?(?P<sponsor_value>[A-Z][\w.'-]*(?:[ \t]+[A-Z][\w.'-]*){0,3})",
+}
+
+# Entity type -> (anchors, lookback): every match of the entity contains
+# one of the anchor patterns, starting at most `lookback` characters after
+# the match does. Anchors are kept literal-led, and alternatives are listed
+# separately, so that each is a fast literal search. A pattern that already
+# starts with a literal has no anchors, as the regex engine skips ahead to
+# that literal by itself.
+ENTITY_ANCHORS = {
+    "nnc_citation": ((r"N\.",), 11),
+    "docket_number": ((r"SC-",), 0),
+    "resolution_number": ((r"-\d",), 4),
+    "date": (_MONTH_NAMES + ("/",), 2),
+    "sponsor": None,
+}
+
+# Source label -> entity types extracted for that source. Sources without an
+# entry use every pattern.
+SOURCE_RULES = {
+    "Navajo Nation Courts": ("nnc_citation", "docket_number", "date"),
+    "OPVP": ("nnc_citation", "resolution_number", "date"),
+    "Navajo Nation Department of Justice": ("nnc_citation", "date"),
+}
+
+@lru_cache(maxsize=None)
+def _compile_rule(entity_type: str) -> Tuple["re.Pattern", Optional[List["re.Pattern"]], int]:
+    pattern = re.compile(ENTITY_PATTERNS[entity_type])
+    if ENTITY_ANCHORS[entity_type] is None:
+        return pattern, None, 0
+    anchors, lookback = ENTITY_ANCHORS[entity_type]
+    return pattern, [re.compile(anchor) for anchor in anchors], lookback
+
+def find_entity(text_content: str, entity_type: str) -> Iterator["re.Match"]:
+    """
+    Yields the matches of an entity type's pattern, as `finditer` would,
+    trying the pattern only just before each of its anchors.
+    """
+    pattern, anchors, lookback = _compile_rule(entity_type)
+    if anchors is None:
+        yield from pattern.finditer(text_content)
+        return
+    hits = heapq.merge(*(anchor.finditer(text_content) for anchor in anchors), key=lambda hit: hit.start())
+    position = 0
+    for hit in hits:
+        if hit.start() < position:
+            continue
+        for start in range(max(position, hit.start() - lookback), hit.start() + 1):
+            match = pattern.match(text_content, start)
+            if match:
+                yield match
+                position = max(match.end(), start + 1)
+                break
+
+def rules_for_source(source: str) -> Tuple[str, ...]:
+    """
+    Returns the entity types to extract for a source.
+    """
+    return SOURCE_RULES.get(source, tuple(ENTITY_PATTERNS))
+
+def extract_entities(text_content: str, entity_types: Tuple[str, ...] = tuple(ENTITY_PATTERNS)) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Finds every occurrence of the given entity types.
+
+    Args:
+        text_content: The text to scan.
+        entity_types: The entity types to look for.
+
+    Returns:
+        A dictionary mapping each entity type to a list of occurrences, each
+        with its `value` and `start`/`end` character offsets.
+    """
+    entities = {}
+    for kind in entity_types:
+        value_group = f"{kind}_value"
+        occurrences = entities[kind] = []
+        for match in find_entity(text_content, kind):
+            group = value_group if value_group in match.re.groupindex else 0
+            start, end = match.span(group)
+            occurrences.append({"value": " ".join(match.group(group).split()), "start": start, "end": end})
+    return entities
+
+def parse_date(value: str) -> Optional[str]:
+    """
+    Converts a date entity ("January 5, 2024" or "01/05/2024") to ISO format.
+    """
+    for fmt in ("%B %d, %Y", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
 def extract_metadata(file_path: Path, text_content: str) -> Dict[str, Any]:
     """
     Extracts metadata from a given file and its content.
@@ -30,22 +156,19 @@ def extract_metadata(file_path: Path, text_content: str) -> Dict[str, Any]:
     log.debug(f"Extracting metadata for {file_path.name}")
 
     # Determine the source from the path
-    parts = file_path.parts
-    if "opvp" in parts:
-        metadata["source"] = "OPVP"
-    elif "navajonationcouncil" in parts:
-        metadata["source"] = "Navajo Nation Council"
-    elif "courts" in parts:
-        metadata["source"] = "Navajo Nation Courts"
-    elif "nndoj" in parts:
-        metadata["source"] = "Navajo Nation Department of Justice"
-    elif "nnols" in parts:
-        metadata["source"] = "Navajo Nation Office of Legislative Services"
-
-    # Add more specific metadata extraction logic here based on source...
-    # Example: Use regex to find a resolution number if it exists
-    resolution_match = re.search(r'([A-Z]{2,3}-\d{2,3}-\d{2})', text_content)
-    if resolution_match:
-        metadata['resolution_number'] = resolution_match.group(1)
-
-    return metadata
\ No newline at end of file
+    parts = set(file_path.parts)
+    for directory, source in SOURCE_DIRS.items():
+        if directory in parts:
+            metadata["source"] = source
+            break
+
+    entities = extract_entities(text_content, rules_for_source(metadata["source"]))
+    metadata["entities"] = entities
+    if entities.get("resolution_number"):
+        metadata['resolution_number'] = entities["resolution_number"][0]["value"]
+    for date in entities.get("date", []):
+        metadata["date"] = parse_date(date["value"])
+        if metadata["date"]:
+            break
+
+    return metadata
@@ -1,47 +1,264 @@
 """
 Main pipeline for Phase 2: Data Processing and Storage.
+
+Runs are incremental: a manifest of processed files decides which files are
+new, changed or removed, and only those are touched. In watch mode the data
+directory is polled and new downloads are processed as they land.
 """
+import time
 from pathlib import Path
+from typing import List
 from logger import get_logger
 from processing.text_extraction import extract_text
-from processing.chunking import chunk_text_by_paragraph
+from processing.chunking import chunk_spans
 from processing.metadata_extraction import extract_metadata
+from processing.search_index import SearchIndex
+from processing.citation_graph import CitationGraph
+from processing import embeddings
+from processing.deduplication import DuplicateIndex
+from processing.manifest import ProcessedManifest
 from progress import ProgressBar
+from profiling import run_async, stage
+from tracing import span
 
 log = get_logger(__name__)
 
-def run_text_extraction_pipeline():
+DATA_DIR = Path("data")
+
+# Number of chunks collected before they are sent for embedding.
+EMBEDDING_FLUSH_SIZE = 2000
+
+# Files modified more recently than this are assumed to still be downloading.
+SETTLE_SECONDS = 2.0
+
+def find_input_files(data_dir: Path = DATA_DIR) -> List[Path]:
     """
-    Runs the text extraction process for all files in the data directory.
+    Returns every PDF and Markdown file under the data directory.
     """
-    log.info("Starting Phase 2: Text Extraction Pipeline...")
-    data_dir = Path("data")
-    
-    # Find all relevant files
-    files_to_process = list(data_dir.glob("**/*.pdf")) + list(data_dir.glob("**/*.md"))
-    log.info(f"Found {len(files_to_process)} files to process.")
+    return list(data_dir.glob("**/*.pdf")) + list(data_dir.glob("**/*.md"))
 
-    if not files_to_process:
-        log.warning("No files found to process. Exiting.")
-        return
+class Phase2Pipeline:
+    """
+    Holds the Phase 2 stores open across one or more incremental runs.
+    """
+    def __init__(self, data_dir: Path = DATA_DIR):
+        self.data_dir = data_dir
+        self.manifest = ProcessedManifest()
+        self.search_index = SearchIndex()
+        self.citation_graph = CitationGraph()
+        self.duplicate_index = DuplicateIndex()
+        self.embedding_backend = embeddings.get_backend() if embeddings.ENABLED else None
+        self.embedding_cache = embeddings.EmbeddingCache() if embeddings.ENABLED else None
+        self.vector_index = None
+        if embeddings.ENABLED:
+            from processing.vector_index import VectorIndex
+            self.vector_index = VectorIndex()
+        self._pending_chunks = []
+        # Duplicates unlinked from a removed or changed canonical document,
+        # to be indexed again in the same run.
+        self._requeue: List[str] = []
+
+    def run_once(self, full: bool = False, settle: float = 0.0) -> int:
+        """
+        Processes added and changed files and drops removed ones.
+
+        Args:
+            full: Reprocess every file, ignoring the manifest.
+            settle: Defer files modified less than this many seconds ago.
+
+        Returns:
+            The number of files processed or removed.
+        """
+        files = find_input_files(self.data_dir)
+        to_process, removed = self.manifest.plan(files, settle=settle)
+        if full:
+            to_process = files
+        try:
+            return self._run(files, to_process, removed)
+        finally:
+            self.manifest.discard_snapshots()
+
+    def _run(self, files: List[Path], to_process: List[Path], removed: List[str]) -> int:
+        if not to_process and not removed:
+            return 0
+        log.info(f"Phase 2: {len(to_process)} files to process, {len(removed)} removed, {len(files) - len(to_process)} unchanged.")
+
+        # Duplicates to index again, and the files indexed since they were last unlinked.
+        pending: List[str] = []
+        processed = set()
+        for key in removed:
+            self._remove_file(key)
+        self._take_requeued(pending, processed)
+
+        if to_process:
+            progress_bar = ProgressBar(len(to_process), text="Extracting Text")
+            for file_path in to_process:
+                try:
+                    self.manifest.snapshot(file_path)
+                except FileNotFoundError:
+                    progress_bar.update()
+                    continue
+                self._process_file(file_path)
+                self.manifest.record(file_path)
+                processed.add(str(file_path))
+                self._take_requeued(pending, processed)
+                progress_bar.update()
+            progress_bar.finish()
+
+        requeued = 0
+        while pending:
+            key = pending.pop(0)
+            if key in processed or not Path(key).exists():
+                continue
+            log.info(f"Re-indexing {key}, whose canonical copy was removed or changed.")
+            try:
+                self.manifest.snapshot(Path(key))
+            except FileNotFoundError:
+                continue
+            self._process_file(Path(key))
+            self.manifest.record(Path(key))
+            processed.add(key)
+            self._take_requeued(pending, processed)
+            requeued += 1
+
+        self._flush()
+        return len(to_process) + len(removed) + requeued
 
-    progress_bar = ProgressBar(len(files_to_process), text="Extracting Text")
-    
-    for file_path in files_to_process:
+    def _take_requeued(self, pending: List[str], processed: set) -> None:
+        """
+        Moves duplicates unlinked by the last step onto `pending`. One that
+        was already indexed in this run, e.g. linked to the old canonical
+        copy before that copy changed, has to be processed again.
+        """
+        processed.difference_update(self._requeue)
+        pending.extend(self._requeue)
+        self._requeue.clear()
+
+    def _process_file(self, file_path: Path) -> None:
+        with span("phase2.document", path=file_path):
+            self._process_document(file_path)
+
+    def _process_document(self, file_path: Path) -> None:
         log.debug(f"Processing file: {file_path}")
-        text = extract_text(str(file_path))
-        if text:
-            chunks = chunk_text_by_paragraph(text)
-            metadata = extract_metadata(file_path, text)
-            
+        key = str(file_path)
+        with stage("phase2.extract_text"):
+            text = extract_text(key)
+        with stage("phase2.deduplicate"):
+            self._requeue.extend(self.duplicate_index.remove(key))
+            canonical = self.duplicate_index.check(key, text) if text else None
+        if canonical:
+            # Near-duplicates are linked to their canonical copy and not indexed again.
+            self.search_index.remove_document(key)
+            self.citation_graph.update_document(key, [])
+            if self.vector_index:
+                self.vector_index.remove(key)
+        elif text:
+            with stage("phase2.chunk"):
+                spans = list(chunk_spans(text))
+            with stage("phase2.extract_metadata"):
+                metadata = extract_metadata(file_path, text)
+
             # For demonstration, log the extracted metadata.
             log.info(f"Extracted metadata for {file_path.name}: {metadata['title']}")
 
-            if not chunks:
+            if not spans:
                 log.warning(f"Could not chunk text from {file_path.name}")
+            with stage("phase2.search_index"):
+                self.search_index.add_document(key, (text[start:end] for start, end in spans), metadata)
+            with stage("phase2.citation_graph"):
+                citations = [c["value"] for c in metadata["entities"].get("nnc_citation", [])]
+                self.citation_graph.update_document(key, citations)
+            if self.embedding_backend:
+                for chunk_no, (start, end) in enumerate(spans):
+                    row = {
+                        "key": key,
+                        "chunk": chunk_no,
+                        "start": start,
+                        "end": end,
+                        "source": metadata["source"],
+                        "date": metadata.get("date"),
+                    }
+                    self._pending_chunks.append((text[start:end], row))
+                if len(self._pending_chunks) >= EMBEDDING_FLUSH_SIZE:
+                    self._embed_pending()
         else:
+            # A changed file that no longer yields text must not keep its old entries.
             log.warning(f"No text extracted from {file_path.name}")
-        progress_bar.update()
+            self.search_index.remove_document(key)
+            self.citation_graph.update_document(key, [])
+            if self.vector_index:
+                self.vector_index.remove(key)
+
+    def _remove_file(self, key: str) -> None:
+        log.info(f"Removing deleted file from indexes: {key}")
+        self.search_index.remove_document(key)
+        self.citation_graph.update_document(key, [])
+        self._requeue.extend(self.duplicate_index.remove(key))
+        if self.vector_index:
+            self.vector_index.remove(key)
+        self.manifest.forget(key)
+
+    def _embed_pending(self) -> None:
+        """
+        Embeds the buffered (chunk text, row metadata) pairs into the vector index.
+        """
+        if not self._pending_chunks:
+            return
+        with stage("phase2.embed"):
+            texts = [text for text, _ in self._pending_chunks]
+            vectors = run_async(embeddings.embed_chunks(texts, backend=self.embedding_backend, cache=self.embedding_cache))
+            embedded = [(row, vector) for (_, row), vector in zip(self._pending_chunks, vectors) if vector is not None]
+            self.vector_index.add([row for row, _ in embedded], [vector for _, vector in embedded])
+            self._pending_chunks = []
+
+    def _flush(self) -> None:
+        """
+        Persists every store and the manifest.
+        """
+        if self.embedding_backend:
+            self._embed_pending()
+        with stage("phase2.flush"):
+            self.search_index.commit()
+            self.citation_graph.save()
+            if self.vector_index:
+                self.vector_index.flush()
+                if self.vector_index.needs_ivf():
+                    self.vector_index.build_ivf()
+            self.manifest.save()
+
+    def close(self) -> None:
+        self.search_index.close()
+        self.duplicate_index.close()
+        if self.embedding_cache:
+            self.embedding_cache.close()
+
+def run_text_extraction_pipeline(full: bool = False):
+    """
+    Runs the text extraction process for new, changed and removed files in the data directory.
+    """
+    log.info("Starting Phase 2: Text Extraction Pipeline...")
+    if not find_input_files():
+        log.warning("No files found to process. Exiting.")
+        return
+
+    pipeline = Phase2Pipeline()
+    try:
+        if not pipeline.run_once(full=full):
+            log.info("All files are up to date.")
+    finally:
+        pipeline.close()
+    log.info("Text extraction pipeline complete.")
 
-    progress_bar.finish()
-    log.info("Text extraction pipeline complete.")
\ No newline at end of file
+def watch_text_extraction_pipeline(interval: float = 5.0):
+    """
+    Polls the data directory and processes new downloads as they appear.
+    """
+    log.info(f"Watching {DATA_DIR} for new files every {interval} seconds...")
+    pipeline = Phase2Pipeline()
+    try:
+        while True:
+            if pipeline.run_once(settle=SETTLE_SECONDS):
+                log.info("Indexes updated.")
+            time.sleep(interval)
+    finally:
+        pipeline.close()
@@ -0,0 +1,423 @@
+"""
+A local BM25 full-text search index over processed text chunks.
+
+The index is a set of immutable segments. Each segment keeps its term
+dictionary in a small JSON file and its postings in a varint-compressed
+binary file that is memory-mapped at query time, so only the postings a
+query touches are ever decoded. New documents are written as new segments
+and the smallest segments are merged together as they accumulate.
+"""
+import heapq
+import json
+import math
+import mmap
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from logger import get_logger
+
+log = get_logger(__name__)
+
+INDEX_DIR = Path("data/index/search")
+
+# Buffered chunks are flushed to a new segment once this many are pending.
+FLUSH_THRESHOLD = 5000
+# Once the index holds more than MAX_SEGMENTS segments, the MERGE_FACTOR
+# smallest are merged into one.
+MAX_SEGMENTS = 8
+MERGE_FACTOR = 4
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase alphanumeric tokens.
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _encode_varints(values: List[int], out: bytearray) -> None:
+    """
+    Appends unsigned LEB128 varints for the given values to a buffer.
+    """
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _decode_varints(data: bytes) -> List[int]:
+    """
+    Decodes a buffer of unsigned LEB128 varints.
+    """
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        if byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        else:
+            values.append(value | (byte << shift))
+            value = 0
+            shift = 0
+    return values
+
+
+def _encode_postings(postings: List[Tuple[int, List[int]]]) -> bytes:
+    """
+    Encodes (doc number, positions) pairs as delta-coded varints.
+
+    Each posting is written as the doc number delta, the term frequency and
+    the position deltas, in that order.
+    """
+    out = bytearray()
+    last_doc = 0
+    for doc, positions in postings:
+        _encode_varints([doc - last_doc, len(positions)], out)
+        last_pos = 0
+        deltas = []
+        for pos in positions:
+            deltas.append(pos - last_pos)
+            last_pos = pos
+        _encode_varints(deltas, out)
+        last_doc = doc
+    return bytes(out)
+
+
+def _decode_postings(data: bytes) -> List[Tuple[int, List[int]]]:
+    """
+    Decodes postings written by `_encode_postings`.
+    """
+    values = _decode_varints(data)
+    postings = []
+    doc = 0
+    i = 0
+    while i < len(values):
+        doc += values[i]
+        tf = values[i + 1]
+        i += 2
+        positions = []
+        pos = 0
+        for delta in values[i:i + tf]:
+            pos += delta
+            positions.append(pos)
+        i += tf
+        postings.append((doc, positions))
+    return postings
+
+
+def _write_segment(path: Path, docs: List[Dict[str, Any]], inverted: Dict[str, List[Tuple[int, List[int]]]]) -> None:
+    """
+    Writes a segment directory holding the doc table, term dictionary and postings.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    terms = {}
+    offset = 0
+    with open(path / "postings.bin", "wb") as f:
+        for term in sorted(inverted):
+            postings = inverted[term]
+            encoded = _encode_postings(postings)
+            f.write(encoded)
+            terms[term] = [offset, len(encoded), len(postings)]
+            offset += len(encoded)
+    with open(path / "segment.json", "w") as f:
+        json.dump({"docs": docs, "terms": terms}, f)
+
+
+class _Segment:
+    """
+    A read-only view over a segment on disk.
+    """
+    def __init__(self, path: Path, deleted: Optional[List[int]] = None):
+        self.name = path.name
+        self.path = path
+        with open(path / "segment.json", "r") as f:
+            meta = json.load(f)
+        self.docs = meta["docs"]
+        self.terms = meta["terms"]
+        self.deleted = set(deleted or [])
+        self.live_length = sum(
+            doc["length"] for doc_no, doc in enumerate(self.docs) if doc_no not in self.deleted
+        )
+        self._file = open(path / "postings.bin", "rb")
+        if (path / "postings.bin").stat().st_size > 0:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+    @property
+    def live_count(self) -> int:
+        return len(self.docs) - len(self.deleted)
+
+    def delete(self, doc_no: int) -> None:
+        if doc_no not in self.deleted:
+            self.deleted.add(doc_no)
+            self.live_length -= self.docs[doc_no]["length"]
+
+    def doc_freq(self, term: str) -> int:
+        entry = self.terms.get(term)
+        return entry[2] if entry else 0
+
+    def postings(self, term: str) -> List[Tuple[int, List[int]]]:
+        entry = self.terms.get(term)
+        if not entry:
+            return []
+        offset, length, _ = entry
+        return _decode_postings(self._data[offset:offset + length])
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class SearchIndex:
+    """
+    A segmented, incrementally updatable BM25 index.
+
+    Documents are identified by a key (usually the source file path) and are
+    indexed as one entry per chunk. Re-adding a key replaces its chunks.
+    """
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        """
+        Opens (or creates) the index stored in `index_dir`.
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.index_dir / "manifest.json"
+        manifest = {"next_segment": 0, "segments": []}
+        if self._manifest_path.exists():
+            with open(self._manifest_path, "r") as f:
+                manifest = json.load(f)
+        self._next_segment = manifest["next_segment"]
+        self.segments = [
+            _Segment(self.index_dir / entry["name"], entry.get("deleted"))
+            for entry in manifest["segments"]
+        ]
+        self._pending_docs = []
+        self._pending_inverted = {}
+        self._pending_keys = set()
+        self._removed_keys = set()
+
+    def add_document(self, key: str, chunks: Iterable[str], metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Buffers the chunks of a document for indexing, replacing any earlier version.
+        """
+        metadata = metadata or {}
+        if key in self._pending_keys:
+            self._drop_pending(key)
+        self._pending_keys.add(key)
+        for chunk_no, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            if not tokens:
+                continue
+            doc = len(self._pending_docs)
+            self._pending_docs.append({
+                "key": key,
+                "chunk": chunk_no,
+                "length": len(tokens),
+                "title": metadata.get("title", ""),
+                "source": metadata.get("source", ""),
+            })
+            positions = {}
+            for pos, token in enumerate(tokens):
+                positions.setdefault(token, []).append(pos)
+            for token, token_positions in positions.items():
+                self._pending_inverted.setdefault(token, []).append((doc, token_positions))
+
+        if len(self._pending_docs) >= FLUSH_THRESHOLD:
+            self.commit()
+
+    def remove_document(self, key: str) -> None:
+        """
+        Removes all chunks of a document from the index on the next commit.
+        """
+        if key in self._pending_keys:
+            self._drop_pending(key)
+        self._removed_keys.add(key)
+
+    def _drop_pending(self, key: str) -> None:
+        """
+        Discards buffered chunks for a key, renumbering the rest of the buffer.
+        """
+        keep = [i for i, doc in enumerate(self._pending_docs) if doc["key"] != key]
+        remap = {old: new for new, old in enumerate(keep)}
+        self._pending_docs = [self._pending_docs[i] for i in keep]
+        inverted = {}
+        for term, postings in self._pending_inverted.items():
+            kept = [(remap[doc], positions) for doc, positions in postings if doc in remap]
+            if kept:
+                inverted[term] = kept
+        self._pending_inverted = inverted
+        self._pending_keys.discard(key)
+
+    def commit(self) -> None:
+        """
+        Flushes buffered documents to a new segment and persists deletions.
+        """
+        replaced = self._pending_keys | self._removed_keys
+        if replaced:
+            for segment in self.segments:
+                for doc_no, doc in enumerate(segment.docs):
+                    if doc["key"] in replaced:
+                        segment.delete(doc_no)
+
+        if self._pending_docs:
+            name = f"seg_{self._next_segment:06d}"
+            self._next_segment += 1
+            _write_segment(self.index_dir / name, self._pending_docs, self._pending_inverted)
+            self.segments.append(_Segment(self.index_dir / name))
+            log.debug(f"Wrote search segment {name} with {len(self._pending_docs)} chunks.")
+
+        self._pending_docs = []
+        self._pending_inverted = {}
+        self._pending_keys = set()
+        self._removed_keys = set()
+
+        if len(self.segments) > MAX_SEGMENTS:
+            self._merge_smallest()
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        """
+        Atomically writes the list of live segments and their deletions.
+        """
+        manifest = {
+            "next_segment": self._next_segment,
+            "segments": [
+                {"name": segment.name, "deleted": sorted(segment.deleted)}
+                for segment in self.segments
+            ],
+        }
+        tmp_path = self._manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        tmp_path.replace(self._manifest_path)
+
+    def _merge_smallest(self) -> None:
+        """
+        Merges the smallest segments into one, dropping deleted documents.
+        """
+        by_size = sorted(self.segments, key=lambda s: s.live_count)
+        to_merge = by_size[:MERGE_FACTOR]
+        ordered = [s for s in self.segments if s in to_merge]
+
+        docs = []
+        inverted = {}
+        for segment in ordered:
+            remap = {}
+            for doc_no, doc in enumerate(segment.docs):
+                if doc_no not in segment.deleted:
+                    remap[doc_no] = len(docs)
+                    docs.append(doc)
+            for term in segment.terms:
+                for doc_no, positions in segment.postings(term):
+                    if doc_no in remap:
+                        inverted.setdefault(term, []).append((remap[doc_no], positions))
+
+        name = f"seg_{self._next_segment:06d}"
+        self._next_segment += 1
+        _write_segment(self.index_dir / name, docs, inverted)
+        merged = _Segment(self.index_dir / name)
+
+        position = self.segments.index(ordered[0])
+        remaining = [s for s in self.segments if s not in to_merge]
+        remaining.insert(position, merged)
+        self.segments = remaining
+        self._write_manifest()
+
+        for segment in ordered:
+            segment.close()
+            for file in segment.path.iterdir():
+                file.unlink()
+            segment.path.rmdir()
+        log.info(f"Merged {len(ordered)} search segments into {name} ({len(docs)} chunks).")
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Ranks indexed chunks against a query using BM25.
+
+        Quoted parts of the query are treated as phrases: a chunk must contain
+        every phrase verbatim to match. Remaining terms are ranked as a
+        disjunction.
+        """
+        phrases = [tokenize(p) for p in _PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = set(tokenize(_PHRASE_RE.sub(" ", query)))
+        for phrase in phrases:
+            terms.update(phrase)
+        if not terms:
+            return []
+
+        total_docs = sum(segment.live_count for segment in self.segments)
+        total_length = sum(segment.live_length for segment in self.segments)
+        if not total_docs:
+            return []
+        avg_length = total_length / total_docs
+
+        idf = {}
+        for term in terms:
+            df = sum(segment.doc_freq(term) for segment in self.segments)
+            idf[term] = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+
+        scored = []
+        for segment in self.segments:
+            postings = {term: dict(segment.postings(term)) for term in terms}
+            candidates = set()
+            for term_postings in postings.values():
+                candidates.update(term_postings)
+            candidates -= segment.deleted
+            for doc_no in candidates:
+                if phrases and not all(_contains_phrase(postings, doc_no, p) for p in phrases):
+                    continue
+                length = segment.docs[doc_no]["length"]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                score = 0.0
+                for term in terms:
+                    positions = postings[term].get(doc_no)
+                    if positions:
+                        tf = len(positions)
+                        score += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+                scored.append((score, segment.name, doc_no, segment))
+
+        results = []
+        for score, _, doc_no, segment in heapq.nlargest(top_k, scored, key=lambda item: item[:3]):
+            doc = segment.docs[doc_no]
+            results.append({
+                "score": score,
+                "path": doc["key"],
+                "chunk": doc["chunk"],
+                "title": doc["title"],
+                "source": doc["source"],
+            })
+        return results
+
+    def close(self) -> None:
+        """
+        Releases the memory maps held by open segments.
+        """
+        for segment in self.segments:
+            segment.close()
+
+
+def _contains_phrase(postings: Dict[str, Dict[int, List[int]]], doc_no: int, phrase: List[str]) -> bool:
+    """
+    Checks whether the tokens of a phrase occur consecutively in a chunk.
+    """
+    position_sets = []
+    for term in phrase:
+        positions = postings[term].get(doc_no)
+        if not positions:
+            return False
+        position_sets.append(set(positions))
+    return any(
+        all(start + offset in position_sets[offset] for offset in range(1, len(phrase)))
+        for start in position_sets[0]
+    )
@@ -2,7 +2,6 @@
 Handles the extraction of text from various file types.
 """
 from pathlib import Path
-import fitz  # PyMuPDF
 from logger import get_logger
 
 log = get_logger(__name__)
@@ -11,6 +10,8 @@ def extract_text_from_pdf(file_path: Path) -> str:
     """
     Extracts text content from a PDF file using PyMuPDF.
     """
+    # Imported here so that Markdown-only and search runs skip loading PyMuPDF.
+    import fitz  # PyMuPDF
     try:
         log.debug(f"Extracting text from PDF: {file_path}")
         text = ""
@@ -0,0 +1,408 @@
+"""
+A local, memory-mapped vector index over chunk embeddings.
+
+Vectors are stored as raw float32 rows in append-only segment files and are
+opened with `numpy.memmap`, so loading the index costs a few file opens no
+matter how large it is. Each segment has a sibling int32 attribute file
+(source id, date as YYYYMMDD) for filtering, a JSONL file with the row
+metadata, which is only read for the rows a query returns, and a small JSON
+map from document key to row numbers, which is loaded when the index opens
+so replacing or removing a document does not scan the metadata.
+
+Removed rows are tombstoned, and changes to the manifest are written by
+`flush`. Once tombstones make up COMPACT_FRACTION of the rows, `flush`
+rewrites the affected segments without them.
+
+Small indexes are searched exhaustively with one matrix-vector product per
+segment. Once an index grows past IVF_THRESHOLD rows, `build_ivf` clusters
+the rows into inverted lists, and queries then only score the lists whose
+centroids are closest to the query, plus any rows added since the build.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from logger import get_logger
+
+log = get_logger(__name__)
+
+VECTOR_DIR = Path("data/index/vectors")
+
+# Row count above which the pipeline builds an IVF partitioning.
+IVF_THRESHOLD = 50000
+# Rows added after an IVF build are searched exhaustively until they make up
+# this fraction of the index, at which point the partitioning is rebuilt.
+IVF_STALE_FRACTION = 0.2
+NPROBE = 8
+# Fraction of tombstoned rows at which `flush` compacts the segments.
+COMPACT_FRACTION = 0.25
+
+
+def _date_to_int(date: Optional[str]) -> int:
+    """
+    Converts an ISO date to an int like 20240105, or 0 when unknown.
+    """
+    if not date:
+        return 0
+    try:
+        return int(date[:10].replace("-", ""))
+    except ValueError:
+        return 0
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """
+    A segmented cosine-similarity index with source and date filters.
+    """
+    def __init__(self, index_dir: Path = VECTOR_DIR):
+        """
+        Opens (or creates) the index stored in `index_dir`.
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.index_dir / "manifest.json"
+        manifest = {"dimensions": None, "sources": [], "segments": [], "deleted": [], "ivf": None}
+        if self._manifest_path.exists():
+            with open(self._manifest_path, "r") as f:
+                manifest = json.load(f)
+        self.dimensions = manifest["dimensions"]
+        self.sources: List[str] = manifest["sources"]
+        self._segments: List[Dict[str, Any]] = manifest["segments"]
+        self._deleted = set(manifest["deleted"])
+        self._deleted_ids = np.array(sorted(self._deleted), dtype=np.int64)
+        self._ivf = manifest["ivf"]
+        # Manifests written before compaction existed have no segment counter.
+        self._next_segment = manifest.get("next_segment", len(self._segments))
+        self._dirty = False
+        self._vectors = [self._open_vectors(s) for s in self._segments]
+        self._attrs = [self._open_attrs(s) for s in self._segments]
+        self._metadata_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._rows_by_key = self._load_keys()
+        self._centroids = None
+        self._ivf_offsets = None
+        self._ivf_rows = None
+        if self._ivf:
+            self._centroids = np.load(self.index_dir / "ivf_centroids.npy", mmap_mode="r")
+            self._ivf_offsets = np.load(self.index_dir / "ivf_offsets.npy", mmap_mode="r")
+            self._ivf_rows = np.load(self.index_dir / "ivf_rows.npy", mmap_mode="r")
+
+    def _open_vectors(self, segment: Dict[str, Any]) -> np.ndarray:
+        return np.memmap(self.index_dir / f"{segment['name']}.vec", dtype=np.float32, mode="r",
+                         shape=(segment["rows"], self.dimensions))
+
+    def _open_attrs(self, segment: Dict[str, Any]) -> np.ndarray:
+        return np.memmap(self.index_dir / f"{segment['name']}.attrs", dtype=np.int32, mode="r",
+                         shape=(segment["rows"], 2))
+
+    @property
+    def size(self) -> int:
+        return sum(segment["rows"] for segment in self._segments)
+
+    def _bases(self) -> List[int]:
+        bases = [0]
+        for segment in self._segments:
+            bases.append(bases[-1] + segment["rows"])
+        return bases
+
+    def _segment_keys(self, index: int) -> Dict[str, List[int]]:
+        """
+        Returns a segment's map from document key to local row numbers.
+        """
+        name = self._segments[index]["name"]
+        keys_path = self.index_dir / f"{name}.keys.json"
+        if keys_path.exists():
+            with open(keys_path, "r") as f:
+                return json.load(f)
+        # Segments written before key maps existed get one on first open.
+        keys = {}
+        for local, meta in enumerate(self._segment_metadata(index)):
+            keys.setdefault(meta["key"], []).append(local)
+        self._metadata_cache.pop(name, None)
+        self._write_json(keys_path, keys)
+        return keys
+
+    def _load_keys(self) -> Dict[str, List[int]]:
+        """
+        Builds the map from document key to the global ids of its live rows.
+        """
+        rows_by_key: Dict[str, List[int]] = {}
+        for i, base in enumerate(self._bases()[:-1]):
+            for key, local_rows in self._segment_keys(i).items():
+                live = [base + local for local in local_rows if base + local not in self._deleted]
+                if live:
+                    rows_by_key.setdefault(key, []).extend(live)
+        return rows_by_key
+
+    def _segment_metadata(self, index: int) -> List[Dict[str, Any]]:
+        return self._read_metadata(self._segments[index]["name"])
+
+    def _read_metadata(self, name: str) -> List[Dict[str, Any]]:
+        if name not in self._metadata_cache:
+            with open(self.index_dir / f"{name}.meta.jsonl", "r") as f:
+                self._metadata_cache[name] = [json.loads(line) for line in f]
+        return self._metadata_cache[name]
+
+    def _source_id(self, source: str) -> int:
+        if source not in self.sources:
+            self.sources.append(source)
+        return self.sources.index(source)
+
+    def add(self, rows: Sequence[Dict[str, Any]], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Appends a segment of vectors, replacing earlier rows with the same keys.
+
+        Args:
+            rows: Per-vector metadata; each needs a `key` (the document path)
+                and may carry `chunk`, `source` and `date` (ISO format).
+            vectors: The embeddings, one per row.
+        """
+        if not rows:
+            return
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.dimensions is None:
+            self.dimensions = int(matrix.shape[1])
+        elif matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dimensional vectors, got {matrix.shape[1]}")
+
+        self._delete_keys({row["key"] for row in rows})
+
+        attrs = np.array(
+            [[self._source_id(row.get("source", "")), _date_to_int(row.get("date"))] for row in rows],
+            dtype=np.int32,
+        )
+        base = self.size
+        segment = self._write_segment(matrix, attrs, rows)
+        for local, row in enumerate(rows):
+            self._rows_by_key.setdefault(row["key"], []).append(base + local)
+        log.debug(f"Appended vector segment {segment['name']} with {len(rows)} rows.")
+
+    def _write_segment(self, matrix: np.ndarray, attrs: np.ndarray, rows: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Writes a new segment's files and appends it to the index.
+        """
+        name = f"seg_{self._next_segment:06d}"
+        self._next_segment += 1
+        matrix.tofile(self.index_dir / f"{name}.vec")
+        attrs.tofile(self.index_dir / f"{name}.attrs")
+        keys = {}
+        with open(self.index_dir / f"{name}.meta.jsonl", "w") as f:
+            for local, row in enumerate(rows):
+                f.write(json.dumps(row) + "\n")
+                keys.setdefault(row["key"], []).append(local)
+        self._write_json(self.index_dir / f"{name}.keys.json", keys)
+        segment = {"name": name, "rows": len(rows)}
+        self._segments.append(segment)
+        self._vectors.append(self._open_vectors(segment))
+        self._attrs.append(self._open_attrs(segment))
+        self._dirty = True
+        return segment
+
+    def remove(self, key: str) -> None:
+        """
+        Removes every row of a document from search results.
+        """
+        self._delete_keys({key})
+
+    def _delete_keys(self, keys) -> None:
+        deleted = [row_id for key in keys for row_id in self._rows_by_key.pop(key, [])]
+        if deleted:
+            self._deleted.update(deleted)
+            self._deleted_ids = np.array(sorted(self._deleted), dtype=np.int64)
+            self._dirty = True
+
+    def flush(self) -> None:
+        """
+        Compacts the segments if enough rows are tombstoned, and writes the
+        manifest if anything changed.
+        """
+        if self._deleted and len(self._deleted) >= COMPACT_FRACTION * self.size:
+            self.compact()
+        elif self._dirty:
+            self._write_manifest()
+
+    def compact(self) -> None:
+        """
+        Rewrites every segment with tombstoned rows without them.
+
+        Row ids change, so an IVF partitioning is dropped; the pipeline
+        rebuilds it when the index is still large enough.
+        """
+        bases = self._bases()
+        old = list(zip(self._segments, self._vectors, self._attrs))
+        self._segments, self._vectors, self._attrs = [], [], []
+        removed = []
+        for i, (segment, vectors, attrs) in enumerate(old):
+            first, last = np.searchsorted(self._deleted_ids, [bases[i], bases[i + 1]])
+            if first == last:
+                self._segments.append(segment)
+                self._vectors.append(vectors)
+                self._attrs.append(attrs)
+                continue
+            removed.append(segment["name"])
+            live = np.setdiff1d(np.arange(segment["rows"]), self._deleted_ids[first:last] - bases[i])
+            if len(live):
+                metadata = self._read_metadata(segment["name"])
+                self._write_segment(np.asarray(vectors[live]), np.asarray(attrs[live]),
+                                    [metadata[local] for local in live])
+        reclaimed = len(self._deleted)
+        self._deleted = set()
+        self._deleted_ids = np.array([], dtype=np.int64)
+        if self._ivf:
+            self._ivf = None
+            self._centroids = self._ivf_offsets = self._ivf_rows = None
+            for name in ("ivf_centroids.npy", "ivf_offsets.npy", "ivf_rows.npy"):
+                (self.index_dir / name).unlink(missing_ok=True)
+        self._write_manifest()
+        del old
+        for name in removed:
+            self._metadata_cache.pop(name, None)
+            for suffix in (".vec", ".attrs", ".meta.jsonl", ".keys.json"):
+                (self.index_dir / f"{name}{suffix}").unlink(missing_ok=True)
+        self._rows_by_key = self._load_keys()
+        log.info(f"Compacted the vector index: dropped {reclaimed} removed rows from {len(removed)} segments.")
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "dimensions": self.dimensions,
+            "sources": self.sources,
+            "segments": self._segments,
+            "deleted": sorted(self._deleted),
+            "ivf": self._ivf,
+            "next_segment": self._next_segment,
+        }
+        self._write_json(self._manifest_path, manifest)
+        self._dirty = False
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        tmp_path.replace(path)
+
+    def needs_ivf(self) -> bool:
+        """
+        Returns True when the index is large enough, or the IVF stale enough, to (re)build.
+        """
+        if self.size < IVF_THRESHOLD:
+            return False
+        if not self._ivf:
+            return True
+        return self.size - self._ivf["rows"] > IVF_STALE_FRACTION * self.size
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, sample_size: int = 100000, seed: int = 0) -> None:
+        """
+        Partitions the current rows into `n_lists` clusters with spherical k-means.
+        """
+        total = self.size
+        if not total:
+            return
+        n_lists = n_lists or max(1, int(np.sqrt(total)))
+        data = np.concatenate(self._vectors) if len(self._vectors) > 1 else np.asarray(self._vectors[0])
+        rng = np.random.default_rng(seed)
+        sample = data[rng.choice(total, size=min(sample_size, total), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=min(n_lists, len(sample)), replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = sample[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assignment = np.empty(total, dtype=np.int32)
+        for start in range(0, total, 65536):
+            assignment[start:start + 65536] = np.argmax(data[start:start + 65536] @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(assignment[order], np.arange(len(centroids) + 1)).astype(np.int64)
+
+        np.save(self.index_dir / "ivf_centroids.npy", centroids.astype(np.float32))
+        np.save(self.index_dir / "ivf_offsets.npy", offsets)
+        np.save(self.index_dir / "ivf_rows.npy", order)
+        self._centroids, self._ivf_offsets, self._ivf_rows = centroids, offsets, order
+        self._ivf = {"rows": total, "lists": len(centroids)}
+        self._write_manifest()
+        log.info(f"Built IVF partitioning with {len(centroids)} lists over {total} vectors.")
+
+    def search(self, query: Sequence[float], top_k: int = 10, source: Optional[str] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None,
+               nprobe: int = NPROBE) -> List[Dict[str, Any]]:
+        """
+        Returns the rows most similar to a query vector.
+
+        Args:
+            query: The query embedding.
+            top_k: Number of results.
+            source: Only return rows from this source.
+            date_from: Only return rows dated on or after this ISO date.
+            date_to: Only return rows dated on or before this ISO date.
+            nprobe: Number of IVF lists to scan, when partitioned.
+
+        Returns:
+            Row metadata dictionaries with an added `score` (cosine similarity).
+        """
+        if not self._segments:
+            return []
+        if source is not None and source not in self.sources:
+            return []
+        q = _normalize(np.asarray(query, dtype=np.float32))
+        source_id = self.sources.index(source) if source is not None else None
+        low = _date_to_int(date_from) if date_from else None
+        high = _date_to_int(date_to) if date_to else None
+
+        bases = self._bases()
+        candidates = []  # (scores, global row ids)
+        for i, (vectors, attrs) in enumerate(zip(self._vectors, self._attrs)):
+            if self._ivf and bases[i + 1] <= self._ivf["rows"]:
+                continue
+            start = max(0, self._ivf["rows"] - bases[i]) if self._ivf else 0
+            local = np.arange(start, len(vectors))
+            candidates.append(self._score(vectors, attrs, local, bases[i], q, source_id, low, high))
+
+        if self._ivf:
+            probes = np.argsort(-(self._centroids @ q))[:nprobe]
+            rows = np.sort(np.concatenate(
+                [self._ivf_rows[self._ivf_offsets[c]:self._ivf_offsets[c + 1]] for c in probes]
+            ))
+            segment_of = np.searchsorted(bases, rows, side="right") - 1
+            for i in np.unique(segment_of):
+                local = rows[segment_of == i] - bases[i]
+                candidates.append(self._score(self._vectors[i], self._attrs[i], local, bases[i], q, source_id, low, high))
+
+        scores = np.concatenate([c[0] for c in candidates])
+        ids = np.concatenate([c[1] for c in candidates])
+        if not len(scores):
+            return []
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for row_id, score in zip(ids[best], scores[best]):
+            i = int(np.searchsorted(bases, row_id, side="right") - 1)
+            meta = dict(self._segment_metadata(i)[int(row_id - bases[i])])
+            meta["score"] = float(score)
+            results.append(meta)
+        return results
+
+    def _score(self, vectors, attrs, local, base, q, source_id, low, high):
+        """
+        Scores the given local rows of a segment, dropping filtered and deleted rows.
+        """
+        mask = np.ones(len(local), dtype=bool)
+        if source_id is not None:
+            mask &= attrs[local, 0] == source_id
+        if low is not None:
+            mask &= attrs[local, 1] >= low
+        if high is not None:
+            mask &= attrs[local, 1] <= high
+        if len(self._deleted_ids):
+            mask &= ~np.isin(local + base, self._deleted_ids)
+        local = local[mask]
+        return np.asarray(vectors[local] @ q), (local + base).astype(np.int64)
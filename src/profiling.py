@@ -0,0 +1,244 @@
+"""
+Opt-in profiling for the command-line entry points.
+
+Code marks its stages with `stage("name")`, which costs nothing unless a
+profile is running. Under `profile_run` every stage accumulates wall and CPU
+time; optionally the outermost stages also collect cProfile statistics and
+tracemalloc allocation diffs, and event-loop callbacks that block for longer
+than a threshold are captured from asyncio's debug mode. One text report is
+written per run.
+
+The profilers and asyncio are imported on demand, which keeps `stage` cheap
+to import for commands that are never profiled.
+"""
+import io
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from logger import get_logger
+from tracing import span
+
+log = get_logger(__name__)
+
+REPORT_DIR = Path("data/profiles")
+SLOW_CALLBACK_SECONDS = 0.1
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 10
+
+_active: Optional["Profiler"] = None
+_SLOW_CALLBACK_RE = re.compile(r"took (\d+(?:\.\d+)?) seconds")
+
+
+def process_tree_rss(root_pid: int, include_root: bool = True) -> Optional[int]:
+    """
+    Returns the summed RSS in bytes of a process's descendants, and of the
+    process itself unless `include_root` is False, or None where /proc is
+    unavailable.
+    """
+    proc = Path("/proc")
+    if not proc.exists():
+        return None
+    children = {}
+    for stat_file in proc.glob("[0-9]*/stat"):
+        try:
+            fields = stat_file.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat_file.parent.name))
+    total = 0
+    pending = [root_pid] if include_root else list(children.get(root_pid, []))
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while pending:
+        pid = pending.pop()
+        try:
+            total += int((proc / str(pid) / "statm").read_text().split()[1]) * page_size
+        except (OSError, IndexError):
+            pass
+        pending.extend(children.get(pid, []))
+    return total
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """
+    Collects asyncio's "Executing <Handle ...> took N seconds" warnings.
+    """
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.stalls = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        match = _SLOW_CALLBACK_RE.search(message)
+        if match:
+            self.stalls.append((float(match.group(1)), message))
+
+
+class Profiler:
+    """
+    Accumulates per-stage timings and optional cProfile and tracemalloc data.
+
+    Args:
+        name: The entry point being profiled, used in the report name.
+        cprofile: Collect cProfile statistics for each outermost stage.
+        memory: Record the top allocations of each outermost stage.
+        slow_callback: Event-loop callbacks slower than this many seconds are reported.
+        report_dir: Where the report is written.
+    """
+    def __init__(self, name: str, cprofile: bool = False, memory: bool = False,
+                 slow_callback: float = SLOW_CALLBACK_SECONDS, report_dir: Path = REPORT_DIR):
+        self.name = name
+        self.cprofile = cprofile
+        self.memory = memory
+        self.slow_callback = slow_callback
+        self.report_dir = Path(report_dir)
+        self.stages = {}
+        self.profiles = {}
+        self.allocations = {}
+        self._owner = None
+        self._slow_callbacks = _SlowCallbackHandler()
+        self._started = datetime.now()
+        self._wall = self._cpu = 0.0
+
+    def start(self) -> None:
+        global _active
+        _active = self
+        logging.getLogger("asyncio").addHandler(self._slow_callbacks)
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+
+    def stop(self) -> Path:
+        """
+        Stops profiling and writes the report.
+
+        Returns:
+            The path of the report.
+        """
+        global _active
+        self._wall, self._cpu = time.perf_counter() - self._wall, time.process_time() - self._cpu
+        _active = None
+        logging.getLogger("asyncio").removeHandler(self._slow_callbacks)
+        peak = None
+        if self.memory:
+            import tracemalloc
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        path = self.report_dir / f"{self.name}-{self._started:%Y%m%d-%H%M%S}.txt"
+        path.write_text(self.report(peak))
+        return path
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times a stage. Nested and concurrent stages are timed independently.
+        """
+        owner = self._owner is None
+        if owner:
+            import cProfile
+            import pstats
+            import tracemalloc
+            self._owner = name
+            profile = cProfile.Profile() if self.cprofile else None
+            snapshot = tracemalloc.take_snapshot() if self.memory else None
+            if profile:
+                profile.enable()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            if owner:
+                self._owner = None
+                if profile:
+                    profile.disable()
+                    if name in self.profiles:
+                        self.profiles[name].add(profile)
+                    else:
+                        self.profiles[name] = pstats.Stats(profile)
+                if snapshot:
+                    diff = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+                    self.allocations.setdefault(name, []).extend(diff[:TOP_ALLOCATIONS])
+
+    def report(self, peak_memory: Optional[int] = None) -> str:
+        lines = [
+            f"Profile of {self.name}, started {self._started:%Y-%m-%d %H:%M:%S}",
+            f"Total: {self._wall:.3f}s wall, {self._cpu:.3f}s CPU",
+        ]
+        if peak_memory is not None:
+            lines.append(f"Peak traced memory: {peak_memory / 1e6:.1f} MB")
+        lines += ["", "CPU time is process-wide, so concurrent stages share it.", "",
+                  f"{'stage':40} {'calls':>7} {'wall s':>10} {'cpu s':>10} {'avg ms':>9}"]
+        for name, (calls, wall, cpu) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:40} {calls:7} {wall:10.3f} {cpu:10.3f} {wall / calls * 1000:9.2f}")
+
+        stalls = sorted(self._slow_callbacks.stalls, reverse=True)
+        lines += ["", f"Event-loop stalls over {self.slow_callback * 1000:.0f} ms: {len(stalls)}"]
+        lines += [f"  {seconds:7.3f}s  {message}" for seconds, message in stalls[:20]]
+
+        for name, stats in self.profiles.items():
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            lines += ["", f"cProfile: {name}", buffer.getvalue()]
+        for name, diffs in self.allocations.items():
+            top = sorted(diffs, key=lambda diff: -diff.size_diff)[:TOP_ALLOCATIONS]
+            lines += ["", f"Top allocations: {name}"] + [f"  {diff}" for diff in top]
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Marks a stage for the active profiler and trace; a no-op when neither is running.
+    """
+    with span(name):
+        if _active is None:
+            yield
+            return
+        with _active.stage(name):
+            yield
+
+
+@contextmanager
+def profile_run(name: str, enabled: bool, cprofile: bool = False, memory: bool = False,
+                slow_callback: float = SLOW_CALLBACK_SECONDS):
+    """
+    Profiles the enclosed run and writes its report when it ends.
+    """
+    if not enabled:
+        yield None
+        return
+    profiler = Profiler(name, cprofile=cprofile, memory=memory, slow_callback=slow_callback)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        report = profiler.stop()
+        log.info(f"Profile report written to {report}")
+
+
+def run_async(coro):
+    """
+    Runs a coroutine like `asyncio.run`, detecting slow callbacks when profiling.
+    """
+    import asyncio
+    if _active is None:
+        return asyncio.run(coro)
+    threshold = _active.slow_callback
+
+    async def instrumented():
+        asyncio.get_running_loop().slow_callback_duration = threshold
+        return await coro
+
+    return asyncio.run(instrumented(), debug=True)
@@ -3,6 +3,7 @@ A reusable, advanced queue system for managing asynchronous tasks.
 """
 import asyncio
 from logger import get_logger
+from tracing import span
 
 log = get_logger(__name__)
 
@@ -36,20 +37,29 @@ class QueueManager:
     async def _worker(self, worker_name):
         """
         The worker function that processes tasks from the queue.
+
+        Every task taken is marked done, even if it fails, so `join` returns.
         """
         log.debug(f"[{self.name}] Worker {worker_name} started")
         while True:
             try:
-                task_data = await self.queue.get()
+                with span(f"{self.name}.wait"):
+                    task_data = await self.queue.get()
+            except asyncio.CancelledError:
+                log.debug(f"[{self.name}] Worker {worker_name} cancelled.")
+                break
+            try:
                 log.debug(f"[{self.name}] Worker {worker_name} processing task: {task_data}")
-                await self.worker_coro(task_data)
-                self.queue.task_done()
+                with span(f"{self.name}.task", task=task_data):
+                    await self.worker_coro(task_data)
                 log.debug(f"[{self.name}] Worker {worker_name} finished task: {task_data}")
             except asyncio.CancelledError:
                 log.debug(f"[{self.name}] Worker {worker_name} cancelled.")
                 break
             except Exception:
                 log.exception(f"[{self.name}] Worker {worker_name} encountered an error while processing {task_data}")
+            finally:
+                self.queue.task_done()
 
 
     async def start(self):
@@ -62,7 +72,7 @@ class QueueManager:
 
         for i in range(self.num_workers):
             worker_name = f"worker-{i+1}"
-            worker_task = asyncio.create_task(self._worker(worker_name))
+            worker_task = asyncio.create_task(self._worker(worker_name), name=f"{self.name}/{worker_name}")
             self.workers.append(worker_task)
         self._started = True
         log.info(f"[{self.name}] Started {self.num_workers} workers.")
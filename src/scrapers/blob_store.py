@@ -0,0 +1,195 @@
+"""
+A content-addressed store for downloaded files.
+
+Every downloaded file is stored once under `data/blobs`, named by its
+SHA-256 and sharded into two levels of subdirectories
+(`data/blobs/ab/cd/abcd...`). The source-specific paths the scrapers and
+Phase 2 use are hardlinks to the blob, so identical documents published
+under several URLs take the space of one. A reference table records which
+URL and blob each path holds, which lets downloads detect when two
+different files would land on the same path.
+
+Blob names carry no extension, so the `**/*.pdf` scans of the data
+directory never pick up the store itself.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from config import sqlite_journal_mode
+from logger import get_logger
+from scrapers.integrity import file_fingerprint
+
+log = get_logger(__name__)
+
+BLOB_DIR = Path("data/blobs")
+
+
+class BlobStore:
+    """
+    Blobs keyed by SHA-256, and the paths that reference them.
+
+    Args:
+        root: The directory holding the blobs and the reference table.
+    """
+    def __init__(self, root: Path = BLOB_DIR):
+        self.root = Path(root)
+        self._tmp_dir = self.root / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.root / "refs.sqlite", timeout=30, check_same_thread=False)
+        self._db.execute(f"PRAGMA journal_mode={sqlite_journal_mode()}")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS refs (path TEXT PRIMARY KEY, url TEXT, sha256 TEXT NOT NULL, size INTEGER)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS refs_sha256 ON refs (sha256)")
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def write(self, data: bytes) -> Tuple[str, int]:
+        """
+        Stores a file's content.
+
+        Returns:
+            The SHA-256 and size of the content.
+        """
+        tmp_path = self._tmp_dir / uuid.uuid4().hex
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return self._commit(tmp_path, hashlib.sha256(data).hexdigest(), len(data))
+
+    def add(self, path: Path) -> Tuple[str, int]:
+        """
+        Moves an existing file into the store and links it back in place.
+
+        Returns:
+            The SHA-256 and size of the file.
+        """
+        path = Path(path)
+        size, sha256 = file_fingerprint(path)
+        blob = self.blob_path(sha256)
+        if blob.exists() and os.path.samefile(blob, path):
+            self._record(path, None, sha256, size)
+            return sha256, size
+        tmp_path = self._tmp_dir / uuid.uuid4().hex
+        shutil.move(path, tmp_path)
+        self._commit(tmp_path, sha256, size)
+        self.link(sha256, path)
+        self._record(path, None, sha256, size)
+        return sha256, size
+
+    def _commit(self, tmp_path: Path, sha256: str, size: int) -> Tuple[str, int]:
+        blob = self.blob_path(sha256)
+        # A blob whose size or content no longer matches its name was damaged
+        # in place through one of its links, and is replaced.
+        if blob.exists() and blob.stat().st_size == size and file_fingerprint(blob)[1] == sha256:
+            tmp_path.unlink()
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, blob)
+        return sha256, size
+
+    def link(self, sha256: str, dest: Path) -> None:
+        """
+        Makes `dest` a hardlink to a blob, or a copy where links are not supported.
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dest = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}")
+        try:
+            os.link(self.blob_path(sha256), tmp_dest)
+        except OSError:
+            shutil.copyfile(self.blob_path(sha256), tmp_dest)
+        os.replace(tmp_dest, dest)
+
+    def store(self, data: bytes, dest: Path, url: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Stores downloaded content, links it at `dest` and records the reference.
+
+        Returns:
+            The SHA-256 and size of the content.
+        """
+        sha256, size = self.write(data)
+        self.link(sha256, dest)
+        self._record(dest, url, sha256, size)
+        return sha256, size
+
+    def store_file(self, src: Path, dest: Path, url: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Moves a downloaded file into the store, links it at `dest` and
+        records the reference.
+
+        Returns:
+            The SHA-256 and size of the file.
+        """
+        size, sha256 = file_fingerprint(src)
+        tmp_path = self._tmp_dir / uuid.uuid4().hex
+        shutil.move(src, tmp_path)
+        self._commit(tmp_path, sha256, size)
+        self.link(sha256, dest)
+        self._record(dest, url, sha256, size)
+        return sha256, size
+
+    def _record(self, path: Path, url: Optional[str], sha256: str, size: int) -> None:
+        with self._db:
+            # A path adopted without a URL keeps the one recorded when it was downloaded.
+            self._db.execute(
+                "INSERT INTO refs (path, url, sha256, size) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET url = COALESCE(excluded.url, url), "
+                "sha256 = excluded.sha256, size = excluded.size",
+                (str(path), url, sha256, size),
+            )
+
+    def ref(self, path: Path) -> Optional[Dict[str, object]]:
+        """
+        Returns the URL, SHA-256 and size recorded for a path, or None.
+        """
+        row = self._db.execute("SELECT url, sha256, size FROM refs WHERE path = ?", (str(path),)).fetchone()
+        return {"url": row[0], "sha256": row[1], "size": row[2]} if row else None
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_stores: Dict[Path, BlobStore] = {}
+
+
+def blob_store() -> BlobStore:
+    """
+    Returns the blob store under the current working directory's data directory.
+    """
+    root = BLOB_DIR.resolve()
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = BlobStore(root)
+    return store
+
+
+def _distinct_bytes(paths) -> int:
+    inodes = {}
+    for path in paths:
+        stat = path.stat()
+        inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+    return sum(inodes.values())
+
+
+def deduplicate_downloads(data_dir: Path = Path("data"), pattern: str = "**/*.pdf") -> Tuple[int, int]:
+    """
+    Moves downloaded files that predate the blob store into it, replacing
+    identical copies with links to one blob.
+
+    Returns:
+        The number of files adopted and the bytes of disk space freed.
+    """
+    store = blob_store()
+    paths = [path for path in Path(data_dir).glob(pattern) if path.is_file() and store.root not in path.resolve().parents]
+    before = _distinct_bytes(paths)
+    for path in paths:
+        store.add(path)
+    freed = before - _distinct_bytes(paths)
+    log.info(f"Blob store: adopted {len(paths)} files, freed {freed / 1e6:.1f} MB.")
+    return len(paths), freed
@@ -0,0 +1,252 @@
+"""
+Shared browser and HTTP client setup for the scrapers.
+
+Every scraper launches its browser, creates its contexts and opens its HTTP
+clients through these helpers, so that traffic can be redirected to a local
+site simulator (set `ZHIN_SITE_OVERRIDE` to its base URL), served from the
+page cache (browser and REST API traffic alike) and stripped of unneeded
+assets, and so that the number of browsers in use can be measured.
+Navigations go through `goto`, which applies the per-host circuit breaker
+and adaptive timeouts.
+"""
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+import httpx
+from logger import get_logger
+from scrapers.host_health import host_health
+from scrapers.page_cache import page_cache_from_config
+from scrapers.resource_blocking import blocking_profile_from_config
+
+log = get_logger(__name__)
+
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+]
+
+BROWSER_CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
+    "viewport": {"width": 1920, "height": 1080},
+    "ignore_https_errors": True,
+}
+
+# Browsers, contexts and pages opened through these helpers in this process.
+browser_stats = {
+    "launched": 0, "open": 0, "peak_open": 0,
+    "contexts_open": 0, "pages_open": 0, "peak_pages_open": 0, "contexts_recycled": 0,
+    "requests_blocked": 0,
+}
+
+# Requests whose responses the page cache stores: pages and the data their scripts fetch.
+CACHED_RESOURCE_TYPES = {"document", "xhr", "fetch"}
+CACHED_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "application/json")
+
+
+def site_override():
+    """
+    Returns the base URL all requests are redirected to, or None.
+    """
+    return os.environ.get("ZHIN_SITE_OVERRIDE") or None
+
+
+def rewrite_url(url: str, base: str) -> str:
+    """
+    Maps `https://host/path?query` onto `<base>/host/path?query`.
+    """
+    parts = urlsplit(url)
+    rewritten = f"{base.rstrip('/')}/{parts.netloc}{parts.path or '/'}"
+    if parts.query:
+        rewritten += f"?{parts.query}"
+    return rewritten
+
+
+async def launch_browser(p, headless=True, args=None):
+    """
+    Launches Firefox and keeps count of open browsers.
+
+    Args:
+        p: The object returned by `async_playwright()`.
+        headless: Whether to run without a window.
+        args: Extra browser arguments; None for the default launch.
+    """
+    launch_options = {"headless": headless}
+    if args is not None:
+        launch_options["args"] = args
+    browser = await p.firefox.launch(**launch_options)
+    browser_stats["launched"] += 1
+    browser_stats["open"] += 1
+    browser_stats["peak_open"] = max(browser_stats["peak_open"], browser_stats["open"])
+
+    def on_disconnected(_):
+        browser_stats["open"] -= 1
+
+    browser.on("disconnected", on_disconnected)
+    return browser
+
+
+async def new_context(browser, **options):
+    """
+    Creates a browser context.
+
+    Assets matched by the resource blocking profile are aborted, pages and
+    XHR responses are served from the page cache when it is enabled, and
+    requests are sent to the site simulator when one is set.
+    """
+    context = await browser.new_context(**options)
+    _track_context(context)
+    base = site_override()
+    cache = page_cache_from_config()
+    blocking = blocking_profile_from_config()
+    if base or cache or blocking:
+        await context.route("**/*", _route_handler(cache, base, blocking))
+    return context
+
+
+async def goto(page, url: str, timeout: float = None, **options):
+    """
+    Navigates a page, subject to its host's circuit breaker.
+
+    Waits while the host's circuit is open, uses a timeout derived from the
+    host's recent navigation latencies unless one is given (in
+    milliseconds, as for `page.goto`), and reports the outcome.
+    """
+    health = host_health(url)
+    probe = await health.before_request()
+    start = time.monotonic()
+    try:
+        response = await page.goto(url, timeout=timeout if timeout is not None else health.timeout() * 1000, **options)
+        if response is not None and response.status >= 500:
+            health.record_failure()
+        else:
+            health.record_success(time.monotonic() - start)
+        return response
+    except Exception:
+        health.record_failure()
+        raise
+    finally:
+        health.end_request(probe)
+
+
+def _track_context(context) -> None:
+    """
+    Keeps the open context and page counts in `browser_stats` current.
+    """
+    browser_stats["contexts_open"] += 1
+
+    def on_page_closed(_):
+        browser_stats["pages_open"] -= 1
+
+    def on_page(page):
+        browser_stats["pages_open"] += 1
+        browser_stats["peak_pages_open"] = max(browser_stats["peak_pages_open"], browser_stats["pages_open"])
+        page.on("close", on_page_closed)
+
+    def on_closed(_):
+        browser_stats["contexts_open"] -= 1
+
+    context.on("page", on_page)
+    context.on("close", on_closed)
+
+
+def _page_url(request):
+    try:
+        return request.frame.url
+    except Exception:
+        # Service worker requests have no frame.
+        return None
+
+
+def _route_handler(cache, base, blocking=None):
+    async def handle(route):
+        request = route.request
+        if blocking and blocking.should_block(request.url, request.resource_type, _page_url(request)):
+            browser_stats["requests_blocked"] += 1
+            await route.abort("blockedbyclient")
+            return
+        cacheable = (
+            cache is not None and request.method == "GET" and request.resource_type in CACHED_RESOURCE_TYPES
+        )
+        if cacheable:
+            cached = await asyncio.to_thread(cache.get, request.url)
+            if cached:
+                await route.fulfill(status=cached["status"], headers=cached["headers"], body=cached["body"])
+                return
+        if cache is not None and cache.mode == "replay":
+            log.warning(f"Not in page cache, blocking in replay mode: {request.url}")
+            await route.abort("internetdisconnected")
+            return
+        if not base and not cacheable:
+            await route.continue_()
+            return
+        response = await route.fetch(url=rewrite_url(request.url, base) if base else None)
+        if cacheable and _cacheable_content_type(response.headers):
+            body = await response.body()
+            await asyncio.to_thread(cache.put, request.url, response.status, response.headers, body)
+            await route.fulfill(response=response, body=body)
+        else:
+            await route.fulfill(response=response)
+
+    return handle
+
+
+def _cacheable_content_type(headers) -> bool:
+    return headers.get("content-type", "").split(";")[0].strip().lower() in CACHED_CONTENT_TYPES
+
+
+class _CachingTransport(httpx.AsyncBaseTransport):
+    """
+    Serves GET requests from the page cache and stores HTML and JSON responses in it.
+    """
+    def __init__(self, transport: httpx.AsyncBaseTransport, cache):
+        self._transport = transport
+        self._cache = cache
+
+    async def handle_async_request(self, request):
+        if request.method != "GET":
+            return await self._transport.handle_async_request(request)
+        url = str(request.url)
+        cached = await asyncio.to_thread(self._cache.get, url)
+        if cached:
+            return httpx.Response(cached["status"], headers=cached["headers"], content=cached["body"], request=request)
+        if self._cache.mode == "replay":
+            log.warning(f"Not in page cache, blocking in replay mode: {url}")
+            raise httpx.ConnectError(f"Not in page cache: {url}", request=request)
+        response = await self._transport.handle_async_request(request)
+        if response.status_code == 200 and _cacheable_content_type(response.headers):
+            body = await response.aread()
+            await asyncio.to_thread(self._cache.put, url, response.status_code, dict(response.headers), body)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _RewritingTransport(httpx.AsyncBaseTransport):
+    """
+    Sends every request to the site simulator instead of its real host.
+    """
+    def __init__(self, base: str):
+        self._base = base
+        self._transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        request.url = httpx.URL(rewrite_url(str(request.url), self._base))
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def http_client(**options) -> httpx.AsyncClient:
+    """
+    Returns an `httpx.AsyncClient`, served from the page cache when it is
+    enabled and routed to the site simulator when one is set.
+    """
+    base = site_override()
+    cache = page_cache_from_config()
+    if base or cache:
+        transport = _RewritingTransport(base) if base else httpx.AsyncHTTPTransport()
+        options["transport"] = _CachingTransport(transport, cache) if cache else transport
+    return httpx.AsyncClient(**options)
@@ -5,62 +5,45 @@ import os
 from pathlib import Path
 from playwright.async_api import async_playwright
 from logger import get_logger
-from scrapers.nnols_scrapers import download_file
+from scrapers.browser import BROWSER_ARGS, BROWSER_CONTEXT_OPTIONS, goto, launch_browser, new_context
+from scrapers.nnols_scrapers import download_files
 
 log = get_logger(__name__)
 
+ACCORDION_ITEMS_JS = """cards => cards.map(card => {
+    const body = card.querySelector('.card-body');
+    return {
+        title: card.querySelector('h5.title .text')?.textContent.trim() ?? '',
+        content: body?.textContent.trim() ?? '',
+        pdf_urls: body ? Array.from(body.querySelectorAll('a[href$=".pdf"]'), a => a.getAttribute('href')).filter(Boolean) : [],
+    };
+})"""
+
 async def scrape_supreme_court_opinions():
     """
     Scrapes Supreme Court opinions from courts.navajo-nsn.gov.
     """
+    pdf_urls = []
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
         page = await context.new_page()
         try:
             log.debug("Navigating to supreme court opinions page...")
-            await page.goto("http://courts.navajo-nsn.gov/supreme-court-opinions/", wait_until="networkidle", timeout=60000)
+            await goto(page, "http://courts.navajo-nsn.gov/supreme-court-opinions/", wait_until="networkidle")
             log.debug("Supreme court opinions page loaded.")
             
-            accordion_items = await page.locator(".card").all()
+            # The collapsed card bodies are already in the DOM, so read every card at once.
+            accordion_items = await page.eval_on_selector_all(".card", ACCORDION_ITEMS_JS)
             log.info(f"Found {len(accordion_items)} accordion items.")
-            for i, item in enumerate(accordion_items):
-                log.debug(f"Processing accordion item {i+1}/{len(accordion_items)}...")
-                title_element = item.locator("h5.title .text")
-                title = await title_element.inner_text()
-                
-                # Click the title to expand the content
-                log.debug(f"Clicking title: {title}")
-                await title_element.click(force=True)
-                await page.wait_for_timeout(500)  # wait for animation
-
-                content = item.locator(".card-body")
-                log.info(f"Title: {title}")
-                
-                # also get the pdf links
-                pdf_links = await content.locator('a[href$=".pdf"]').all()
-                log.debug(f"Found {len(pdf_links)} PDF links.")
-                for j, link in enumerate(pdf_links):
-                    log.debug(f"Processing link {j+1}/{len(pdf_links)}...")
-                    pdf_url = await link.get_attribute('href')
-                    if pdf_url:
-                        file_name = pdf_url.split("/")[-1]
-                        download_path = Path("data/courts/supreme_court") / file_name
-                        await download_file(pdf_url, download_path)
-
-                log.info(f"Content: {await content.inner_text()}")
+            for item in accordion_items:
+                log.info(f"Title: {item['title']}")
+                log.debug(f"Found {len(item['pdf_urls'])} PDF links.")
+                pdf_urls.extend(item["pdf_urls"])
+                log.info(f"Content: {item['content']}")
                 log.info("-" * 20)
         except Exception as e:
             log.error(f"Failed to scrape supreme court opinions: {e}")
         finally:
-            await browser.close()
\ No newline at end of file
+            await browser.close()
+    await download_files(pdf_urls, Path("data/courts/supreme_court"), name="SupremeCourtDownloader")
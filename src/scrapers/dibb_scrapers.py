@@ -3,81 +3,70 @@ Scrapers for dibb.nnols.org.
 """
 import os
 import asyncio
+import multiprocessing
+import socket
 from pathlib import Path
 from playwright.async_api import async_playwright
 from logger import get_logger
+from tracing import span
+from scrapers.browser import BROWSER_ARGS, BROWSER_CONTEXT_OPTIONS, goto, launch_browser, new_context
+from scrapers.page_pool import PagePool
+from scrapers.lease_store import LEASE_PATH, LEASE_SECONDS, ActiveLeasesError, LeaseStore
 from scrapers.nnols_scrapers import download_file
 from queue_system import QueueManager
+from catalog import BillCatalog
+from scrapers.blob_store import blob_store
+from scrapers.integrity import check_file
 
 log = get_logger(__name__)
 
+# Number of bill pages processed concurrently, each on its own pooled page.
+BILL_WORKERS = 10
+# Number of documents checked or re-downloaded concurrently during verification.
+VERIFY_WORKERS = 10
+# Seconds a bill worker waits before checking again for expired leases.
+LEASE_POLL_INTERVAL = 5.0
 
-async def scrape_legislative_metadata():
+
+async def scrape_legislative_metadata(processes: int = 1, lease_path: Path = LEASE_PATH):
     """
     Scrapes legislative metadata from dibb.nnols.org.
+
+    Args:
+        processes: The number of worker processes to crawl bill pages with,
+            each running its own browser. With one, everything runs in this
+            process.
+        lease_path: The lease store coordinating the worker processes.
     """
+    if processes > 1:
+        await scrape_legislative_metadata_in_processes(processes, lease_path)
+        return
+
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        pool = PagePool(browser, size=BILL_WORKERS, context_options=BROWSER_CONTEXT_OPTIONS)
         
+        catalog = BillCatalog()
+        if catalog.is_empty():
+            catalog.import_json_files(Path("data/dibb/bills"))
+
         async def process_bill_page_worker(bill_url):
             """Worker coroutine that processes a single bill page."""
-            await process_bill_page(context, bill_url)
+            async with pool.page() as page:
+                await process_bill_page(page, bill_url, catalog)
 
         bill_processor_queue = QueueManager(
             worker_coro=process_bill_page_worker,
-            num_workers=10,
+            num_workers=BILL_WORKERS,
             name="BillProcessor"
         )
 
         try:
-            page = await context.new_page()
-            log.debug("Navigating to public reporting page...")
-            await page.goto("http://dibb.nnols.org/publicreporting.aspx", wait_until="networkidle", timeout=60000)
-            log.debug("Public reporting page loaded.")
-
-            # Set the number of entries to 100
-            log.debug("Setting number of entries to 100.")
-            await page.select_option("select[name='LegislationInfoTable_length']", "100")
-            await page.wait_for_timeout(1000) # wait for table to reload
-
             # Start the queue manager
+            await pool.start()
             await bill_processor_queue.start()
 
-            # Collect all bill URLs
-            bill_urls = []
-            page_num = 1
-            while True:
-                log.debug(f"Scraping page {page_num} for bill URLs...")
-                rows = await page.locator("#LegislationInfoTable tbody tr").all()
-                log.debug(f"Found {len(rows)} rows on page {page_num}.")
-                for row in rows:
-                    view_link = row.locator("a:has-text('View')")
-                    href = await view_link.get_attribute("href")
-                    if href:
-                        bill_urls.append(f"http://dibb.nnols.org/{href}")
-
-                next_button = page.locator("#LegislationInfoTable_next")
-                if "disabled" in await next_button.get_attribute("class"):
-                    log.debug("Next button is disabled. Exiting URL collection loop.")
-                    break
-                
-                log.debug("Clicking next button.")
-                await next_button.click(force=True)
-                await page.wait_for_timeout(1000) # wait for table to load
-                page_num += 1
-            
-            await page.close()
+            bill_urls = await collect_bill_urls(browser)
             
             log.info(f"Found a total of {len(bill_urls)} bill URLs. Adding to queue...")
             for bill_url in bill_urls:
@@ -86,30 +75,206 @@ async def scrape_legislative_metadata():
             log.info("All bill URLs added to the queue. Waiting for workers to finish.")
             await bill_processor_queue.join()
 
-            await verify_and_redownload_files()
+            await verify_and_redownload_files(catalog)
  
         except Exception as e:
             log.exception(f"Failed to scrape legislative metadata: {e}")
         finally:
             log.info("Closing browser and stopping queue manager.")
             await bill_processor_queue.stop()
+            await pool.close()
+            await browser.close()
+            catalog.close()
+
+
+async def collect_bill_urls(browser):
+    """
+    Returns the URL of every bill in the public reporting table.
+    """
+    context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
+    try:
+        page = await context.new_page()
+        log.debug("Navigating to public reporting page...")
+        await goto(page, "http://dibb.nnols.org/publicreporting.aspx", wait_until="networkidle")
+        log.debug("Public reporting page loaded.")
+
+        # Set the number of entries to 100
+        log.debug("Setting number of entries to 100.")
+        await page.select_option("select[name='LegislationInfoTable_length']", "100")
+        await page.wait_for_timeout(1000) # wait for table to reload
+
+        # Collect all bill URLs
+        bill_urls = []
+        page_num = 1
+        while True:
+            log.debug(f"Scraping page {page_num} for bill URLs...")
+            rows = await page.locator("#LegislationInfoTable tbody tr").all()
+            log.debug(f"Found {len(rows)} rows on page {page_num}.")
+            for row in rows:
+                view_link = row.locator("a:has-text('View')")
+                href = await view_link.get_attribute("href")
+                if href:
+                    bill_urls.append(f"http://dibb.nnols.org/{href}")
+
+            next_button = page.locator("#LegislationInfoTable_next")
+            if "disabled" in await next_button.get_attribute("class"):
+                log.debug("Next button is disabled. Exiting URL collection loop.")
+                break
+            
+            log.debug("Clicking next button.")
+            await next_button.click(force=True)
+            await page.wait_for_timeout(1000) # wait for table to load
+            page_num += 1
+        return bill_urls
+    finally:
+        await context.close()
+
+
+async def scrape_legislative_metadata_in_processes(processes: int, lease_path: Path = LEASE_PATH):
+    """
+    Scrapes legislative metadata with bill pages spread over worker processes.
+
+    The bill URLs are collected here and written to a lease store, which the
+    worker processes claim them from; each writes its bills to the common
+    catalog. Workers on other machines sharing the data directory can join
+    the crawl with `run_bill_processes`. Verification runs here once the
+    store is drained.
+    """
+    catalog = BillCatalog()
+    try:
+        if catalog.is_empty():
+            catalog.import_json_files(Path("data/dibb/bills"))
+        async with async_playwright() as p:
+            browser = await launch_browser(p, args=BROWSER_ARGS)
+            try:
+                bill_urls = await collect_bill_urls(browser)
+            finally:
+                await browser.close()
+
+        store = LeaseStore(lease_path)
+        try:
+            try:
+                store.reset(bill_urls)
+            except ActiveLeasesError as e:
+                log.error(f"Not starting a new bill crawl: {e} Join it with `zhin dibb --join` or wait for it to finish.")
+                return
+            log.info(f"Found a total of {len(bill_urls)} bill URLs. Crawling them in {processes} processes...")
+            await asyncio.to_thread(run_bill_processes, processes, lease_path)
+            counts = store.counts()
+            log.info(f"Bill crawl finished: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, "
+                     f"{store.remaining()} left unfinished.")
+            for url in store.failed():
+                log.warning(f"  - {url}")
+        finally:
+            store.close()
+
+        await verify_and_redownload_files(catalog)
+    except Exception as e:
+        log.exception(f"Failed to scrape legislative metadata: {e}")
+    finally:
+        catalog.close()
+
+
+def run_bill_processes(processes: int, lease_path: Path = LEASE_PATH) -> None:
+    """
+    Runs worker processes that crawl bills from a lease store until it is drained.
+    """
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_bill_process_main, args=(str(lease_path),), name=f"BillCrawler-{i + 1}")
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        if worker.exitcode != 0:
+            log.error(f"{worker.name} exited with code {worker.exitcode}; its leases will be reclaimed when they expire.")
+
+
+def _bill_process_main(lease_path: str) -> None:
+    asyncio.run(crawl_bill_leases(Path(lease_path)))
+
+
+async def crawl_bill_leases(lease_path: Path = LEASE_PATH, num_workers: int = BILL_WORKERS):
+    """
+    Processes bills claimed from a lease store until none are left.
+
+    Runs in each worker process, with its own browser and page pool. Leases
+    are renewed while the process is alive; a bill that fails is returned to
+    the store for another attempt.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    store = LeaseStore(lease_path)
+    catalog = BillCatalog()
+    async with async_playwright() as p:
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        pool = PagePool(browser, size=num_workers, context_options=BROWSER_CONTEXT_OPTIONS)
+        processed = 0
+
+        async def renew_leases():
+            while True:
+                await asyncio.sleep(LEASE_SECONDS / 3)
+                store.renew(owner)
+
+        async def bill_lease_worker():
+            nonlocal processed
+            while True:
+                bill_url = store.claim(owner)
+                if bill_url is None:
+                    if store.remaining() == 0:
+                        return
+                    # Everything left is leased; wait in case a lease expires.
+                    await asyncio.sleep(LEASE_POLL_INTERVAL)
+                    continue
+                async with pool.page() as page:
+                    success = await process_bill_page(page, bill_url, catalog)
+                if not success:
+                    store.release(bill_url, owner)
+                    continue
+                processed += 1
+                if not store.complete(bill_url, owner):
+                    log.warning(f"[{owner}] Lease on {bill_url} ran out before it finished; another worker has it now.")
+
+        renewer = asyncio.create_task(renew_leases())
+        try:
+            await pool.start()
+            await asyncio.gather(*(bill_lease_worker() for _ in range(num_workers)))
+            log.info(f"[{owner}] Processed {processed} bills.")
+        finally:
+            renewer.cancel()
+            await pool.close()
             await browser.close()
+            catalog.close()
+            store.close()
+
 
+async def process_bill_page(page, bill_url, catalog) -> bool:
+    """
+    Scrapes a bill page, downloads its documents and writes it to the catalog.
+
+    Returns:
+        Whether the bill was saved; failures are logged, not raised.
+    """
+    with span("dibb.bill", url=bill_url):
+        return await _process_bill_page(page, bill_url, catalog)
 
-async def process_bill_page(context, bill_url):
+
+async def _process_bill_page(page, bill_url, catalog):
     log.debug(f"Processing bill URL: {bill_url}")
-    page = await context.new_page()
     try:
-        await page.goto(bill_url, wait_until="networkidle", timeout=60000)
+        with span("dibb.navigate", url=bill_url):
+            await goto(page, bill_url, wait_until="networkidle")
         log.debug(f"Bill page loaded: {bill_url}")
 
         # Scrape metadata
-        legislation_number = await page.locator("#ContentPlaceHolder1_divLegislationNumber").inner_text()
-        legislation_title = await page.locator("#ContentPlaceHolder1_divLegislationTitle").inner_text()
-        legislation_description = await page.locator("#ContentPlaceHolder1_divLegislationDescription").inner_text()
-        sponsor = await page.locator("#ContentPlaceHolder1_divSponsor").inner_text()
-        co_sponsors = await page.locator("#ContentPlaceHolder1_divCoSponsor").inner_text()
-        status = await page.locator("#ContentPlaceHolder1_divStatus").inner_text()
+        with span("dibb.extract_metadata", url=bill_url):
+            legislation_number = await page.locator("#ContentPlaceHolder1_divLegislationNumber").inner_text()
+            legislation_title = await page.locator("#ContentPlaceHolder1_divLegislationTitle").inner_text()
+            legislation_description = await page.locator("#ContentPlaceHolder1_divLegislationDescription").inner_text()
+            sponsor = await page.locator("#ContentPlaceHolder1_divSponsor").inner_text()
+            co_sponsors = await page.locator("#ContentPlaceHolder1_divCoSponsor").inner_text()
+            status = await page.locator("#ContentPlaceHolder1_divStatus").inner_text()
 
         metadata = {
             "url": bill_url,
@@ -125,8 +290,9 @@ async def process_bill_page(context, bill_url):
         # Set the number of entries to 100 for the documents table
         try:
             log.debug("Attempting to set number of entries to 100 for documents table.")
-            await page.select_option("select[name='DataTables_Table_0_length']", "100", timeout=5000)
-            await page.wait_for_timeout(1000) # wait for table to reload
+            with span("dibb.expand_documents", url=bill_url):
+                await page.select_option("select[name='DataTables_Table_0_length']", "100", timeout=5000)
+                await page.wait_for_timeout(1000) # wait for table to reload
         except Exception:
             log.warning(f"Could not set 'DataTables_Table_0_length' on {bill_url}. The table may not exist or already show all entries.")
 
@@ -144,87 +310,108 @@ async def process_bill_page(context, bill_url):
                 
                 document_title = await pdf_link.inner_text()
                 
-                metadata["documents"].append({
+                document = {
                     "title": document_title,
                     "url": full_pdf_url,
                     "local_path": str(download_path),
                     "download_status": download_status
-                })
+                }
+                if download_status == "Success":
+                    document.update(download_fingerprint(download_path))
+                metadata["documents"].append(document)
         
         # Save metadata
-        metadata_filename = legislation_number.replace("/", "-") + ".json"
-        metadata_path = Path("data/dibb/bills") / metadata_filename
-        with open(metadata_path, "w") as f:
-            import json
-            json.dump(metadata, f, indent=4)
-        log.info(f"Saved metadata for {legislation_number} to {metadata_path}")
+        with span("dibb.catalog_write", url=bill_url):
+            catalog.upsert_bill(metadata)
+        log.info(f"Saved metadata for {legislation_number} to {catalog.path}")
+        return True
 
     except Exception:
         log.exception(f"Failed to process bill page: {bill_url}")
-    finally:
-        await page.close()
+        return False
 
 
-async def verify_and_redownload_files():
+def download_fingerprint(path: Path) -> dict:
+    """
+    Returns the size and SHA-256 of a file as recorded when it was
+    downloaded, or nothing for files that predate the blob store.
+    """
+    ref = blob_store().ref(path)
+    return {"size": ref["size"], "sha256": ref["sha256"]} if ref else {}
+
+
+async def verify_and_redownload_files(catalog, num_workers=VERIFY_WORKERS):
    """
-   Verifies that all files listed in the metadata exist, and retries downloading any that are missing.
+   Verifies every downloaded document against the catalog and re-downloads missing or corrupt ones.
+
+   Each file is checked for existence, the size and hash recorded when it
+   was downloaded, and, for PDFs, a header and %%EOF trailer. A file that
+   was already damaged when it was first verified is therefore still
+   caught. Checks and re-downloads run concurrently through a worker pool.
    """
    log.info("Starting verification and re-download process...")
-   metadata_dir = Path("data/dibb/bills")
-   json_files = list(metadata_dir.glob("*.json"))
-   
-   if not json_files:
-       log.warning("No metadata files found to verify.")
+   # Files that were not found on the server are not retried. A document
+   # attached to several bills is listed once per bill but checked once.
+   documents = list({doc["url"]: doc for doc in catalog.documents(exclude_status=["Not Found"])}.values())
+   if not documents:
+       log.warning("No documents in the catalog to verify.")
        return
 
-   failed_downloads = []
-   for json_file in json_files:
-       with open(json_file, "r") as f:
-           import json
-           try:
-               metadata = json.load(f)
-               for doc in metadata.get("documents", []):
-                   # Check for "Failed" status and also if the file doesn't exist, just in case.
-                   if doc.get("download_status") == "Failed" or not Path(doc.get("local_path", "")).exists():
-                       # But don't try to re-download files that were not found.
-                       if doc.get("download_status") != "Not Found":
-                           failed_downloads.append(doc)
-           except json.JSONDecodeError:
-               log.error(f"Could not decode JSON from {json_file}")
-
-   if failed_downloads:
-       log.info(f"Found {len(failed_downloads)} failed or missing downloads. Retrying...")
-       for doc in failed_downloads:
-           url = doc.get("url")
-           path_str = doc.get("local_path")
-           if url and path_str:
-               path = Path(path_str)
-               log.info(f"Retrying download for {url}")
-               await download_file(url, path)
-           else:
-               log.warning(f"Skipping retry for document due to missing URL or path in metadata: {doc.get('title')}")
+   results = {"intact": 0, "redownloaded": 0, "failed": []}
 
-   else:
-       log.info("No failed downloads to retry.")
-
-   # Final verification
-   log.info("Performing final verification of all documents...")
-   missing_files_after_retry = []
-   for json_file in json_files:
-       with open(json_file, "r") as f:
-           import json
-           try:
-               metadata = json.load(f)
-               for doc in metadata.get("documents", []):
-                   path_str = doc.get("local_path")
-                   if not path_str or not Path(path_str).exists():
-                       missing_files_after_retry.append(doc)
-           except json.JSONDecodeError:
-               log.error(f"Could not decode JSON from {json_file}")
-
-   if missing_files_after_retry:
-       log.warning(f"Found {len(missing_files_after_retry)} missing files after final verification:")
-       for doc in missing_files_after_retry:
+   async def verify_document(doc):
+       try:
+           await check_document(doc)
+       except Exception as e:
+           log.exception(f"Failed to verify {doc.get('local_path')}: {e}")
+           results["failed"].append(doc)
+
+   async def check_document(doc):
+       url = doc.get("url")
+       path_str = doc.get("local_path")
+       if not url or not path_str:
+           log.warning(f"Skipping document due to missing URL or path in metadata: {doc.get('title')}")
+           return
+       path = Path(path_str)
+       expected = {"size": doc.get("size"), "sha256": doc.get("sha256")}
+       if expected["sha256"] is None:
+           # Catalogs written before fingerprints were recorded at download time.
+           expected.update(download_fingerprint(path))
+       problem = await asyncio.to_thread(check_file, path, expected["size"], expected["sha256"])
+       if problem is None:
+           if doc.get("sha256") is None and expected["sha256"] is not None:
+               catalog.set_download_status(url, "Success", expected["size"], expected["sha256"])
+           elif doc.get("download_status") != "Success":
+               catalog.set_download_status(url, "Success")
+           results["intact"] += 1
+           return
+
+       log.info(f"Re-downloading {url} ({path}: {problem})")
+       if path.exists():
+           path.unlink()
+       status = await download_file(url, path)
+       if status == "Success":
+           problem = await asyncio.to_thread(check_file, path)
+       if status == "Success" and problem is None:
+           fingerprint = download_fingerprint(path)
+           catalog.set_download_status(url, status, fingerprint.get("size"), fingerprint.get("sha256"))
+           results["redownloaded"] += 1
+       else:
+           catalog.set_download_status(url, status if status != "Success" else "Failed")
+           results["failed"].append(doc)
+
+   verify_queue = QueueManager(worker_coro=verify_document, num_workers=num_workers, name="DocumentVerifier")
+   await verify_queue.start()
+   try:
+       for doc in documents:
+           await verify_queue.add_task(doc)
+       await verify_queue.join()
+   finally:
+       await verify_queue.stop()
+
+   log.info(f"Verified {len(documents)} documents: {results['intact']} intact, {results['redownloaded']} re-downloaded, {len(results['failed'])} still missing or corrupt.")
+   if results["failed"]:
+       for doc in results["failed"]:
            log.warning(f"  - {doc.get('local_path')} (from {doc.get('url')})")
    else:
-       log.info("All files verified successfully.")
\ No newline at end of file
+       log.info("All files verified successfully.")
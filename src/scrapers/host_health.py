@@ -0,0 +1,148 @@
+"""
+Per-host health tracking: a circuit breaker and adaptive timeouts.
+
+Every navigation and download reports its outcome for its host. After
+`FAILURE_THRESHOLD` consecutive failures the host's circuit opens: workers
+about to contact it wait instead of each spending a full timeout on it.
+Once the cool-down has passed, a single request is let through as a probe;
+if it succeeds the circuit closes and the waiting workers resume, if it
+fails, or ends without reporting an outcome, the circuit opens again for
+twice as long. A host that stays down
+for `GIVE_UP_AFTER` seconds is given up on, and requests to it fail with
+`HostUnavailable` at once so the rest of the queue drains.
+
+Navigation timeouts follow the host's observed latency: a multiple of the
+95th percentile of recent successful navigations, within fixed bounds,
+instead of a flat minute.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from logger import get_logger
+
+log = get_logger(__name__)
+
+FAILURE_THRESHOLD = 5
+COOLDOWN = 15.0
+MAX_COOLDOWN = 240.0
+GIVE_UP_AFTER = 900.0
+
+DEFAULT_TIMEOUT = 60.0
+MIN_TIMEOUT = 10.0
+MAX_TIMEOUT = 60.0
+TIMEOUT_PERCENTILE = 0.95
+TIMEOUT_MULTIPLIER = 3.0
+# Latency samples kept per host, and needed before timeouts adapt.
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 10
+
+
+class HostUnavailable(Exception):
+    """
+    Raised instead of contacting a host that has been failing for too long.
+    """
+
+
+class HostHealth:
+    """
+    The circuit state and recent navigation latencies of one host.
+
+    The circuit is "closed" while the host is healthy, "open" while requests
+    are held back, and "half_open" while a single probe is in flight.
+    """
+    def __init__(self, host: str):
+        self.host = host
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = COOLDOWN
+        self.retry_at = 0.0
+        self.down_since: Optional[float] = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def timeout(self) -> float:
+        """
+        Returns the navigation timeout in seconds.
+        """
+        if len(self.latencies) < MIN_SAMPLES:
+            return DEFAULT_TIMEOUT
+        ordered = sorted(self.latencies)
+        percentile = ordered[min(len(ordered) - 1, int(TIMEOUT_PERCENTILE * len(ordered)))]
+        return max(MIN_TIMEOUT, min(MAX_TIMEOUT, TIMEOUT_MULTIPLIER * percentile))
+
+    async def before_request(self) -> bool:
+        """
+        Waits until a request to the host may be sent.
+
+        Returns:
+            True if the request is the probe of a half-open circuit; pass
+            it to `end_request` once the request is over.
+
+        Raises:
+            HostUnavailable: If the host has been down for longer than GIVE_UP_AFTER.
+        """
+        while self.state != "closed":
+            now = time.monotonic()
+            if self.down_since is not None and now - self.down_since > GIVE_UP_AFTER:
+                raise HostUnavailable(f"{self.host} has been failing for {now - self.down_since:.0f}s")
+            if self.state == "open" and now >= self.retry_at:
+                log.info(f"Probing {self.host} after {self.cooldown:.0f}s.")
+                self.state = "half_open"
+                return True
+            await asyncio.sleep(min(1.0, max(0.05, self.retry_at - now)))
+        return False
+
+    def end_request(self, probe: bool) -> None:
+        """
+        Counts a probe that ended without recording an outcome, e.g. because
+        it was cancelled, as a failure, so the circuit never stays half-open.
+        """
+        if probe and self.state == "half_open":
+            log.warning(f"Probe of {self.host} ended without an answer.")
+            self.record_failure()
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        """
+        Records a completed request, with its latency if it was a navigation.
+        """
+        if latency is not None:
+            self.latencies.append(latency)
+        if self.state != "closed":
+            log.info(f"{self.host} is responding again; resuming requests.")
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = COOLDOWN
+        self.down_since = None
+
+    def record_failure(self) -> None:
+        """
+        Records a request the host failed (a 5xx, timeout or connection
+        error), opening the circuit when due.
+        """
+        self.failures += 1
+        if self.state == "half_open":
+            self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+            self._open()
+        elif self.state == "closed" and self.failures >= FAILURE_THRESHOLD:
+            self.down_since = time.monotonic()
+            self._open()
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.retry_at = time.monotonic() + self.cooldown
+        log.warning(f"{self.host} failed {self.failures} times in a row; pausing requests to it for {self.cooldown:.0f}s.")
+
+
+_hosts: Dict[str, HostHealth] = {}
+
+
+def host_health(url: str) -> HostHealth:
+    """
+    Returns the health record of a URL's host.
+    """
+    host = urlsplit(url).hostname or url
+    health = _hosts.get(host)
+    if health is None:
+        health = _hosts[host] = HostHealth(host)
+    return health
@@ -0,0 +1,67 @@
+"""
+Integrity checks for downloaded files.
+"""
+import hashlib
+from pathlib import Path
+from typing import Optional, Tuple
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# The PDF header must appear near the start of the file and the %%EOF
+# trailer near the end; trailing whitespace or junk after it is common.
+PDF_HEADER_WINDOW = 1024
+PDF_TRAILER_WINDOW = 2048
+
+
+def file_fingerprint(path: Path) -> Tuple[int, str]:
+    """
+    Returns the size and SHA-256 of a file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def has_pdf_structure(path: Path) -> bool:
+    """
+    Checks that a file has a PDF header and an end-of-file trailer.
+
+    A truncated download keeps its header but loses the trailer.
+    """
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        head = f.read(PDF_HEADER_WINDOW)
+        f.seek(max(0, size - PDF_TRAILER_WINDOW))
+        tail = f.read()
+    return b"%PDF-" in head and b"%%EOF" in tail
+
+
+def check_file(path: Path, expected_size: Optional[int] = None, expected_sha256: Optional[str] = None) -> Optional[str]:
+    """
+    Verifies a downloaded file.
+
+    Args:
+        path: The file to check.
+        expected_size: The size recorded at download time, if known.
+        expected_sha256: The hash recorded at download time, if known.
+
+    Returns:
+        None if the file is intact, otherwise a short reason it is not.
+    """
+    if not path.exists():
+        return "missing"
+    size = path.stat().st_size
+    if size == 0:
+        return "empty"
+    if expected_size is not None and size != expected_size:
+        return f"size {size} != {expected_size}"
+    if path.suffix.lower() == ".pdf" and not has_pdf_structure(path):
+        return "truncated or invalid PDF"
+    if expected_sha256 is not None and file_fingerprint(path)[1] != expected_sha256:
+        return "hash mismatch"
+    return None
@@ -0,0 +1,171 @@
+"""
+A SQLite work queue that hands out time-limited leases on URLs.
+
+Crawls that run in several processes, or on several machines sharing the
+data directory, share one lease store instead of an in-memory queue. A
+worker claims a URL, which leases it to that worker for `LEASE_SECONDS`;
+it renews its leases while it works and marks each URL done or failed
+when it finishes. A lease that runs out, because its worker crashed or
+its machine went away, makes the URL claimable again, and a URL that has
+been claimed `MAX_ATTEMPTS` times without finishing is marked failed.
+
+Lease expiry uses the wall clock, so machines sharing a store need
+roughly synchronised clocks. The store uses SQLite's rollback journal
+rather than WAL, whose shared-memory index does not work across machines,
+and it needs a filesystem whose locking works, e.g. a local disk or NFSv4,
+not SMB.
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from logger import get_logger
+
+log = get_logger(__name__)
+
+LEASE_PATH = Path("data/dibb/leases.sqlite")
+LEASE_SECONDS = 300.0
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS leases_state ON leases (state, expires);
+"""
+
+
+class ActiveLeasesError(Exception):
+    """
+    Raised when resetting a store that workers still hold leases in.
+    """
+
+
+class LeaseStore:
+    """
+    URLs to crawl and their state: "pending", "leased", "done" or "failed".
+    """
+    def __init__(self, path: Path = LEASE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # Autocommit mode, so claims can take the write lock up front with BEGIN IMMEDIATE.
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.executescript(_SCHEMA)
+
+    def reset(self, urls: Iterable[str]) -> None:
+        """
+        Replaces the store's contents with a new crawl of `urls`, claimed in order.
+
+        Raises:
+            ActiveLeasesError: If a worker holds an unexpired lease, i.e. a
+                crawl is still running on the store.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            active = self._db.execute(
+                "SELECT COUNT(*) FROM leases WHERE state = 'leased' AND expires >= ?", (time.time(),)
+            ).fetchone()[0]
+            if active:
+                raise ActiveLeasesError(f"{self.path} has {active} active leases; a crawl is still using it.")
+            self._db.execute("DELETE FROM leases")
+            self._db.executemany("INSERT OR IGNORE INTO leases (url) VALUES (?)", ((url,) for url in urls))
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def claim(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> Optional[str]:
+        """
+        Leases the next pending URL, or one whose lease has run out, to `owner`.
+
+        Returns:
+            The URL, or None if nothing is claimable right now.
+        """
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self._db.execute(
+                    "SELECT url, state, owner, attempts FROM leases "
+                    "WHERE state = 'pending' OR (state = 'leased' AND expires < ?) ORDER BY rowid LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None or row[1] == "pending" or row[3] < MAX_ATTEMPTS:
+                    break
+                # A URL whose workers keep dying is not handed out again.
+                log.warning(f"Lease on {row[0]} expired after {row[3]} attempts; marking it failed.")
+                self._db.execute("UPDATE leases SET state = 'failed', owner = NULL, expires = NULL WHERE url = ?", (row[0],))
+            if row is not None:
+                self._db.execute(
+                    "UPDATE leases SET state = 'leased', owner = ?, expires = ?, attempts = attempts + 1 WHERE url = ?",
+                    (owner, now + lease_seconds, row[0]),
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        if row[1] == "leased":
+            log.warning(f"Lease on {row[0]} held by {row[2]} expired; reclaimed by {owner}.")
+        return row[0]
+
+    def renew(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> int:
+        """
+        Extends every lease `owner` holds.
+
+        Returns:
+            The number of leases renewed.
+        """
+        return self._db.execute(
+            "UPDATE leases SET expires = ? WHERE state = 'leased' AND owner = ?", (time.time() + lease_seconds, owner)
+        ).rowcount
+
+    def complete(self, url: str, owner: str) -> bool:
+        """
+        Marks a URL leased to `owner` done.
+
+        Returns:
+            False if `owner` no longer holds the lease, e.g. because it
+            expired and another worker claimed the URL.
+        """
+        return self._db.execute(
+            "UPDATE leases SET state = 'done', owner = NULL, expires = NULL "
+            "WHERE url = ? AND state = 'leased' AND owner = ?",
+            (url, owner),
+        ).rowcount > 0
+
+    def release(self, url: str, owner: str) -> bool:
+        """
+        Returns a URL leased to `owner` whose crawl failed to the queue, or
+        marks it failed once it has used up its attempts.
+
+        Returns:
+            False if `owner` no longer holds the lease.
+        """
+        return self._db.execute(
+            "UPDATE leases SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner = NULL, expires = NULL WHERE url = ? AND state = 'leased' AND owner = ?",
+            (MAX_ATTEMPTS, url, owner),
+        ).rowcount > 0
+
+    def remaining(self) -> int:
+        """
+        Returns the number of URLs not yet done or failed.
+        """
+        return self._db.execute("SELECT COUNT(*) FROM leases WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._db.execute("SELECT state, COUNT(*) FROM leases GROUP BY state").fetchall())
+
+    def failed(self) -> List[str]:
+        return [row[0] for row in self._db.execute("SELECT url FROM leases WHERE state = 'failed' ORDER BY rowid")]
+
+    def close(self) -> None:
+        self._db.close()
@@ -6,81 +6,61 @@ from pathlib import Path
 import httpx
 from playwright.async_api import async_playwright
 from logger import get_logger
-from scrapers.nnols_scrapers import download_file
+from scrapers.browser import BROWSER_ARGS, BROWSER_CONTEXT_OPTIONS, goto, launch_browser, new_context
+from scrapers.nnols_scrapers import download_files
 
 log = get_logger(__name__)
 
+ACCORDION_ITEMS_JS = """items => items.map(item => {
+    const content = item.querySelector('.et_pb_toggle_content');
+    return {
+        title: item.querySelector('.et_pb_toggle_title')?.textContent.trim() ?? '',
+        content: content?.textContent.trim() ?? '',
+        pdf_urls: content ? Array.from(content.querySelectorAll('a[href$=".pdf"]'), a => a.getAttribute('href')).filter(Boolean) : [],
+    };
+})"""
+
 async def scrape_bills_and_resolutions():
     """
     Scrapes bills and resolutions from navajonationcouncil.org.
     """
+    pdf_urls = []
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
         page = await context.new_page()
         try:
             log.debug("Navigating to bills and resolutions page...")
-            await page.goto("https://www.navajonationcouncil.org/legislation-2025/", wait_until="networkidle", timeout=60000)
+            await goto(page, "https://www.navajonationcouncil.org/legislation-2025/", wait_until="networkidle")
             log.debug("Bills and resolutions page loaded.")
             
-            accordion_items = await page.locator(".et_pb_accordion_item").all()
+            # The collapsed accordion content is already in the DOM, so read every item at once.
+            accordion_items = await page.eval_on_selector_all(".et_pb_accordion_item", ACCORDION_ITEMS_JS)
             log.debug(f"Found {len(accordion_items)} accordion items.")
-            for i, item in enumerate(accordion_items):
-                log.debug(f"Processing accordion item {i+1}/{len(accordion_items)}...")
-                title = item.locator(".et_pb_toggle_title")
-                await title.click(force=True)
-                await page.wait_for_timeout(500) # wait for animation
-                content = item.locator(".et_pb_toggle_content")
-                log.info(f"Title: {await title.inner_text()}")
-                log.info(f"Content: {await content.inner_text()}")
-                
-                pdf_links = await content.locator('a[href$=".pdf"]').all()
-                log.debug(f"Found {len(pdf_links)} PDF links.")
-                for j, link in enumerate(pdf_links):
-                    log.debug(f"Processing link {j+1}/{len(pdf_links)}...")
-                    pdf_url = await link.get_attribute('href')
-                    if pdf_url:
-                        file_name = pdf_url.split("/")[-1]
-                        download_path = Path("data/navajonationcouncil/bills_and_resolutions") / file_name
-                        await download_file(pdf_url, download_path)
-
+            for item in accordion_items:
+                log.info(f"Title: {item['title']}")
+                log.info(f"Content: {item['content']}")
+                log.debug(f"Found {len(item['pdf_urls'])} PDF links.")
+                pdf_urls.extend(item["pdf_urls"])
                 log.info("-" * 20)
         except Exception as e:
             log.error(f"Failed to scrape bills and resolutions: {e}")
         finally:
             await browser.close()
+    await download_files(pdf_urls, Path("data/navajonationcouncil/bills_and_resolutions"),
+                         name="BillsAndResolutionsDownloader")
 
 async def scrape_council_member_data():
     """
     Scrapes council member data from navajonationcouncil.org.
     """
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
         page = await context.new_page()
         try:
             log.debug("Navigating to council member page...")
-            await page.goto("https://www.navajonationcouncil.org/council/", wait_until="networkidle", timeout=60000)
+            await goto(page, "https://www.navajonationcouncil.org/council/", wait_until="networkidle")
             log.debug("Council member page loaded.")
             
             accordion_items = await page.locator(".et_pb_accordion_item").all()
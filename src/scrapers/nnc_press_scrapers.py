@@ -2,113 +2,199 @@
 Scrapers for Navajo Nation Council press releases.
 """
 import asyncio
+import json
 import re
 from pathlib import Path
+from urllib.parse import urljoin
 from playwright.async_api import async_playwright, Page
 from logger import get_logger
+from tracing import span
+from scrapers.browser import BROWSER_ARGS, BROWSER_CONTEXT_OPTIONS, goto, http_client, launch_browser, new_context
 from scrapers.nnols_scrapers import download_file
+from scrapers.wordpress import (
+    Element, WordPressAPIError, fetch_page, load_sync_state, parse_html, save_sync_state,
+)
 from queue_system import QueueManager
 from progress import ProgressBar
 
 log = get_logger(__name__)
 
-async def scrape_press_releases(start_year=2016):
+COUNCIL_SITE = "https://www.navajonationcouncil.org"
+ARCHIVE_SLUG = "press-releases-archive"
+PRESS_DIR = Path("data/nnc_press_releases")
+
+# Lists {url, title, date} for each release in the archive's year tabs from start_year on.
+ARCHIVE_RELEASES_JS = """
+(start_year) => {
+    const releases = [];
+    const tabControls = document.querySelectorAll('ul.et_pb_tabs_controls > li > a');
+    const tabPanels = document.querySelectorAll('div.et_pb_tab');
+
+    tabControls.forEach((control, index) => {
+        const controlText = control.innerText;
+        const yearMatch = controlText.match(/\\b(20\\d{2})\\b/);
+        if (!yearMatch) {
+            return;
+        }
+
+        const year = parseInt(yearMatch[1], 10);
+        if (year < start_year) {
+            return;
+        }
+
+        const panel = tabPanels[index];
+        if (!panel) return;
+
+        const listItems = panel.querySelectorAll('li');
+        listItems.forEach(item => {
+            const fullText = item.innerText;
+            const dateMatch = fullText.match(/(\\d{1,2}\\/\\d{1,2}\\/\\d{4})/);
+            if (!dateMatch) {
+                return;
+            }
+            const date = dateMatch[1];
+            const title = fullText.replace(date, '').replace('–', '').trim();
+            const link = item.querySelector('a');
+            if (link) {
+                const url = link.href;
+                releases.push({ url, title, date });
+            }
+        });
+    });
+    return releases;
+}
+"""
+
+async def scrape_press_releases(start_year=2016, use_api=True, full=False):
     """
     Scrapes press releases from the Navajo Nation Council website.
+
+    Reads the archive page from the WordPress REST API when it is available,
+    and falls back to rendering it in the browser otherwise.
+
+    Args:
+        start_year: The earliest year of press releases to fetch.
+        use_api: Try the REST API first.
+        full: Process the archive even if it has not changed since the last crawl.
+    """
+    if use_api:
+        try:
+            await scrape_press_releases_api(start_year, full=full)
+            return
+        except WordPressAPIError as e:
+            log.warning(f"Council REST API unavailable, falling back to the browser: {e}")
+    await scrape_press_releases_browser(start_year)
+
+def archive_press_releases(archive: Element, start_year: int) -> list:
+    """
+    Lists the press releases in the archive page's year tabs, mirroring
+    `ARCHIVE_RELEASES_JS`.
+    """
+    releases = []
+    controls = [li.find("a") for tabs in archive.find_all("ul", "et_pb_tabs_controls") for li in tabs.find_all("li")]
+    controls = [control for control in controls if control]
+    panels = archive.find_all("div", "et_pb_tab")
+    for control, panel in zip(controls, panels):
+        year_match = re.search(r"\b(20\d{2})\b", control.text())
+        if not year_match or int(year_match.group(1)) < start_year:
+            continue
+        for item in panel.find_all("li"):
+            full_text = item.text()
+            date_match = re.search(r"(\d{1,2}/\d{1,2}/\d{4})", full_text)
+            link = item.find("a")
+            if not date_match or not link or not link.attrs.get("href"):
+                continue
+            date = date_match.group(1)
+            title = full_text.replace(date, "", 1).replace("–", "", 1).strip()
+            releases.append({"url": urljoin(COUNCIL_SITE + "/", link.attrs["href"]), "title": title, "date": date})
+    return releases
+
+async def scrape_press_releases_api(start_year=2016, full=False):
+    """
+    Processes the press releases listed on the archive page as served by the REST API.
+
+    Raises:
+        WordPressAPIError: If the API is unavailable or the archive lists no releases.
+    """
+    state_key = f"{COUNCIL_SITE}/{ARCHIVE_SLUG}/"
+    modified_after = None if full else load_sync_state(state_key)
+    async with http_client(timeout=60) as client:
+        with span("nnc_press.api_fetch", modified_after=modified_after):
+            archive = await fetch_page(client, COUNCIL_SITE, ARCHIVE_SLUG, modified_after=modified_after)
+    if archive is None:
+        log.info(f"Press release archive unchanged since {modified_after}.")
+        unfinished = unfinished_press_releases()
+        if unfinished:
+            log.info(f"Retrying {len(unfinished)} press releases whose download failed or went missing.")
+            await process_press_releases(unfinished)
+        return
+    releases = archive_press_releases(parse_html(archive.get("content", {}).get("rendered", "")), start_year)
+    if not releases:
+        raise WordPressAPIError("the archive page's rendered content lists no press releases")
+    log.info(f"Found a total of {len(releases)} press releases through the REST API.")
+    await process_press_releases(releases)
+    save_sync_state(state_key, archive["modified"])
+
+def unfinished_press_releases() -> list:
+    """
+    Lists the releases, as {url, title, date}, whose metadata records a
+    failed download or whose file is missing.
+    """
+    releases = []
+    for metadata_path in sorted(PRESS_DIR.glob("*.json")):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        if metadata.get("download_status") != "Success" or not Path(metadata.get("local_path", "")).is_file():
+            releases.append({key: metadata[key] for key in ("url", "title", "date")})
+    return releases
+
+async def process_press_releases(releases):
+    """
+    Downloads press releases and writes their metadata through a worker pool.
+    """
+    progress_bar = ProgressBar(len(releases), text="Downloading Press Releases")
+
+    async def worker_with_progress(task_data):
+        await process_press_release(task_data)
+        progress_bar.update()
+
+    press_release_queue = QueueManager(
+        worker_coro=worker_with_progress,
+        num_workers=10,
+        name="PressReleaseProcessor"
+    )
+    await press_release_queue.start()
+    try:
+        for release_data in releases:
+            await press_release_queue.add_task(release_data)
+        await press_release_queue.join()
+        progress_bar.finish()
+    finally:
+        await press_release_queue.stop()
+
+async def scrape_press_releases_browser(start_year=2016):
+    """
+    Scrapes press releases from the archive page rendered in the browser.
     """
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
         page = await context.new_page()
 
         try:
             log.info("Navigating to press releases archive page...")
-            await page.goto("https://www.navajonationcouncil.org/press-releases-archive/", wait_until="networkidle", timeout=60000)
+            await goto(page, f"{COUNCIL_SITE}/{ARCHIVE_SLUG}/", wait_until="networkidle")
             log.info("Press releases archive page loaded.")
 
-            press_release_queue = QueueManager(
-                worker_coro=process_press_release,
-                num_workers=10,
-                name="PressReleaseProcessor"
-            )
-            await press_release_queue.start()
-
-            all_press_releases = []
-            
             log.info("Extracting all press releases in a single batch...")
-            all_press_releases = await page.evaluate("""
-                (start_year) => {
-                    const releases = [];
-                    const tabControls = document.querySelectorAll('ul.et_pb_tabs_controls > li > a');
-                    const tabPanels = document.querySelectorAll('div.et_pb_tab');
-
-                    tabControls.forEach((control, index) => {
-                        const controlText = control.innerText;
-                        const yearMatch = controlText.match(/\\b(20\\d{2})\\b/);
-                        if (!yearMatch) {
-                            return;
-                        }
-
-                        const year = parseInt(yearMatch[1], 10);
-                        if (year < start_year) {
-                            return;
-                        }
-
-                        const panel = tabPanels[index];
-                        if (!panel) return;
-
-                        const listItems = panel.querySelectorAll('li');
-                        listItems.forEach(item => {
-                            const fullText = item.innerText;
-                            const dateMatch = fullText.match(/(\\d{1,2}\\/\\d{1,2}\\/\\d{4})/);
-                            if (!dateMatch) {
-                                return;
-                            }
-                            const date = dateMatch[1];
-                            const title = fullText.replace(date, '').replace('–', '').trim();
-                            const link = item.querySelector('a');
-                            if (link) {
-                                const url = link.href;
-                                releases.push({ url, title, date });
-                            }
-                        });
-                    });
-                    return releases;
-                }
-            """, start_year)
-
-            
+            all_press_releases = await page.evaluate(ARCHIVE_RELEASES_JS, start_year)
             log.info(f"Found a total of {len(all_press_releases)} press releases. Adding to queue...")
-            
-            progress_bar = ProgressBar(len(all_press_releases), text="Downloading Press Releases")
-            
-            async def worker_with_progress(task_data):
-                await process_press_release(task_data)
-                progress_bar.update()
-
-            press_release_queue.worker_coro = worker_with_progress
-
-            for release_data in all_press_releases:
-                await press_release_queue.add_task(release_data)
-
-            await press_release_queue.join()
-            progress_bar.finish()
+            await process_press_releases(all_press_releases)
 
         except Exception as e:
             log.exception(f"Failed to scrape press releases: {e}")
         finally:
             log.info("Closing browser.")
-            await press_release_queue.stop()
             await browser.close()
 
 async def process_press_release(data):
@@ -120,8 +206,8 @@ async def process_press_release(data):
         title = data["title"]
         date_text = data["date"]
         
-        download_dir = Path("data/nnc_press_releases")
-        download_dir.mkdir(exist_ok=True)
+        download_dir = PRESS_DIR
+        download_dir.mkdir(parents=True, exist_ok=True)
         
         file_name = url.split("/")[-1]
         download_path = download_dir / file_name
@@ -138,8 +224,7 @@ async def process_press_release(data):
 
         metadata_filename = file_name.replace(".pdf", ".json")
         metadata_path = download_dir / metadata_filename
-        with open(metadata_path, "w") as f:
-            import json
+        with span("nnc_press.write_metadata", path=metadata_path), open(metadata_path, "w") as f:
             json.dump(metadata, f, indent=4)
         
         if download_status == "Success":
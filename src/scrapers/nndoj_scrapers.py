@@ -6,6 +6,7 @@ from pathlib import Path
 import httpx
 from playwright.async_api import async_playwright
 from logger import get_logger
+from scrapers.browser import goto, launch_browser, new_context
 import json
 from urllib.parse import urljoin, quote
 from queue_system import QueueManager
@@ -30,8 +31,8 @@ async def scrape_nndoj_roster(headless=True):
     ]
 
     async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=headless)
-        context = await browser.new_context()
+        browser = await launch_browser(p, headless=headless)
+        context = await new_context(browser)
         page = await context.new_page()
 
         all_staff = []
@@ -39,7 +40,7 @@ async def scrape_nndoj_roster(headless=True):
             try:
                 department = url.split("/")[-1]
                 log.info(f"Scraping roster for {department}...")
-                await page.goto(url, timeout=60000)
+                await goto(page, url)
                 staff = await process_roster_page(page)
                 for person in staff:
                     person["department"] = department
@@ -3,123 +3,259 @@ Scrapers for nnols.org.
 """
 import os
 import asyncio
+import hashlib
+import json
 from pathlib import Path
+from typing import Optional, Tuple
 import httpx
 from playwright.async_api import async_playwright
 from logger import get_logger
+from tracing import span
+from scrapers.browser import BROWSER_ARGS, BROWSER_CONTEXT_OPTIONS, goto, http_client, launch_browser, new_context
+from queue_system import QueueManager
+from scrapers.blob_store import blob_store
+from scrapers.host_health import HostUnavailable, host_health
 
 log = get_logger(__name__)
 
+# Number of files each scraper downloads concurrently.
+DOWNLOAD_WORKERS = 8
+
+# Returns the href of every PDF link under the elements it is evaluated on.
+PDF_HREFS_JS = "elements => elements.map(element => element.getAttribute('href')).filter(Boolean)"
+
 async def download_file(url: str, download_path: Path, retries=3, delay=5) -> str:
     """
     Downloads a file from a given URL to a specified path with retries.
+
+    Bytes are streamed to a `.part` file next to the destination, which is
+    kept when a transfer breaks off. The next attempt, or the next run,
+    asks only for the rest with a Range request; If-Range with the ETag or
+    Last-Modified date seen at the start makes the server send the whole
+    file again if it changed, as it also does when it ignores ranges.
+
     Returns a status string: "Success", "Not Found", or "Failed".
     """
+    with span("download_file", url=url, path=download_path) as trace:
+        trace["status"] = await _download_file(url, download_path, retries, delay)
+        return trace["status"]
+
+async def _download_file(url: str, download_path: Path, retries: int, delay: float) -> str:
     if download_path.exists():
+        ref = blob_store().ref(download_path)
+        if ref and ref["url"] and ref["url"] != url:
+            log.warning(f"{download_path} already holds {ref['url']}; not replacing it with {url}")
         log.debug(f"File already exists, skipping download: {download_path}")
         return "Success"
 
     if not download_path.parent.exists():
         download_path.parent.mkdir(parents=True)
+    part_path = download_path.with_name(download_path.name + ".part")
+    state_path = download_path.with_name(download_path.name + ".part.json")
+    health = host_health(url)
         
     for i in range(retries):
+        probe = False
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, follow_redirects=True)
-                response.raise_for_status()
-                with open(download_path, "wb") as f:
-                    f.write(response.content)
-                log.info(f"Successfully downloaded {url} to {download_path}")
-                return "Success"
+            probe = await health.before_request()
+            async with http_client() as client:
+                await _fetch_to_part(client, url, part_path, state_path)
+            health.record_success()
+            # Hashing a large file would stall the other downloads on the loop.
+            await asyncio.to_thread(blob_store().store_file, part_path, download_path, url)
+            state_path.unlink(missing_ok=True)
+            log.info(f"Successfully downloaded {url} to {download_path}")
+            return "Success"
+        except HostUnavailable as e:
+            log.error(f"Not downloading {url}: {e}")
+            return "Failed"
         except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                health.record_failure()
+            else:
+                # Any other answer shows the host is up.
+                health.record_success()
             if e.response.status_code == 404:
                 log.error(f"File not found on server (404): {url}")
+                part_path.unlink(missing_ok=True)
+                state_path.unlink(missing_ok=True)
                 return "Not Found"
             log.error(f"Failed to download {url} on attempt {i+1}: {e}")
             if i < retries - 1:
                 log.info(f"Retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
+                with span("download_file.retry_wait", url=url):
+                    await asyncio.sleep(delay)
         except Exception as e:
+            if isinstance(e, httpx.TransportError):
+                health.record_failure()
+            elif isinstance(e, httpx.HTTPError):
+                # The host answered, but the body was cut short or did not match the range asked for.
+                health.record_success()
+            # Blob store and disk errors say nothing about the host.
             log.error(f"Failed to download {url} on attempt {i+1}: {e}")
             if i < retries - 1:
                 log.info(f"Retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
+                with span("download_file.retry_wait", url=url):
+                    await asyncio.sleep(delay)
+        finally:
+            health.end_request(probe)
     
     log.error(f"Failed to download {url} after {retries} attempts.")
     return "Failed"
 
+def _resume_validator(headers) -> Optional[str]:
+    """
+    Returns the validator to send in If-Range: a strong ETag, else Last-Modified.
+    """
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+def _content_range(header: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parses `bytes start-end/total` into (start, total); the total may be unknown.
+    """
+    try:
+        unit, _, spec = header.partition(" ")
+        span_spec, _, total = spec.partition("/")
+        return int(span_spec.split("-")[0]), None if total == "*" else int(total)
+    except (AttributeError, ValueError):
+        return None, None
+
+async def _fetch_to_part(client: httpx.AsyncClient, url: str, part_path: Path, state_path: Path) -> None:
+    """
+    Fetches a URL into `part_path`, resuming from its current size when the
+    saved validator allows, and raises if the body ends early.
+    """
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    state = json.loads(state_path.read_text()) if offset and state_path.exists() else {}
+    # Offsets only line up with the stored bytes when no content coding is applied.
+    headers = {"Accept-Encoding": "identity"}
+    if offset and state.get("url") == url and state.get("validator"):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = state["validator"]
+
+    async with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+        if response.status_code == 416:
+            # The partial file is not a prefix of the current document.
+            part_path.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+        response.raise_for_status()
+        encoded = "Content-Encoding" in response.headers
+        if response.status_code == 206:
+            start, total = _content_range(response.headers.get("Content-Range"))
+            if start != offset:
+                part_path.unlink(missing_ok=True)
+                raise httpx.HTTPError(f"Asked for bytes from {offset} but got {response.headers.get('Content-Range')}")
+            log.info(f"Resuming {url} at byte {offset}")
+            mode = "ab"
+        else:
+            length = response.headers.get("Content-Length")
+            total = int(length) if length is not None and not encoded else None
+            validator = _resume_validator(response.headers)
+            if validator and not encoded:
+                state_path.write_text(json.dumps({"url": url, "validator": validator}))
+            else:
+                state_path.unlink(missing_ok=True)
+            mode = "wb"
+        with open(part_path, mode) as f:
+            async for chunk in response.aiter_bytes():
+                f.write(chunk)
+
+    size = part_path.stat().st_size
+    if total is not None and size != total:
+        raise httpx.HTTPError(f"Truncated response: got {size} of {total} bytes")
+
+def download_paths(urls, directory: Path) -> dict:
+    """
+    Names each URL's file in a directory after the last part of the URL.
+
+    When that name already belongs to a different URL, in this batch or in
+    an earlier download, a short hash of the URL is appended so that the
+    two files do not collide.
+    """
+    store = blob_store()
+    paths, owners = {}, {}
+    for url in dict.fromkeys(urls):
+        path = directory / url.split("/")[-1]
+        ref = store.ref(path)
+        owner = owners.get(path) or (ref["url"] if ref else None)
+        if owner and owner != url:
+            path = path.with_name(f"{path.stem}-{hashlib.sha256(url.encode()).hexdigest()[:8]}{path.suffix}")
+            log.debug(f"{url} shares its file name with {owner}; saving it as {path.name}")
+        owners[path] = url
+        paths[url] = path
+    return paths
+
+async def download_files(urls, directory: Path, num_workers=DOWNLOAD_WORKERS, name="Downloader") -> dict:
+    """
+    Downloads files into a directory, named by `download_paths`, through a
+    pool of concurrent workers.
+
+    Returns:
+        The download status of each URL.
+    """
+    statuses = {}
+    paths = download_paths(urls, directory)
+
+    async def download_worker(url):
+        try:
+            statuses[url] = await download_file(url, paths[url])
+        except Exception as e:
+            log.exception(f"Failed to download {url}: {e}")
+            statuses[url] = "Failed"
+
+    download_queue = QueueManager(worker_coro=download_worker, num_workers=num_workers, name=name)
+    await download_queue.start()
+    try:
+        for url in paths:
+            await download_queue.add_task(url)
+        await download_queue.join()
+    finally:
+        await download_queue.stop()
+    return statuses
+
 async def scrape_base_code():
     """
     Scrapes the base Navajo Nation Code from nnols.org.
     """
+    pdf_urls = []
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
         page = await context.new_page()
         try:
             log.debug("Navigating to base code page...")
-            await page.goto("http://nnols.org/navajo-nation-code", wait_until="networkidle", timeout=60000)
+            await goto(page, "http://nnols.org/navajo-nation-code", wait_until="networkidle")
             log.debug("Base code page loaded.")
             
-            pdf_links = await page.locator('a[href$=".pdf"]').all()
-            log.debug(f"Found {len(pdf_links)} PDF links.")
-            
-            for i, link in enumerate(pdf_links):
-                log.debug(f"Processing link {i+1}/{len(pdf_links)}...")
-                pdf_url = await link.get_attribute('href')
-                if pdf_url:
-                    file_name = pdf_url.split("/")[-1]
-                    download_path = Path("data/nnols/base_code") / file_name
-                    await download_file(pdf_url, download_path)
+            pdf_urls = await page.eval_on_selector_all('a[href$=".pdf"]', PDF_HREFS_JS)
+            log.debug(f"Found {len(pdf_urls)} PDF links.")
         except Exception as e:
             log.error(f"Failed to scrape base code: {e}")
         finally:
             await browser.close()
+    await download_files(pdf_urls, Path("data/nnols/base_code"), name="BaseCodeDownloader")
 
 async def scrape_amendments():
     """
     Scrapes the amendments to the Navajo Nation Code from nnols.org.
     """
+    pdf_urls = []
     async with async_playwright() as p:
-        browser = await p.firefox.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
+        browser = await launch_browser(p, args=BROWSER_ARGS)
+        context = await new_context(browser, **BROWSER_CONTEXT_OPTIONS)
         page = await context.new_page()
         try:
             log.debug("Navigating to amendments page...")
-            await page.goto("http://nnols.org/navajo-nation-code/amendments/", wait_until="networkidle", timeout=60000)
+            await goto(page, "http://nnols.org/navajo-nation-code/amendments/", wait_until="networkidle")
             log.debug("Amendments page loaded.")
             
-            pdf_links = await page.locator('a[href$=".pdf"]').all()
-            log.debug(f"Found {len(pdf_links)} PDF links.")
-            
-            for i, link in enumerate(pdf_links):
-                log.debug(f"Processing link {i+1}/{len(pdf_links)}...")
-                pdf_url = await link.get_attribute('href')
-                if pdf_url:
-                    file_name = pdf_url.split("/")[-1]
-                    download_path = Path("data/nnols/amendments") / file_name
-                    await download_file(pdf_url, download_path)
+            pdf_urls = await page.eval_on_selector_all('a[href$=".pdf"]', PDF_HREFS_JS)
+            log.debug(f"Found {len(pdf_urls)} PDF links.")
         except Exception as e:
             log.error(f"Failed to scrape amendments: {e}")
         finally:
-            await browser.close()
\ No newline at end of file
+            await browser.close()
+    await download_files(pdf_urls, Path("data/nnols/amendments"), name="AmendmentsDownloader")
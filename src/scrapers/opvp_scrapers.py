@@ -3,10 +3,18 @@ Scrapers for opvp.navajo-nsn.gov.
 """
 import os
 import re
+from datetime import datetime
 from pathlib import Path
 import httpx
 from playwright.async_api import async_playwright
 from logger import get_logger
+from tracing import span
+from scrapers.browser import goto, http_client, launch_browser, new_context
+from scrapers.page_pool import PagePool
+from scrapers.wordpress import (
+    WordPressAPIError, author_name, featured_image_url, fetch_posts, load_sync_state, parse_html, rendered_text,
+    save_sync_state, term_names,
+)
 import json
 from urllib.parse import urljoin
 from queue_system import QueueManager
@@ -15,18 +23,20 @@ from scrapers.nnols_scrapers import download_file
 
 log = get_logger(__name__)
 
+OPVP_SITE = "https://opvp.navajo-nsn.gov"
+
 async def scrape_opvp_roster():
     """
     Scrapes the administration roster from opvp.navajo-nsn.gov.
     """
     async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context()
+        browser = await launch_browser(p)
+        context = await new_context(browser)
         page = await context.new_page()
         try:
             # Navigate to the live administration page
             roster_url = "https://opvp.navajo-nsn.gov/administration/"
-            await page.goto(roster_url, wait_until="networkidle", timeout=60000)
+            await goto(page, roster_url, wait_until="networkidle")
             log.debug("OPVP roster page loaded from live URL.")
 
             roster = []
@@ -90,77 +100,151 @@ async def scrape_opvp_roster():
         finally:
             await browser.close()
 
-async def process_opvp_press_release(context, url):
+def save_opvp_press_release(title, date, image_url, paragraphs) -> Path:
+    """
+    Saves a press release as a Markdown file named after its title.
+    """
+    # Sanitize title to create a valid filename
+    sanitized_title = re.sub(r'[^\w\-_\. ]', '_', title).strip().lower().replace(' ', '-')
+    
+    output_dir = Path("data/opvp/press_releases")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Construct Markdown content
+    markdown_content = f"# {title}\n\n"
+    markdown_content += f"**{date}**\n\n"
+    if image_url:
+        # Embed image using Markdown syntax with the direct URL
+        markdown_content += f"![{title}]({image_url})\n\n"
+    
+    for p in paragraphs:
+        # Filter out any unwanted share text or empty paragraphs
+        if p.strip() and "Share" not in p:
+            markdown_content += f"{p.strip()}\n\n"
+    
+    # Save as a Markdown file
+    output_path = output_dir / f"{sanitized_title}.md"
+    with span("opvp.write", path=output_path), open(output_path, "w", encoding="utf-8") as f:
+        f.write(markdown_content)
+    log.info(f"Saved press release as Markdown: {output_path}")
+    return output_path
+
+async def process_opvp_press_release(page, url):
     """
     Processes a single press release page and saves it as a Markdown file.
     """
-    page = await context.new_page()
     try:
         log.info(f"Processing press release: {url}")
-        await page.goto(url, wait_until="networkidle", timeout=60000)
+        with span("opvp.navigate", url=url):
+            await goto(page, url, wait_until="networkidle")
 
-        title = await page.locator('h1.entry-title').inner_text()
-        date = await page.locator('p.post-meta').inner_text()
-        
-        # Optionally get the main image URL
-        image_locator = page.locator('.et_post_meta_wrapper > img')
-        image_url = None
-        if await image_locator.count() > 0:
-            image_url = await image_locator.get_attribute('src')
-        
-        # Get all paragraphs from the entry-content
-        paragraphs = await page.locator('div.entry-content p').all_inner_texts()
-        
-        # Sanitize title to create a valid filename
-        sanitized_title = re.sub(r'[^\w\-_\. ]', '_', title).strip().lower().replace(' ', '-')
-        
-        output_dir = Path("data/opvp/press_releases")
-        output_dir.mkdir(exist_ok=True)
-        
-        # Construct Markdown content
-        markdown_content = f"# {title}\n\n"
-        markdown_content += f"**{date}**\n\n"
-        if image_url:
-            # Embed image using Markdown syntax with the direct URL
-            markdown_content += f"![{title}]({image_url})\n\n"
-        
-        for p in paragraphs:
-            # Filter out any unwanted share text or empty paragraphs
-            if p.strip() and "Share" not in p:
-                markdown_content += f"{p.strip()}\n\n"
+        with span("opvp.extract", url=url):
+            title = await page.locator('h1.entry-title').inner_text()
+            date = await page.locator('p.post-meta').inner_text()
+
+            # Optionally get the main image URL
+            image_locator = page.locator('.et_post_meta_wrapper > img')
+            image_url = None
+            if await image_locator.count() > 0:
+                image_url = await image_locator.get_attribute('src')
+
+            # Get all paragraphs from the entry-content
+            paragraphs = await page.locator('div.entry-content p').all_inner_texts()
         
-        # Save as a Markdown file
-        output_path = output_dir / f"{sanitized_title}.md"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
-        log.info(f"Saved press release as Markdown: {output_path}")
+        save_opvp_press_release(title, date, image_url, paragraphs)
 
     except Exception as e:
         log.error(f"Failed to process press release {url}: {e}")
-    finally:
-        await page.close()
 
-async def scrape_opvp_press_releases(headless=True):
+async def scrape_opvp_press_releases(headless=True, use_api=True, full=False):
+    """
+    Scrapes press releases from the OPVP website.
+
+    Reads them from the WordPress REST API when it is available, and falls
+    back to the browser scraper otherwise.
+
+    Args:
+        headless: Run the fallback browser without a window.
+        use_api: Try the REST API first.
+        full: Fetch every post rather than those changed since the last crawl.
+    """
+    if use_api:
+        try:
+            await scrape_opvp_press_releases_api(full=full)
+            return
+        except WordPressAPIError as e:
+            log.warning(f"OPVP REST API unavailable, falling back to the browser: {e}")
+    await scrape_opvp_press_releases_browser(headless=headless)
+
+def opvp_post_meta(post) -> str:
+    """
+    Formats a post's byline as the site's `p.post-meta` line shows it, e.g.
+    "by OPVP Communications | Jan 5, 2025 | Press Releases".
+    """
+    date = datetime.fromisoformat(post["date"])
+    parts = [f"{date:%b} {date.day}, {date.year}"]
+    author = author_name(post)
+    if author:
+        parts.insert(0, f"by {author}")
+    categories = term_names(post, "category")
+    if categories:
+        parts.append(", ".join(categories))
+    return " | ".join(parts)
+
+async def scrape_opvp_press_releases_api(full=False):
+    """
+    Saves OPVP press releases read from the WordPress REST API.
+
+    Only posts modified since the last crawl are requested unless `full` is set.
+
+    Raises:
+        WordPressAPIError: If the API is unavailable, or lists no posts at
+            all on a full crawl.
+    """
+    modified_after = None if full else load_sync_state(OPVP_SITE)
+    async with http_client(timeout=60) as client:
+        with span("opvp.api_fetch", modified_after=modified_after):
+            posts = await fetch_posts(client, OPVP_SITE, modified_after=modified_after)
+    log.info(f"Fetched {len(posts)} press releases from the OPVP REST API"
+             + (f" modified after {modified_after}." if modified_after else "."))
+    if not posts and not modified_after:
+        # The press room is never empty, so the API is hiding the posts.
+        raise WordPressAPIError(f"{OPVP_SITE}: the REST API lists no posts")
+    for post in posts:
+        content = parse_html(post.get("content", {}).get("rendered", ""))
+        save_opvp_press_release(
+            rendered_text(post["title"]),
+            opvp_post_meta(post),
+            featured_image_url(post),
+            [paragraph.text() for paragraph in content.find_all("p")],
+        )
+    if posts:
+        save_sync_state(OPVP_SITE, max(post["modified"] for post in posts))
+
+async def scrape_opvp_press_releases_browser(headless=True):
     """
     Scrapes press releases from the OPVP website using the "Scrape, Then Paginate" strategy.
     """
     async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=headless)
-        context = await browser.new_context()
+        browser = await launch_browser(p, headless=headless)
+        context = await new_context(browser)
+        pool = PagePool(browser, size=5)
+        await pool.start()
         
         async def worker_coro(url):
-            await process_opvp_press_release(context, url)
+            async with pool.page() as page:
+                await process_opvp_press_release(page, url)
 
         press_release_queue = QueueManager(
             worker_coro=worker_coro,
-            num_workers=5,
+            num_workers=pool.size,
             name="OpvpPressReleaseProcessor"
         )
         await press_release_queue.start()
 
         page = await context.new_page()
         try:
-            await page.goto("https://opvp.navajo-nsn.gov/press-room/")
+            await goto(page, "https://opvp.navajo-nsn.gov/press-room/")
             log.info("Navigated to OPVP press release page.")
 
             master_urls = set()
@@ -192,7 +276,7 @@ async def scrape_opvp_press_releases(headless=True):
             progress_bar = ProgressBar(len(urls_to_process), text="Scraping OPVP Press Releases")
 
             async def worker_with_progress(url):
-                await process_opvp_press_release(context, url)
+                await worker_coro(url)
                 progress_bar.update()
 
             press_release_queue.worker_coro = worker_with_progress
@@ -208,4 +292,5 @@ async def scrape_opvp_press_releases(headless=True):
         finally:
             await press_release_queue.stop()
             await page.close()
+            await pool.close()
             await browser.close()
\ No newline at end of file
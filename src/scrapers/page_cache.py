@@ -0,0 +1,122 @@
+"""
+An on-disk cache of the responses browser contexts receive.
+
+The HTML pages, and the HTML or JSON their scripts request, that a
+scraper's browser receives can be stored in SQLite, keyed by URL, and
+served back to later runs:
+
+- "on": responses younger than the TTL are served from the cache, others
+  are fetched and stored.
+- "record": everything is fetched and stored, refreshing the cache.
+- "replay": everything is served from the cache regardless of age; requests
+  that were never recorded fail, so a crawl never touches the network.
+- "off": the cache is bypassed.
+
+The mode and TTL come from the `[page_cache]` section of `config.toml`, and
+the `ZHIN_PAGE_CACHE` environment variable overrides the mode. Contexts in
+one process share a single cache and connection, closed at exit.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from config import get_config
+from logger import get_logger
+
+log = get_logger(__name__)
+
+CACHE_PATH = Path("data/cache/pages.sqlite")
+MODES = ("off", "on", "record", "replay")
+
+# Headers describing the wire encoding no longer apply to the stored body.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class PageCache:
+    """
+    A SQLite store of responses keyed by URL.
+
+    Safe to call from several threads, so the browser's request handlers
+    can run lookups and writes off the event loop.
+
+    Args:
+        path: The SQLite file.
+        ttl: Seconds a stored response is served for in "on" mode.
+        mode: One of MODES.
+    """
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = 6 * 3600, mode: str = "on"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown page cache mode {mode!r}; expected one of {', '.join(MODES)}.")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.mode = mode
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, fetched_at REAL)"
+            )
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the stored response for a URL if the mode allows serving it.
+        """
+        if self.mode in ("off", "record"):
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or (self.mode == "on" and time.time() - row[3] > self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"status": row[0], "headers": json.loads(row[1]), "body": row[2]}
+
+    def put(self, url: str, status: int, headers: dict, body: bytes) -> None:
+        """
+        Stores a successful response.
+        """
+        if self.mode == "off" or status != 200:
+            return
+        headers = {name: value for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS}
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, status, headers, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, status, json.dumps(headers), body, time.time()),
+            )
+
+    def close(self) -> None:
+        if self.hits or self.misses:
+            log.info(f"Page cache: {self.hits} hits, {self.misses} misses.")
+        with self._lock:
+            self._db.close()
+
+
+_caches: Dict[Tuple[Path, str, float], PageCache] = {}
+
+
+def page_cache_from_config() -> Optional[PageCache]:
+    """
+    Returns this process's PageCache as configured by `config.toml` and
+    `ZHIN_PAGE_CACHE`, or None when off.
+    """
+    settings = get_config().get("page_cache", {})
+    mode = os.environ.get("ZHIN_PAGE_CACHE") or settings.get("mode", "off")
+    if mode == "off":
+        return None
+    key = (CACHE_PATH.resolve(), mode, settings.get("ttl_hours", 6) * 3600)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = PageCache(key[0], ttl=key[2], mode=mode)
+        atexit.register(cache.close)
+    return cache
@@ -0,0 +1,194 @@
+"""
+Reusable browser pages with periodic context recycling.
+
+Workers lease a page from a `PagePool` for each URL instead of opening and
+closing one. The pool holds a fixed number of pages in one context; after a
+number of navigations, or when the browser processes grow past a memory
+limit, it swaps in a fresh context and closes the old one as soon as the
+last page leased from it comes back. Long crawls then keep a bounded number
+of pages open and shed whatever memory Firefox accumulates per context.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from logger import get_logger
+from profiling import process_tree_rss
+from scrapers.browser import browser_stats, new_context
+
+log = get_logger(__name__)
+
+MAX_NAVIGATIONS_PER_CONTEXT = 200
+MEMORY_LIMIT_MB = 1500
+# Reading /proc for every lease would cost more than it saves.
+MEMORY_CHECK_INTERVAL = 25
+
+
+def child_processes_rss() -> Optional[int]:
+    """
+    Returns the summed RSS in bytes of this process's descendants (the
+    Playwright driver and browsers), or None where /proc is unavailable.
+    """
+    return process_tree_rss(os.getpid(), include_root=False)
+
+
+class PagePool:
+    """
+    A fixed number of reusable pages over a recyclable browser context.
+
+    Args:
+        browser: The browser to create contexts in.
+        size: Number of pages, normally one per worker.
+        context_options: Options passed to `new_context`.
+        max_navigations: Leases after which the context is replaced.
+        memory_limit_mb: Browser RSS above which the context is replaced.
+    """
+    def __init__(self, browser, size: int, context_options: Optional[dict] = None,
+                 max_navigations: int = MAX_NAVIGATIONS_PER_CONTEXT, memory_limit_mb: float = MEMORY_LIMIT_MB):
+        self.browser = browser
+        self.size = size
+        self.context_options = context_options or {}
+        self.max_navigations = max_navigations
+        self.memory_limit = memory_limit_mb * 1e6
+        self.context = None
+        self._idle = asyncio.Queue()
+        self._navigations = 0
+        self._leases = 0
+        self._outstanding = {}
+        self._recycling = asyncio.Lock()
+
+    async def start(self) -> None:
+        await self._open_context()
+
+    async def _open_context(self) -> None:
+        context = await new_context(self.browser, **self.context_options)
+        try:
+            pages = [await context.new_page() for _ in range(self.size)]
+        except Exception:
+            await _close_quietly(context)
+            raise
+        for page in pages:
+            self._idle.put_nowait(page)
+        self.context = context
+        self._navigations = 0
+        self._outstanding[context] = 0
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Leases a page for one URL and returns it to the pool afterwards.
+        """
+        page = await self._idle.get()
+        if page is None:
+            page = await self._replace_lost_page()
+        context = page.context
+        self._outstanding[context] += 1
+        try:
+            yield page
+        finally:
+            self._outstanding[context] -= 1
+            await self._release(page, context)
+
+    async def _release(self, page, context) -> None:
+        if context is self.context:
+            self._navigations += 1
+        self._leases += 1
+        try:
+            if context is self.context and self._should_recycle():
+                async with self._recycling:
+                    if context is self.context:
+                        await self._recycle()
+        finally:
+            # Runs even if recycling failed, so the page's slot is never lost.
+            if context is self.context:
+                await self._reset(page, context)
+            else:
+                await self._retire(page, context)
+
+    async def _reset(self, page, context) -> None:
+        try:
+            # Drop the previous document so an idle page holds no DOM.
+            await page.goto("about:blank")
+            self._idle.put_nowait(page)
+            return
+        except Exception:
+            log.warning("Replacing a page that could not be reset.")
+        await _close_quietly(page)
+        try:
+            self._idle.put_nowait(await context.new_page())
+        except Exception:
+            # A placeholder, so that the next lease opens a fresh context instead of waiting forever.
+            self._idle.put_nowait(None)
+            raise
+
+    async def _retire(self, page, context) -> None:
+        try:
+            await page.close()
+        finally:
+            if not self._outstanding[context]:
+                await self._close_context(context)
+
+    async def _replace_lost_page(self):
+        """
+        Recycles the context for a slot whose page could not be replaced.
+        """
+        log.warning("Opening a fresh browser context to replace a lost page.")
+        retiring = self.context
+        try:
+            async with self._recycling:
+                await self._recycle()
+        except Exception:
+            self._idle.put_nowait(None)
+            raise
+        if retiring is not None and not self._outstanding.get(retiring, 1):
+            await self._close_context(retiring)
+        return await self._idle.get()
+
+    def _should_recycle(self) -> bool:
+        if self._navigations >= self.max_navigations:
+            log.info(f"Recycling browser context after {self._navigations} navigations.")
+            return True
+        if self._leases % MEMORY_CHECK_INTERVAL == 0:
+            rss = child_processes_rss()
+            if rss is not None and rss > self.memory_limit:
+                log.info(f"Recycling browser context at {rss / 1e6:.0f} MB browser memory.")
+                return True
+        return False
+
+    async def _recycle(self) -> None:
+        # Pages of the retiring context that come back from here on are closed.
+        retiring, self.context = self.context, None
+        idle_pages = []
+        while not self._idle.empty():
+            idle_pages.append(self._idle.get_nowait())
+        try:
+            await self._open_context()
+        except Exception:
+            log.warning("Could not open a fresh browser context; keeping the current one.")
+            self.context = retiring
+            for page in idle_pages:
+                self._idle.put_nowait(page)
+            raise
+        browser_stats["contexts_recycled"] += 1
+        for page in idle_pages:
+            if page is not None:
+                await _close_quietly(page)
+
+    async def _close_context(self, context) -> None:
+        del self._outstanding[context]
+        await context.close()
+
+    async def close(self) -> None:
+        """
+        Closes every context the pool still holds.
+        """
+        for context in list(self._outstanding):
+            await context.close()
+        self._outstanding.clear()
+
+
+async def _close_quietly(closable) -> None:
+    try:
+        await closable.close()
+    except Exception as e:
+        log.warning(f"Could not close {type(closable).__name__}: {e}")
@@ -0,0 +1,81 @@
+"""
+Blocking of page assets the scrapers never read.
+
+Browser contexts abort requests for images, fonts, stylesheets and media,
+and for anything served from a third-party domain (analytics, embeds, ad
+and font CDNs), so pages load less and `networkidle` settles sooner. Pages
+that need a blocked type or domain to work get a per-site allowlist.
+
+The profile comes from the `[resource_blocking]` section of `config.toml`,
+and the `ZHIN_RESOURCE_BLOCKING` environment variable ("on" or "off")
+overrides whether it is enabled.
+"""
+import os
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+from config import get_config
+
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font", "stylesheet")
+
+
+def site_domain(host: str) -> str:
+    """
+    Returns the last two labels of a host, which is how the scraped sites
+    group their subdomains (e.g. opvp.navajo-nsn.gov -> navajo-nsn.gov).
+    """
+    return ".".join(host.split(".")[-2:])
+
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class BlockingProfile:
+    """
+    Decides which requests a browser context aborts.
+
+    Args:
+        blocked_types: Playwright resource types to abort.
+        block_third_party: Whether to abort requests to other sites than the page's.
+        allow: Per page host, a dict with the "types" and "domains" to let through anyway.
+    """
+    def __init__(self, blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES, block_third_party: bool = True,
+                 allow: Optional[dict] = None):
+        self.blocked_types = frozenset(blocked_types)
+        self.block_third_party = block_third_party
+        self.allow = allow or {}
+
+    def should_block(self, url: str, resource_type: str, page_url: Optional[str] = None) -> bool:
+        """
+        Returns whether a request should be aborted.
+
+        Args:
+            url: The requested URL.
+            resource_type: Playwright's `request.resource_type`.
+            page_url: The URL of the document that made the request, if known.
+        """
+        if resource_type == "document":
+            return False
+        host = urlsplit(url).hostname or ""
+        page_host = urlsplit(page_url).hostname if page_url else None
+        allowed = self.allow.get(page_host or host, {})
+        if _matches(host, allowed.get("domains", ())):
+            return False
+        if resource_type in self.blocked_types and resource_type not in allowed.get("types", ()):
+            return True
+        return bool(self.block_third_party and page_host and site_domain(host) != site_domain(page_host))
+
+
+def blocking_profile_from_config() -> Optional[BlockingProfile]:
+    """
+    Returns the BlockingProfile configured by `config.toml`, or None when disabled.
+    """
+    settings = get_config().get("resource_blocking", {})
+    override = os.environ.get("ZHIN_RESOURCE_BLOCKING")
+    if not (override == "on" if override else settings.get("enabled", False)):
+        return None
+    return BlockingProfile(
+        blocked_types=settings.get("block_types", DEFAULT_BLOCKED_TYPES),
+        block_third_party=settings.get("block_third_party", True),
+        allow=settings.get("allow", {}),
+    )
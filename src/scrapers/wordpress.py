@@ -0,0 +1,223 @@
+"""
+Reading WordPress sites through their REST API.
+
+The OPVP and council sites are WordPress installs, so their press releases
+can be read from `/wp-json/wp/v2/` as JSON over plain HTTP instead of being
+rendered in a browser page by page. Listings are paged with `per_page` and
+the `X-WP-TotalPages` header, and incremental crawls only ask for what was
+modified after the last one (`modified_after`, which WordPress compares
+with the posts' local-time `modified`, so the cursor is saved from that
+field too). Any sign that the API is
+unavailable raises `WordPressAPIError`, so callers can fall back to their
+browser scrapers.
+
+Rendered post content is HTML; `parse_html` turns it into a small element
+tree for the few lookups the scrapers need, using only the standard
+library.
+"""
+import json
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import List, Optional
+import httpx
+from logger import get_logger
+
+log = get_logger(__name__)
+
+PER_PAGE = 100
+SYNC_STATE_PATH = Path("data/cache/wordpress_sync.json")
+
+
+class WordPressAPIError(Exception):
+    """
+    Raised when a site's REST API is missing, disabled or returns something unexpected.
+    """
+
+
+async def _get_json(client: httpx.AsyncClient, url: str, params: dict) -> httpx.Response:
+    try:
+        response = await client.get(url, params=params, follow_redirects=True)
+    except httpx.HTTPError as e:
+        raise WordPressAPIError(f"{url}: {e}") from e
+    if response.status_code != 200 or "json" not in response.headers.get("Content-Type", ""):
+        raise WordPressAPIError(f"{url}: HTTP {response.status_code} {response.headers.get('Content-Type', '')}")
+    return response
+
+
+async def fetch_posts(client: httpx.AsyncClient, site: str, modified_after: Optional[str] = None,
+                      per_page: int = PER_PAGE) -> List[dict]:
+    """
+    Returns every post of a site, or those modified after a date, oldest change first.
+
+    Each post's featured image, author and terms are embedded under `_embedded`.
+
+    Args:
+        client: The HTTP client to use.
+        site: The site's base URL, e.g. "https://opvp.navajo-nsn.gov".
+        modified_after: An ISO 8601 date in the site's time zone, as in the
+            posts' `modified`, or None for all posts.
+        per_page: Posts per request; WordPress allows at most 100.
+    """
+    url = f"{site.rstrip('/')}/wp-json/wp/v2/posts"
+    params = {"per_page": per_page, "orderby": "modified", "order": "asc", "_embed": "wp:featuredmedia,author,wp:term"}
+    if modified_after:
+        params["modified_after"] = modified_after
+    posts, page, total_pages = [], 1, 1
+    while page <= total_pages:
+        response = await _get_json(client, url, {**params, "page": page})
+        batch = response.json()
+        if not isinstance(batch, list):
+            raise WordPressAPIError(f"{url}: expected a list of posts")
+        posts.extend(batch)
+        total_pages = int(response.headers.get("X-WP-TotalPages", page))
+        log.debug(f"Fetched posts page {page}/{total_pages} from {site} ({len(batch)} posts).")
+        page += 1
+    return posts
+
+
+async def fetch_page(client: httpx.AsyncClient, site: str, slug: str, modified_after: Optional[str] = None) -> Optional[dict]:
+    """
+    Returns the page with a slug, or None when it was not modified after
+    `modified_after`.
+
+    Raises:
+        WordPressAPIError: If the API is unavailable or, without
+            `modified_after`, no page has the slug.
+    """
+    url = f"{site.rstrip('/')}/wp-json/wp/v2/pages"
+    params = {"slug": slug}
+    if modified_after:
+        params["modified_after"] = modified_after
+    pages = (await _get_json(client, url, params)).json()
+    if not isinstance(pages, list):
+        raise WordPressAPIError(f"{url}: expected a list of pages")
+    if not pages:
+        if modified_after:
+            return None
+        raise WordPressAPIError(f"{url}: no page with slug {slug!r}")
+    return pages[0]
+
+
+def featured_image_url(post: dict) -> Optional[str]:
+    """
+    Returns the source URL of a post's embedded featured image, if it has one.
+    """
+    media = post.get("_embedded", {}).get("wp:featuredmedia") or []
+    return media[0].get("source_url") if media and isinstance(media[0], dict) else None
+
+
+def author_name(post: dict) -> Optional[str]:
+    """
+    Returns the display name of a post's embedded author, if it has one.
+    """
+    authors = post.get("_embedded", {}).get("author") or []
+    return authors[0].get("name") if authors and isinstance(authors[0], dict) else None
+
+
+def term_names(post: dict, taxonomy: str = "category") -> List[str]:
+    """
+    Returns the names of a post's embedded terms in a taxonomy.
+    """
+    groups = post.get("_embedded", {}).get("wp:term") or []
+    return [term["name"] for group in groups for term in group
+            if isinstance(term, dict) and term.get("taxonomy") == taxonomy]
+
+
+def rendered_text(field: dict) -> str:
+    """
+    Returns the plain text of a rendered field such as a post's title.
+    """
+    return parse_html(field.get("rendered", "")).text().strip()
+
+
+def load_sync_state(key: str) -> Optional[str]:
+    """
+    Returns the latest modification date, in the site's time zone, seen by the last crawl of `key`.
+    """
+    if not SYNC_STATE_PATH.exists():
+        return None
+    with open(SYNC_STATE_PATH) as f:
+        return json.load(f).get(key)
+
+
+def save_sync_state(key: str, modified: str) -> None:
+    state = {}
+    if SYNC_STATE_PATH.exists():
+        with open(SYNC_STATE_PATH) as f:
+            state = json.load(f)
+    state[key] = modified
+    SYNC_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(SYNC_STATE_PATH, "w") as f:
+        json.dump(state, f, indent=4)
+
+
+class Element:
+    """
+    An HTML element with its attributes and children (elements and text).
+    """
+    def __init__(self, tag: str, attrs: Optional[dict] = None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+
+    @property
+    def classes(self) -> List[str]:
+        return (self.attrs.get("class") or "").split()
+
+    def find_all(self, tag: Optional[str] = None, cls: Optional[str] = None) -> List["Element"]:
+        """
+        Returns the descendants with a tag and/or class, in document order.
+        """
+        found = []
+        for child in self.children:
+            if isinstance(child, Element):
+                if (tag is None or child.tag == tag) and (cls is None or cls in child.classes):
+                    found.append(child)
+                found.extend(child.find_all(tag, cls))
+        return found
+
+    def find(self, tag: Optional[str] = None, cls: Optional[str] = None) -> Optional["Element"]:
+        matches = self.find_all(tag, cls)
+        return matches[0] if matches else None
+
+    def text(self) -> str:
+        return "".join(child.text() if isinstance(child, Element) else child for child in self.children)
+
+
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#root")
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, {name: value or "" for name, value in attrs})
+        self._stack[-1].children.append(element)
+        if tag not in _VOID_TAGS:
+            self._stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self._stack[-1].children.append(Element(tag, {name: value or "" for name, value in attrs}))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element; stray end tags are ignored.
+        for depth in range(len(self._stack) - 1, 0, -1):
+            if self._stack[depth].tag == tag:
+                del self._stack[depth:]
+                return
+
+    def handle_data(self, data):
+        self._stack[-1].children.append(data)
+
+
+def parse_html(html: str) -> Element:
+    """
+    Parses an HTML fragment into an element tree.
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
@@ -0,0 +1,127 @@
+"""
+Lightweight span tracing exported in Chrome trace-event format.
+
+While a trace is running, `span(name, **args)` records a complete ("X")
+event with its start, duration and arguments into an in-memory buffer. Each
+asyncio task (QueueManager names its workers) and each thread gets its own
+track, so waiting and overlapping work line up on a timeline. The buffer is
+written as JSON that chrome://tracing and https://ui.perfetto.dev can open.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# Events beyond this are dropped so a long run cannot exhaust memory.
+MAX_EVENTS = 1_000_000
+
+_events: Optional[list] = None
+_tracks = {}
+_dropped = 0
+_origin = 0.0
+
+
+def _track() -> int:
+    """
+    Returns the track id of the current thread and asyncio task.
+    """
+    # Without asyncio loaded there can be no running task, so avoid importing it.
+    asyncio = sys.modules.get("asyncio")
+    try:
+        task = asyncio.current_task() if asyncio else None
+    except RuntimeError:
+        task = None
+    thread = threading.current_thread()
+    name = f"{thread.name}/{task.get_name()}" if task else thread.name
+    track = _tracks.get(name)
+    if track is None:
+        track = _tracks[name] = len(_tracks) + 1
+    return track
+
+
+@contextmanager
+def span(name: str, **args):
+    """
+    Records a span; a no-op when no trace is running.
+
+    Yields the span's arguments, so results such as a download status can
+    be added before the span ends.
+    """
+    if _events is None:
+        yield args
+        return
+    track = _track()
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        end = time.perf_counter()
+        _record({
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (start - _origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": track,
+            "args": {key: str(value) for key, value in args.items()},
+        })
+
+
+def _record(event: dict) -> None:
+    global _dropped
+    if len(_events) < MAX_EVENTS:
+        _events.append(event)
+    else:
+        _dropped += 1
+
+
+def start_tracing() -> None:
+    global _events, _dropped, _origin
+    _events, _dropped, _origin = [], 0, time.perf_counter()
+    _tracks.clear()
+
+
+def stop_tracing(path: Path) -> int:
+    """
+    Stops tracing and writes the buffered spans to `path`.
+
+    Returns:
+        The number of spans written.
+    """
+    global _events
+    events, _events = _events or [], None
+    metadata = [
+        {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": track, "args": {"name": name}}
+        for name, track in _tracks.items()
+    ]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+    if _dropped:
+        log.warning(f"Trace buffer full: dropped {_dropped} spans.")
+    return len(events)
+
+
+@contextmanager
+def trace_run(path: Optional[Path]):
+    """
+    Traces the enclosed run and writes the trace to `path`; a no-op for None.
+    """
+    if path is None:
+        yield
+        return
+    start_tracing()
+    try:
+        yield
+    finally:
+        count = stop_tracing(path)
+        log.info(f"Wrote {count} trace spans to {path}")
@@ -0,0 +1,50 @@
+"""
+Tests for the Phase 2 benchmark corpus and baseline comparison.
+"""
+from pathlib import Path
+from benchmarks.bench_phase2 import check_entity_costs, compare
+from benchmarks.corpus import generate_corpus
+from processing.pipeline import find_input_files
+from processing.text_extraction import extract_text
+
+def test_generated_corpus_is_extractable(tmp_path: Path):
+    """
+    Tests that every generated document yields text with the expected entities.
+    """
+    data_dir = generate_corpus(tmp_path, scale=0.05)
+    files = find_input_files(data_dir)
+    assert {f.parent.name for f in files} == {"base_code", "bills_and_resolutions", "nnc_press_releases", "press_releases"}
+    resolution = next(f for f in files if f.parent.name == "bills_and_resolutions")
+    assert "Sponsored by Honorable" in extract_text(str(resolution))
+
+def test_compare_flags_slower_and_larger_stages():
+    """
+    Tests that only regressions beyond the tolerance, and stages without a
+    baseline, are reported.
+    """
+    baseline = {
+        "extract_text": {"mb_per_sec": 10.0, "peak_rss_mb": 100.0},
+        "chunk_spans": {"mb_per_sec": 10.0, "peak_rss_mb": 100.0},
+    }
+    results = [
+        {"stage": "extract_text", "mb_per_sec": 9.0, "peak_rss_mb": 140.0},
+        {"stage": "chunk_spans", "mb_per_sec": 7.0, "peak_rss_mb": 100.0},
+        {"stage": "extract_metadata", "mb_per_sec": 1.0, "peak_rss_mb": 900.0},
+    ]
+    regressions = compare(results, baseline, tolerance=0.15)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("extract_text") and "peak" in regressions[0]
+    assert regressions[1].startswith("chunk_spans")
+    assert regressions[2].startswith("extract_metadata: no baseline")
+    assert len(compare(results, {}, tolerance=0.15)) == 3
+
+def test_check_entity_costs_flags_types_slower_than_a_full_scan():
+    results = [
+        {"stage": "entities.date", "seconds": 0.05},
+        {"stage": "entities.date.full_scan", "seconds": 0.25},
+        {"stage": "entities.sponsor", "seconds": 0.3},
+        {"stage": "entities.sponsor.full_scan", "seconds": 0.1},
+        {"stage": "entities.docket_number", "seconds": 0.004},
+        {"stage": "entities.docket_number.full_scan", "seconds": 0.003},
+    ]
+    assert [line.split(":")[0] for line in check_entity_costs(results, 0.15)] == ["entities.sponsor"]
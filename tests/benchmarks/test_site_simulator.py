@@ -0,0 +1,45 @@
+"""
+Tests for the local site simulator used by the scraper benchmarks.
+"""
+from benchmarks.site_simulator import SiteSimulator
+from scrapers.browser import http_client, rewrite_url
+
+def test_rewrite_url_keeps_host_path_and_query():
+    """
+    Tests that real URLs map onto simulator paths.
+    """
+    assert rewrite_url("https://dibb.nnols.org/Legislation.aspx?LegislationID=3", "http://127.0.0.1:9/") \
+        == "http://127.0.0.1:9/dibb.nnols.org/Legislation.aspx?LegislationID=3"
+
+async def test_http_client_is_redirected_to_simulator(monkeypatch):
+    """
+    Tests that HTTP traffic reaches the simulator and is counted.
+    """
+    with SiteSimulator(scale=3) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        async with http_client() as client:
+            listing = await client.get("http://nnols.org/navajo-nation-code")
+            pdf = await client.get("http://nnols.org/wp-content/uploads/code/title-0.pdf")
+            missing = await client.get("http://nnols.org/nowhere")
+    assert listing.text.count(".pdf\"") == 3
+    assert pdf.content.startswith(b"%PDF-") and pdf.content.rstrip().endswith(b"%%EOF")
+    assert missing.status_code == 404
+    assert simulator.stats["pages"] == 1
+    assert simulator.stats["downloads"] == 1
+
+async def test_error_injection_truncates_or_fails_responses(monkeypatch):
+    """
+    Tests that injected errors surface as failed or short responses.
+    """
+    with SiteSimulator(scale=1, error_rate=1.0) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        failures = 0
+        for _ in range(6):
+            try:
+                async with http_client() as client:
+                    response = await client.get("http://nnols.org/wp-content/uploads/code/title-0.pdf")
+                failures += response.status_code == 503
+            except Exception:
+                failures += 1
+    assert failures == 6
+    assert simulator.stats["errors"] == 6
@@ -0,0 +1,48 @@
+"""
+Tests for the chunking functionality.
+"""
+from processing.chunking import chunk_spans, chunk_text_by_paragraph
+
+def _words(n, word="word"):
+    return " ".join(f"{word}{i}" for i in range(n))
+
+def test_chunk_text_by_paragraph():
+    """
+    Tests that blank lines separate paragraphs and empty ones are dropped.
+    """
+    assert chunk_text_by_paragraph("  one \n\n\n two\n  \nthree  ") == ["one", "two", "three"]
+
+def test_chunk_spans_break_at_statute_headings():
+    """
+    Tests that sections start new chunks and short fragments are merged.
+    """
+    text = f"TITLE 7\nCHAPTER 1\n§ 201. {_words(60)}\n\n{_words(5)}\n§ 202. {_words(60)}"
+    spans = list(chunk_spans(text, min_tokens=20, target_tokens=100, max_tokens=200))
+
+    assert [text[start:start + 7] for start, _ in spans] == ["TITLE 7", "§ 202. "]
+    assert spans[0][1] < spans[1][0]
+    assert spans[-1][1] == len(text)
+
+def test_chunk_spans_split_oversized_paragraphs_with_overlap():
+    """
+    Tests that giant paragraphs are split at max_tokens with overlapping tokens.
+    """
+    text = _words(250)
+    spans = list(chunk_spans(text, min_tokens=10, target_tokens=50, max_tokens=100, overlap=10))
+    chunks = [text[start:end].split() for start, end in spans]
+
+    assert [len(c) for c in chunks] == [100, 100, 70]
+    assert chunks[0][-10:] == chunks[1][:10]
+
+def test_chunk_spans_fill_chunks_across_lines_and_blank_tails():
+    """
+    Tests that overflowing lines are split by token count, whatever the
+    whitespace, and that trailing blank lines do not close a chunk.
+    """
+    text = "  " + "\n".join(_words(7).replace(" ", " \t ", 2) for _ in range(6)) + "\r\n \n"
+    spans = list(chunk_spans(text, min_tokens=5, target_tokens=10, max_tokens=16, overlap=3))
+
+    assert [len(text[start:end].split()) for start, end in spans] == [16, 16, 16]
+    assert text[spans[1][0]:].startswith("word6\nword0")
+    assert spans[0][0] == 2 and spans[-1][1] == len(text) - 4
+    assert list(chunk_spans("word\n\n§ 1\n\n", min_tokens=5, target_tokens=1)) == [(0, 9)]
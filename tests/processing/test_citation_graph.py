@@ -0,0 +1,65 @@
+"""
+Tests for the citation graph.
+"""
+import os
+from pathlib import Path
+import pytest
+from processing import citation_graph
+from processing.citation_graph import CitationGraph, normalize_citation
+
+def test_normalize_citation():
+    """
+    Tests that citation variants collapse to one section node.
+    """
+    assert normalize_citation("7 N.N.C. §204(A)") == "7 N.N.C. § 204"
+    assert normalize_citation("7 N. N. C. §§ 204") == "7 N.N.C. § 204"
+    assert normalize_citation("not a citation") is None
+
+def test_queries_survive_updates_compaction_and_reload(tmp_path: Path):
+    """
+    Tests citing, cited_by and co-citation queries across incremental updates.
+    """
+    graph = CitationGraph(tmp_path)
+    graph.update_document("opinion_a.pdf", ["7 N.N.C. § 204", "2 N.N.C. § 501"])
+    graph.update_document("opinion_b.pdf", ["7 N.N.C. §204(B)"])
+    assert graph.citing("7 N.N.C. § 204") == ["opinion_a.pdf", "opinion_b.pdf"]
+    graph.save()
+
+    reloaded = CitationGraph(tmp_path)
+    assert reloaded.cited_by("opinion_a.pdf") == ["2 N.N.C. § 501", "7 N.N.C. § 204"]
+    assert reloaded.co_cited("7 N.N.C. § 204") == [("2 N.N.C. § 501", 1)]
+
+    reloaded.update_document("opinion_a.pdf", ["2 N.N.C. § 501"])
+    reloaded.update_document("opinion_c.pdf", ["2 N.N.C. § 501"])
+    assert reloaded.citing("7 N.N.C. § 204") == ["opinion_b.pdf"]
+    assert reloaded.citing("2 N.N.C. § 501") == ["opinion_a.pdf", "opinion_c.pdf"]
+    reloaded.compact()
+    assert reloaded.citing("7 N.N.C. § 204") == ["opinion_b.pdf"]
+    assert reloaded.citing("2 N.N.C. § 501") == ["opinion_a.pdf", "opinion_c.pdf"]
+
+def test_a_failed_save_keeps_the_previous_graph(tmp_path: Path, monkeypatch):
+    """
+    Tests that arrays are written to a new generation, so a save that dies
+    before graph.json is switched leaves the saved graph readable.
+    """
+    graph = CitationGraph(tmp_path)
+    graph.update_document("opinion_a.pdf", ["7 N.N.C. § 204"])
+    graph.save()
+    graph.update_document("opinion_b.pdf", ["7 N.N.C. § 204", "2 N.N.C. § 501"])
+
+    real_replace = os.replace
+    def failing_replace(src, dst):
+        if Path(dst).name == "graph.json":
+            raise OSError("disk full")
+        real_replace(src, dst)
+    monkeypatch.setattr(citation_graph.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        graph.save()
+    assert CitationGraph(tmp_path).citing("7 N.N.C. § 204") == ["opinion_a.pdf"]
+
+    monkeypatch.setattr(citation_graph.os, "replace", real_replace)
+    graph.save()
+    assert CitationGraph(tmp_path).citing("7 N.N.C. § 204") == ["opinion_a.pdf", "opinion_b.pdf"]
+    assert sorted(path.name for path in tmp_path.glob("*.bin")) == [
+        "fwd_indices.2.bin", "fwd_indptr.2.bin", "rev_indices.2.bin", "rev_indptr.2.bin",
+    ]
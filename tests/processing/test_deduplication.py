@@ -0,0 +1,48 @@
+"""
+Tests for near-duplicate detection.
+"""
+from pathlib import Path
+from processing.deduplication import DuplicateIndex
+
+RELEASE = " ".join(
+    f"The Navajo Nation Council approved legislation number {i} regarding grazing permits and water rights."
+    for i in range(40)
+)
+
+def test_near_duplicates_link_to_canonical(tmp_path: Path):
+    """
+    Tests that a lightly edited copy is linked while unrelated text is not.
+    """
+    index = DuplicateIndex(tmp_path / "dedup.sqlite")
+    assert index.check("release.pdf", RELEASE) is None
+    assert index.check("release.md", "# Press Release\n\n" + RELEASE) == "release.pdf"
+    assert index.check("other.pdf", "An unrelated court opinion about tribal sovereignty and jurisdiction.") is None
+
+    assert index.canonical_of("release.md") == "release.pdf"
+    assert index.duplicates_of("release.pdf") == ["release.md"]
+
+    # Re-checking replaces the earlier registration.
+    assert index.check("release.md", "Completely different content now.") is None
+    assert index.duplicates_of("release.pdf") == []
+    index.close()
+
+def test_short_texts_are_never_linked(tmp_path: Path):
+    """
+    Tests that empty scans and page boilerplate are not treated as duplicates of each other.
+    """
+    index = DuplicateIndex(tmp_path / "dedup.sqlite")
+    assert index.check("scan1.pdf", "\n\n") is None
+    assert index.check("scan2.pdf", "\n \n\n") is None
+    assert index.check("a.pdf", "Page 1 of 2") is None
+    assert index.check("b.pdf", "page 1 of 2") is None
+    assert index.canonical_of("b.pdf") is None and index.duplicates_of("a.pdf") == []
+    index.close()
+
+def test_removing_a_canonical_unlinks_its_duplicates(tmp_path: Path):
+    index = DuplicateIndex(tmp_path / "dedup.sqlite")
+    index.check("release.pdf", RELEASE)
+    index.check("release.md", "# Press Release\n\n" + RELEASE)
+    assert index.remove("release.pdf") == ["release.md"]
+    assert index.canonical_of("release.md") is None
+    assert index.check("release.md", RELEASE) is None
+    index.close()
@@ -0,0 +1,102 @@
+"""
+Tests for the section-aligned diff engine.
+"""
+import random
+import time
+from pathlib import Path
+from processing.diffing import diff_texts, myers_diff, split_sections
+
+OLD = """TITLE 7
+§ 201. Definitions
+Court means the district court.
+§ 204. Jurisdiction
+The courts shall have jurisdiction over all matters.
+Appeals go to the Supreme Court.
+§ 205. Repealed
+"""
+
+NEW = """TITLE 7
+§ 201. Definitions
+Court means the district court.
+§ 204. Jurisdiction
+The courts shall have exclusive jurisdiction over all matters.
+Appeals go to the Supreme Court.
+§ 206. Venue
+Venue lies where the claim arose.
+"""
+
+def test_split_sections_by_anchor():
+    """
+    Tests that text is keyed by section number with a preamble.
+    """
+    assert list(split_sections(OLD)) == ["", "201", "204", "205"]
+
+def test_myers_diff_opcodes():
+    """
+    Tests that Myers opcodes describe a minimal line edit.
+    """
+    assert myers_diff(list("abcd"), list("abxd")) == [
+        ("equal", 0, 2, 0, 2), ("replace", 2, 3, 2, 3), ("equal", 3, 4, 3, 4),
+    ]
+
+def _lcs_length(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+def test_myers_diff_keeps_a_longest_common_subsequence():
+    """
+    Tests on random inputs that the linear-space search still finds a minimal edit.
+    """
+    rng = random.Random(7)
+    for _ in range(300):
+        a = [rng.choice("abcd") for _ in range(rng.randint(0, 30))]
+        b = [rng.choice("abcd") for _ in range(rng.randint(0, 30))]
+        opcodes = myers_diff(a, b)
+        equal = [(i1, i2, j1, j2) for tag, i1, i2, j1, j2 in opcodes if tag == "equal"]
+        assert all(a[i1:i2] == b[j1:j2] for i1, i2, j1, j2 in equal)
+        assert sum(i2 - i1 for i1, i2, _, _ in equal) == _lcs_length(a, b)
+        assert (opcodes[-1][2], opcodes[-1][4]) == (len(a), len(b)) if opcodes else a == b == []
+
+def test_myers_diff_caps_the_cost_of_a_full_rewrite():
+    """
+    Tests that a 20,000-line rewrite without section anchors is diffed
+    quickly, with opcodes that still cover both versions.
+    """
+    rng = random.Random(3)
+    old = [f"Clause {rng.randrange(40)} applies." if i % 3 else f"Section text {i}." for i in range(20000)]
+    new = [line if rng.random() < 0.5 else f"Clause {rng.randrange(40)} applies." for line in old]
+    rewritten = [f"Amended clause {i}." for i in range(20000)]
+    for a, b in ((old, new), (old, rewritten)):
+        start = time.perf_counter()
+        opcodes = myers_diff(a, b)
+        assert time.perf_counter() - start < 10
+        assert opcodes[0][1] == opcodes[0][3] == 0
+        assert opcodes[-1][2] == len(a) and opcodes[-1][4] == len(b)
+        for (_, _, i2, _, j2), (_, i1, _, j1, _) in zip(opcodes, opcodes[1:]):
+            assert (i2, j2) == (i1, j1)
+        assert all(a[i1:i2] == b[j1:j2] for tag, i1, i2, j1, j2 in opcodes if tag == "equal")
+    assert opcodes == [("replace", 0, 20000, 0, 20000)]
+
+def test_diff_texts_only_reports_changed_sections(tmp_path: Path):
+    """
+    Tests section statuses, line changes and that results are cached.
+    """
+    result = diff_texts(OLD, NEW, cache_dir=tmp_path)
+    by_section = {entry["section"]: entry for entry in result}
+
+    assert set(by_section) == {"204", "205", "206"}
+    assert by_section["204"]["status"] == "changed"
+    assert by_section["204"]["changes"] == [{
+        "tag": "replace",
+        "old": "The courts shall have jurisdiction over all matters.",
+        "new": "The courts shall have exclusive jurisdiction over all matters.",
+    }]
+    assert by_section["205"]["status"] == "removed"
+    assert by_section["206"]["status"] == "added"
+    assert len(list(tmp_path.glob("*/*.json"))) == 1
+    assert diff_texts(OLD, NEW, cache_dir=tmp_path) == result
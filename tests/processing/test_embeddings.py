@@ -0,0 +1,40 @@
+"""
+Tests for the embedding stage.
+"""
+from pathlib import Path
+from processing.embeddings import EmbeddingCache, LocalEmbeddingBackend, embed_chunks
+
+class CountingBackend(LocalEmbeddingBackend):
+    """
+    A local backend that records its requests and fails the first one.
+    """
+    def __init__(self):
+        super().__init__(dimensions=16)
+        self.requests = []
+        self.fail_next = True
+
+    async def embed(self, texts):
+        self.requests.append(list(texts))
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("transient failure")
+        return await super().embed(texts)
+
+async def test_embed_chunks_batches_retries_and_caches(tmp_path: Path):
+    """
+    Tests that chunks are batched, failed batches retried and cached chunks skipped.
+    """
+    backend = CountingBackend()
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    chunks = ["grazing permits", "water rights", "grazing permits", "court rules"]
+
+    vectors = await embed_chunks(chunks, backend=backend, cache=cache, batch_size=2, concurrency=1, delay=0)
+    assert all(v is not None and len(v) == 16 for v in vectors)
+    assert vectors[0] == vectors[2]
+    assert sorted(len(r) for r in backend.requests) == [1, 2, 2]
+
+    backend.requests.clear()
+    again = await embed_chunks(chunks + ["new chunk"], backend=backend, cache=cache, batch_size=2, delay=0)
+    assert backend.requests == [["new chunk"]]
+    assert again[:4] == vectors
+    cache.close()
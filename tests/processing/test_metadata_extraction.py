@@ -0,0 +1,65 @@
+"""
+Tests for the metadata extraction functionality.
+"""
+import random
+import re
+from pathlib import Path
+from processing.metadata_extraction import ENTITY_PATTERNS, extract_entities, extract_metadata, find_entity
+
+SAMPLE_TEXT = """RESOLUTION CJA-12-24
+Sponsored by Honorable Carl Slater
+Amending 2 N.N.C. § 501 and 7 N.N.C. §204(A) on January 5, 2024.
+See Nez v. Begay, No. SC-CV-12-19 (decided 03/14/2020); also CO-45-19.
+"""
+
+def test_extract_entities_finds_all_occurrences_with_positions():
+    """
+    Tests that every entity type and every occurrence is found in one scan.
+    """
+    entities = extract_entities(SAMPLE_TEXT)
+
+    assert [e["value"] for e in entities["resolution_number"]] == ["CJA-12-24", "CO-45-19"]
+    assert [e["value"] for e in entities["nnc_citation"]] == ["2 N.N.C. § 501", "7 N.N.C. §204(A)"]
+    assert [e["value"] for e in entities["docket_number"]] == ["SC-CV-12-19"]
+    assert [e["value"] for e in entities["date"]] == ["January 5, 2024", "03/14/2020"]
+    assert [e["value"] for e in entities["sponsor"]] == ["Carl Slater"]
+    for occurrences in entities.values():
+        for e in occurrences:
+            assert " ".join(SAMPLE_TEXT[e["start"]:e["end"]].split()) == e["value"]
+
+def test_extract_metadata_uses_source_rules():
+    """
+    Tests that the source is derived from the path and selects the rule set.
+    """
+    metadata = extract_metadata(Path("data/courts/supreme_court/opinion.pdf"), SAMPLE_TEXT)
+
+    assert metadata["source"] == "Navajo Nation Courts"
+    assert "resolution_number" not in metadata
+    assert "sponsor" not in metadata["entities"]
+    assert metadata["entities"]["docket_number"][0]["value"] == "SC-CV-12-19"
+
+    council = extract_metadata(Path("data/navajonationcouncil/bills_and_resolutions/x.pdf"), SAMPLE_TEXT)
+    assert council["resolution_number"] == "CJA-12-24"
+    assert council["date"] == "2024-01-05"
+
+def test_resolution_numbers_are_not_found_inside_docket_numbers():
+    """
+    Tests that a source without docket rules does not read a docket's tail as a resolution.
+    """
+    entities = extract_entities(SAMPLE_TEXT, ("resolution_number",))
+    assert [e["value"] for e in entities["resolution_number"]] == ["CJA-12-24", "CO-45-19"]
+    opvp = extract_metadata(Path("data/opvp/press_releases/x.md"), "Appeal No. SC-CV-12-19 was decided.")
+    assert "resolution_number" not in opvp
+
+def test_anchored_search_matches_a_full_scan():
+    """
+    Tests that trying each pattern only around its anchors finds exactly
+    what a plain `finditer` over the text finds.
+    """
+    rng = random.Random(7)
+    pieces = SAMPLE_TEXT.split() + ["N.", "N.N.C.", "SC-", "-1", "-12-", "/", "1/2/", "May", "Sponsor:", "AB", "12", "7 ", "7 N.N.C. §", "§", "501", "(A)", "\n", "  "]
+    for _ in range(200):
+        text = "".join(rng.choice(pieces) + rng.choice(["", " ", "-", "/"]) for _ in range(60))
+        for kind, pattern in ENTITY_PATTERNS.items():
+            expected = [match.span() for match in re.finditer(pattern, text)]
+            assert [match.span() for match in find_entity(text, kind)] == expected, (kind, text)
@@ -0,0 +1,131 @@
+"""
+Tests for the incremental Phase 2 pipeline.
+"""
+import os
+import time
+from pathlib import Path
+from processing import manifest as manifest_module
+from processing import pipeline as pipeline_module
+from processing.pipeline import Phase2Pipeline
+
+def test_pipeline_only_touches_added_changed_and_removed_files(tmp_path: Path, monkeypatch):
+    """
+    Tests that reruns skip unchanged files and drop removed ones from the index.
+    """
+    monkeypatch.chdir(tmp_path)
+    docs = Path("data/opvp/press_releases")
+    docs.mkdir(parents=True)
+    (docs / "a.md").write_text("# Grazing\n\nGrazing permits were renewed.", encoding="utf-8")
+    (docs / "b.md").write_text("# Water\n\nWater rights settlement approved.", encoding="utf-8")
+
+    pipeline = Phase2Pipeline()
+    assert pipeline.run_once() == 2
+    assert pipeline.run_once() == 0
+
+    (docs / "a.md").write_text("# Grazing\n\nGrazing permits were revoked.", encoding="utf-8")
+    (docs / "b.md").unlink()
+    assert pipeline.run_once() == 2
+    assert [r["path"] for r in pipeline.search_index.search("revoked")] == [str(docs / "a.md")]
+    assert pipeline.search_index.search("water") == []
+    pipeline.close()
+
+    reopened = Phase2Pipeline()
+    assert reopened.run_once() == 0
+    assert reopened.run_once(full=True) == 1
+    reopened.close()
+
+def test_duplicates_are_reindexed_when_their_canonical_goes_away(tmp_path: Path, monkeypatch):
+    """
+    Tests that a duplicate becomes searchable once its canonical copy is deleted or rewritten.
+    """
+    monkeypatch.chdir(tmp_path)
+    docs = Path("data/opvp/press_releases")
+    docs.mkdir(parents=True)
+    body = " ".join(f"Chapter {i} of the grazing regulations covers permits, fees and range units." for i in range(30))
+    pipeline = Phase2Pipeline()
+    (docs / "a.md").write_text("# Grazing\n\n" + body, encoding="utf-8")
+    assert pipeline.run_once() == 1
+    (docs / "b.md").write_text("# Grazing regulations\n\n" + body, encoding="utf-8")
+    assert pipeline.run_once() == 1
+    (docs / "c.md").write_text("# Grazing rules\n\n" + body, encoding="utf-8")
+    assert pipeline.run_once() == 1
+    assert [r["path"] for r in pipeline.search_index.search("permits")] == [str(docs / "a.md")]
+
+    (docs / "a.md").unlink()
+    assert pipeline.run_once() == 3
+    assert [r["path"] for r in pipeline.search_index.search("permits")] == [str(docs / "b.md")]
+    assert pipeline.duplicate_index.canonical_of(str(docs / "c.md")) == str(docs / "b.md")
+
+    (docs / "b.md").write_text("# Water\n\nWater rights settlement approved.", encoding="utf-8")
+    assert pipeline.run_once() == 2
+    assert [r["path"] for r in pipeline.search_index.search("permits")] == [str(docs / "c.md")]
+    pipeline.close()
+
+def test_a_duplicate_processed_before_its_canonical_stays_linked(tmp_path: Path, monkeypatch):
+    """
+    Tests a full run in which a duplicate is processed, then unlinked when its
+    canonical copy is processed after it.
+    """
+    monkeypatch.chdir(tmp_path)
+    find_input_files = pipeline_module.find_input_files
+    monkeypatch.setattr(pipeline_module, "find_input_files", lambda data_dir: sorted(find_input_files(data_dir)))
+    body = " ".join(f"Chapter {i} of the grazing regulations covers permits, fees and range units." for i in range(30))
+    canonical, duplicate = Path("data/zz/a.md"), Path("data/aa/b.md")
+    canonical.parent.mkdir(parents=True)
+    duplicate.parent.mkdir(parents=True)
+    pipeline = Phase2Pipeline()
+    canonical.write_text("# Grazing\n\n" + body, encoding="utf-8")
+    assert pipeline.run_once() == 1
+    duplicate.write_text("# Grazing regulations\n\n" + body, encoding="utf-8")
+    assert pipeline.run_once() == 1
+
+    assert pipeline.run_once(full=True) == 3
+    assert pipeline.duplicate_index.canonical_of(str(duplicate)) == str(canonical)
+    assert [r["path"] for r in pipeline.search_index.search("permits")] == [str(canonical)]
+    pipeline.close()
+
+def test_unsettled_files_are_not_hashed_and_emptied_files_are_unindexed(tmp_path: Path, monkeypatch):
+    """
+    Tests that files still being written are deferred without being read,
+    and that a file which no longer yields text loses its old entries.
+    """
+    monkeypatch.chdir(tmp_path)
+    docs = Path("data/opvp/press_releases")
+    docs.mkdir(parents=True)
+    (docs / "a.md").write_text("# Grazing\n\nGrazing permits were renewed.", encoding="utf-8")
+    hashed = []
+    digest = manifest_module.file_digest
+    monkeypatch.setattr(manifest_module, "file_digest", lambda path: hashed.append(path) or digest(path))
+
+    pipeline = Phase2Pipeline()
+    assert pipeline.run_once(settle=60) == 0
+    assert hashed == [] and pipeline.manifest._snapshots == {}
+    old = time.time() - 120
+    os.utime(docs / "a.md", (old, old))
+    assert pipeline.run_once(settle=60) == 1
+    assert pipeline.search_index.search("permits")
+
+    (docs / "a.md").write_text("", encoding="utf-8")
+    assert pipeline.run_once() == 1
+    assert pipeline.search_index.search("permits") == []
+    pipeline.close()
+
+def test_record_skips_files_that_vanished(tmp_path: Path):
+    manifest = manifest_module.ProcessedManifest(tmp_path / "manifest.json")
+    path = tmp_path / "gone.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    assert manifest.plan([path]) == ([path], [])
+    path.unlink()
+    manifest.record(path)
+    assert manifest.entries == {}
+
+def test_a_file_rewritten_while_processed_is_processed_again(tmp_path: Path):
+    manifest = manifest_module.ProcessedManifest(tmp_path / "manifest.json")
+    path = tmp_path / "a.md"
+    path.write_text("first", encoding="utf-8")
+    assert manifest.plan([path]) == ([path], [])
+    path.write_text("second draft", encoding="utf-8")
+    manifest.record(path)
+    assert manifest.plan([path]) == ([path], [])
+    manifest.record(path)
+    assert manifest.plan([path]) == ([], [])
@@ -0,0 +1,53 @@
+"""
+Tests for the full-text search index.
+"""
+from pathlib import Path
+import processing.search_index as search_index
+from processing.search_index import SearchIndex
+
+def test_search_ranks_matching_chunks(tmp_path: Path):
+    """
+    Tests that BM25 ranks the chunk mentioning the query terms first.
+    """
+    index = SearchIndex(tmp_path)
+    index.add_document("a.pdf", ["Grazing permits are issued by the district.", "Unrelated text."], {"source": "Council"})
+    index.add_document("b.pdf", ["Water rights and permits."], {"source": "Courts"})
+    index.commit()
+
+    results = index.search("grazing permits")
+    assert results[0]["path"] == "a.pdf"
+    assert results[0]["chunk"] == 0
+    assert {r["path"] for r in results} == {"a.pdf", "b.pdf"}
+    index.close()
+
+def test_phrase_query_requires_adjacent_terms(tmp_path: Path):
+    """
+    Tests that quoted phrases only match consecutive terms.
+    """
+    index = SearchIndex(tmp_path)
+    index.add_document("a.pdf", ["permits for grazing"])
+    index.add_document("b.pdf", ["new grazing permits"])
+    index.commit()
+
+    results = index.search('"grazing permits"')
+    assert [r["path"] for r in results] == ["b.pdf"]
+    index.close()
+
+def test_readding_replaces_and_segments_merge(tmp_path: Path, monkeypatch):
+    """
+    Tests that re-adding a document replaces it and that segments are merged.
+    """
+    monkeypatch.setattr(search_index, "MAX_SEGMENTS", 2)
+    monkeypatch.setattr(search_index, "MERGE_FACTOR", 2)
+    index = SearchIndex(tmp_path)
+    for i in range(4):
+        index.add_document("a.pdf", [f"version{i} livestock"])
+        index.commit()
+    index.close()
+
+    reopened = SearchIndex(tmp_path)
+    assert len(reopened.segments) <= 2
+    assert [r["path"] for r in reopened.search("livestock")] == ["a.pdf"]
+    assert reopened.search("version3")
+    assert not reopened.search("version0")
+    reopened.close()
@@ -0,0 +1,84 @@
+"""
+Tests for the local vector index.
+"""
+from pathlib import Path
+import numpy as np
+import pytest
+from processing.vector_index import VectorIndex
+
+def _rows(key, n, source, date):
+    return [{"key": key, "chunk": i, "source": source, "date": date} for i in range(n)]
+
+def test_search_filters_and_replaces(tmp_path: Path):
+    """
+    Tests top-k search with source and date filters across appended segments.
+    """
+    index = VectorIndex(tmp_path)
+    index.add(_rows("a.pdf", 2, "Courts", "2020-01-01"), [[1, 0, 0], [0, 1, 0]])
+    index.add(_rows("b.pdf", 1, "Council", "2024-05-01"), [[0.9, 0.1, 0]])
+    index.flush()
+
+    reopened = VectorIndex(tmp_path)
+    assert [(r["key"], r["chunk"]) for r in reopened.search([1, 0, 0], top_k=2)] == [("a.pdf", 0), ("b.pdf", 0)]
+    assert [r["key"] for r in reopened.search([1, 0, 0], source="Council")] == ["b.pdf"]
+    assert [r["key"] for r in reopened.search([1, 0, 0], date_to="2021-12-31")] == ["a.pdf", "a.pdf"]
+
+    reopened.add(_rows("a.pdf", 1, "Courts", "2020-01-01"), [[0, 0, 1]])
+    assert [(r["key"], r["chunk"]) for r in reopened.search([1, 0, 0], top_k=5)] == [("b.pdf", 0), ("a.pdf", 0)]
+
+def test_ivf_search_matches_exhaustive_search(tmp_path: Path):
+    """
+    Tests that IVF search with all lists probed agrees with brute force, including later additions.
+    """
+    rng = np.random.default_rng(1)
+    index = VectorIndex(tmp_path)
+    index.add(_rows("a.pdf", 500, "Courts", None), rng.normal(size=(500, 8)))
+    query = rng.normal(size=8)
+    exhaustive = [r["chunk"] for r in index.search(query, top_k=5)]
+
+    index.build_ivf(n_lists=10)
+    index.add(_rows("b.pdf", 1, "Courts", None), [query])
+    results = index.search(query, top_k=6, nprobe=10)
+    assert results[0]["key"] == "b.pdf"
+    assert [r["chunk"] for r in results[1:]] == exhaustive
+
+def test_removals_use_the_key_map_and_compact(tmp_path: Path, monkeypatch):
+    """
+    Tests that replacing and removing documents does not read segment
+    metadata, and that tombstoned rows are compacted away on flush.
+    """
+    index = VectorIndex(tmp_path)
+    for n in range(8):
+        index.add(_rows(f"{n}.pdf", 3, "Courts", None), np.eye(4)[[n % 4] * 3])
+    index.flush()
+
+    reopened = VectorIndex(tmp_path)
+    monkeypatch.setattr(VectorIndex, "_read_metadata", lambda self, name: pytest.fail(f"read {name} metadata"))
+    reopened.add(_rows("0.pdf", 1, "Courts", None), [[0, 1, 0, 0]])
+    reopened.remove("1.pdf")
+    reopened.remove("2.pdf")
+    assert reopened.size == 25 and len(reopened._deleted) == 9
+    monkeypatch.undo()
+
+    reopened.flush()
+    assert reopened.size == 16 and not reopened._deleted
+    assert len(list(tmp_path.glob("*.vec"))) == 6
+    results = VectorIndex(tmp_path).search([0, 1, 0, 0], top_k=16)
+    assert sorted({r["key"] for r in results}) == ["0.pdf", "3.pdf", "4.pdf", "5.pdf", "6.pdf", "7.pdf"]
+    assert [r["chunk"] for r in results if r["key"] == "0.pdf"] == [0]
+
+def test_full_reindex_does_not_grow_storage(tmp_path: Path):
+    """
+    Tests that re-adding every document leaves the index the same size on disk.
+    """
+    index = VectorIndex(tmp_path)
+    rng = np.random.default_rng(2)
+    for n in range(5):
+        index.add(_rows(f"{n}.pdf", 10, "Courts", None), rng.normal(size=(10, 8)))
+    index.flush()
+    size_on_disk = sum(f.stat().st_size for f in tmp_path.glob("*.vec"))
+    for n in range(5):
+        index.add(_rows(f"{n}.pdf", 10, "Courts", None), rng.normal(size=(10, 8)))
+    index.flush()
+    assert sum(f.stat().st_size for f in tmp_path.glob("*.vec")) == size_on_disk
+    assert VectorIndex(tmp_path).size == 50
@@ -0,0 +1,65 @@
+"""
+Tests for the content-addressed blob store.
+"""
+import hashlib
+from pathlib import Path
+from scrapers.blob_store import BlobStore, blob_store, deduplicate_downloads
+
+PDF = b"%PDF-1.4\n1 0 obj\n<<>>\nendobj\n%%EOF\n"
+
+def test_identical_downloads_share_one_blob(tmp_path: Path):
+    """
+    Tests that identical content is stored once and linked at every path.
+    """
+    store = BlobStore(tmp_path / "blobs")
+    first, second = tmp_path / "a" / "one.pdf", tmp_path / "b" / "two.pdf"
+    sha256, size = store.store(PDF, first, "https://example.org/one.pdf")
+    assert store.store(PDF, second, "https://example.org/two.pdf") == (sha256, size)
+    assert sha256 == hashlib.sha256(PDF).hexdigest() and size == len(PDF)
+    blob = store.blob_path(sha256)
+    assert blob == tmp_path / "blobs" / sha256[:2] / sha256[2:4] / sha256
+    assert first.read_bytes() == second.read_bytes() == PDF
+    assert first.stat().st_ino == second.stat().st_ino == blob.stat().st_ino
+    assert store.ref(second) == {"url": "https://example.org/two.pdf", "sha256": sha256, "size": size}
+    assert store.ref(tmp_path / "missing.pdf") is None
+    assert not any((tmp_path / "blobs" / "tmp").iterdir())
+    store.close()
+
+def test_damaged_blob_is_replaced(tmp_path: Path):
+    """
+    Tests that a blob truncated through one of its links is rewritten.
+    """
+    store = BlobStore(tmp_path / "blobs")
+    path = tmp_path / "doc.pdf"
+    sha256, _ = store.store(PDF, path)
+    path.write_bytes(PDF[:10])
+    store.store(PDF, tmp_path / "again.pdf")
+    assert store.blob_path(sha256).read_bytes() == PDF
+
+    # Damage that keeps the size is caught by the hash.
+    path.write_bytes(PDF.replace(b"1 0", b"2 0"))
+    store.store(PDF, tmp_path / "third.pdf")
+    assert store.blob_path(sha256).read_bytes() == PDF
+    store.close()
+
+def test_deduplicate_downloads_adopts_existing_files(tmp_path: Path, monkeypatch):
+    """
+    Tests that files written before the blob store are linked to one copy,
+    with a reference recorded for each path and the URL kept.
+    """
+    monkeypatch.chdir(tmp_path)
+    copies = [Path("data/dibb/bills/1.pdf"), Path("data/courts/supreme_court/1.pdf")]
+    for path in copies:
+        path.parent.mkdir(parents=True)
+        path.write_bytes(PDF)
+    Path("data/nnols/other.pdf").parent.mkdir(parents=True)
+    Path("data/nnols/other.pdf").write_bytes(PDF + b"more")
+    store = blob_store()
+    store._record(copies[0], "https://dibb.nnols.org/1", "0" * 64, 1)
+
+    assert deduplicate_downloads() == (3, len(PDF))
+    assert copies[0].stat().st_ino == copies[1].stat().st_ino
+    assert store.ref(copies[0])["url"] == "https://dibb.nnols.org/1"
+    assert store.ref(copies[1])["sha256"] == hashlib.sha256(PDF).hexdigest()
+    assert deduplicate_downloads() == (3, 0)
+    store.close()
@@ -1,9 +1,20 @@
 """
 Tests for the download functionality.
 """
+import json
+import threading
+import httpx
 import pytest
 from pathlib import Path
-from scrapers.nnols_scrapers import download_file
+from benchmarks.site_simulator import PDF_SIZE, SiteSimulator
+from scrapers.browser import http_client
+from scrapers.integrity import check_file
+from scrapers import blob_store as blob_store_module
+from scrapers.blob_store import blob_store
+from scrapers import host_health as health_module
+from scrapers import nnols_scrapers
+from scrapers.host_health import host_health
+from scrapers.nnols_scrapers import download_file, download_files, download_paths
 
 @pytest.mark.parametrize(
     "url",
@@ -21,4 +32,141 @@ async def test_download_file(url: str, tmp_path: Path, page):
     file_name = url.split("/")[-1]
     download_path = tmp_path / file_name
     await download_file(page, url, download_path)
-    assert download_path.exists()
\ No newline at end of file
+    assert download_path.exists()
+
+async def test_download_files_fans_out(tmp_path: Path, monkeypatch):
+    """
+    Tests that download_files fetches each distinct URL once and reports its status.
+    """
+    monkeypatch.chdir(tmp_path)
+    out_dir = tmp_path / "out"
+    urls = [f"http://nnols.org/wp-content/uploads/code/title-{i}.pdf" for i in range(5)]
+    with SiteSimulator(scale=5, latency=0.05) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        statuses = await download_files(urls + urls[:2] + ["http://nnols.org/nowhere"], out_dir, num_workers=4)
+    assert [statuses[url] for url in urls] == ["Success"] * 5
+    assert statuses["http://nnols.org/nowhere"] == "Not Found"
+    assert sorted(path.name for path in out_dir.iterdir()) == sorted(url.split("/")[-1] for url in urls)
+    assert simulator.stats["downloads"] == 5
+
+def test_download_paths_keep_colliding_names_apart(tmp_path: Path, monkeypatch):
+    """
+    Tests that different URLs sharing a file name get distinct paths, and a
+    URL keeps the path it was downloaded to before.
+    """
+    monkeypatch.chdir(tmp_path)
+    first = "https://www.navajonationcouncil.org/wp-content/uploads/2024/01/CJA-01-24.pdf"
+    second = "https://www.navajonationcouncil.org/wp-content/uploads/2025/01/CJA-01-24.pdf"
+    paths = download_paths([first, second, first], Path("out"))
+    assert paths[first] == Path("out/CJA-01-24.pdf")
+    assert paths[second].parent == Path("out") and paths[second].name.startswith("CJA-01-24-")
+    assert paths[second].suffix == ".pdf"
+
+    blob_store().store(b"%PDF-1.4 second", Path("out/CJA-01-24.pdf"), second)
+    assert download_paths([second], Path("out"))[second] == Path("out/CJA-01-24.pdf")
+    assert download_paths([first], Path("out"))[first] != Path("out/CJA-01-24.pdf")
+
+@pytest.mark.parametrize("validator_matches", [True, False])
+async def test_download_file_resumes_partial_downloads(tmp_path: Path, monkeypatch, validator_matches: bool):
+    """
+    Tests that a kept partial file is completed with a Range request, and
+    fetched in full when the document changed since.
+    """
+    monkeypatch.chdir(tmp_path)
+    url = "http://nnols.org/wp-content/uploads/code/title-0.pdf"
+    download_path = tmp_path / "out" / "title-0.pdf"
+    download_path.parent.mkdir()
+    with SiteSimulator(scale=1) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        async with http_client() as client:
+            full = await client.get(url)
+        simulator.reset_stats()
+        kept = len(full.content) // 3
+        download_path.with_name("title-0.pdf.part").write_bytes(full.content[:kept])
+        validator = full.headers["ETag"] if validator_matches else '"stale"'
+        download_path.with_name("title-0.pdf.part.json").write_text(json.dumps({"url": url, "validator": validator}))
+        assert await download_file(url, download_path, delay=0) == "Success"
+    assert download_path.read_bytes() == full.content
+    assert simulator.stats["bytes"] == (len(full.content) - kept if validator_matches else len(full.content))
+    assert not download_path.with_name("title-0.pdf.part").exists()
+    assert not download_path.with_name("title-0.pdf.part.json").exists()
+
+async def test_downloads_are_hashed_off_the_event_loop(tmp_path: Path, monkeypatch):
+    """
+    Tests that a finished download is hashed in a worker thread.
+    """
+    monkeypatch.chdir(tmp_path)
+    threads = []
+    fingerprint = blob_store_module.file_fingerprint
+    monkeypatch.setattr(blob_store_module, "file_fingerprint", lambda path: threads.append(threading.get_ident()) or fingerprint(path))
+    with SiteSimulator(scale=1) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        assert await download_file("http://nnols.org/wp-content/uploads/code/title-0.pdf", Path("out/title-0.pdf")) == "Success"
+    assert threads and threading.get_ident() not in threads
+
+async def test_download_file_keeps_interrupted_transfers(tmp_path: Path, monkeypatch):
+    """
+    Tests that bytes received before a transfer breaks off are not fetched again.
+    """
+    monkeypatch.chdir(tmp_path)
+    urls = [f"http://nnols.org/wp-content/uploads/code/title-{i}.pdf" for i in range(6)]
+    with SiteSimulator(scale=6, error_rate=0.5, seed=3) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        statuses = [await download_file(url, tmp_path / "out" / url.split("/")[-1], retries=8, delay=0) for url in urls]
+    assert statuses == ["Success"] * 6
+    assert all(check_file(tmp_path / "out" / url.split("/")[-1]) is None for url in urls)
+    # Truncated responses deliver half a file, and only the rest is requested again.
+    assert simulator.stats["bytes"] < 6 * PDF_SIZE * 1.1
+
+async def test_verification_uses_the_fingerprint_recorded_at_download(tmp_path: Path, monkeypatch):
+    """
+    Tests that a file damaged after download is repaired even when its size is unchanged.
+    """
+    from catalog import BillCatalog
+    from scrapers.dibb_scrapers import download_fingerprint, verify_and_redownload_files
+    monkeypatch.chdir(tmp_path)
+    url = "http://dibb.nnols.org/api/FileInfo/GetUri/?id=7"
+    path = Path("data/dibb/bills/7.pdf")
+    with SiteSimulator(scale=1) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        assert await download_file(url, path) == "Success"
+        fingerprint = download_fingerprint(path)
+        catalog = BillCatalog()
+        catalog.upsert_bill({"legislation_number": "0007-24", "documents": [
+            {"url": url, "title": "7", "local_path": str(path), "download_status": "Success", **fingerprint},
+        ]})
+        original = path.read_bytes()
+        path.write_bytes(original[:100] + b"X" * 10 + original[110:])
+        await verify_and_redownload_files(catalog)
+        assert simulator.stats["downloads"] == 2
+    assert path.read_bytes() == original
+    assert {k: catalog.documents()[0][k] for k in ("size", "sha256")} == fingerprint
+    catalog.close()
+
+async def test_download_probes_always_resolve(tmp_path: Path, monkeypatch):
+    """
+    Tests that a probe answered with a 403 closes the circuit, and that a
+    local error after a failed probe does not leave it half-open.
+    """
+    monkeypatch.setattr(health_module, "COOLDOWN", 0.05)
+    monkeypatch.setattr(health_module, "_hosts", {})
+    url = "http://nnols.org/wp-content/uploads/code/title-1.pdf"
+    outcomes = []
+
+    async def fetch(client, url, part_path, state_path):
+        raise outcomes.pop(0)
+
+    monkeypatch.setattr(nnols_scrapers, "_fetch_to_part", fetch)
+    health = host_health(url)
+    for _ in range(health_module.FAILURE_THRESHOLD):
+        health.record_failure()
+    request = httpx.Request("GET", url)
+    outcomes.append(httpx.HTTPStatusError("forbidden", request=request, response=httpx.Response(403, request=request)))
+    assert await download_file(url, tmp_path / "a.pdf", retries=1, delay=0) == "Failed"
+    assert health.state == "closed"
+
+    for _ in range(health_module.FAILURE_THRESHOLD):
+        health.record_failure()
+    outcomes.append(OSError("disk full"))
+    assert await download_file(url, tmp_path / "a.pdf", retries=1, delay=0) == "Failed"
+    assert health.state == "open"
@@ -0,0 +1,123 @@
+"""
+Tests for the per-host circuit breaker and adaptive timeouts.
+"""
+import asyncio
+import time
+import pytest
+from scrapers import host_health as health_module
+from scrapers.browser import goto
+from scrapers.host_health import HostHealth, HostUnavailable, host_health
+
+@pytest.fixture(autouse=True)
+def fast_breaker(monkeypatch):
+    monkeypatch.setattr(health_module, "COOLDOWN", 0.1)
+    monkeypatch.setattr(health_module, "MAX_COOLDOWN", 0.4)
+    monkeypatch.setattr(health_module, "_hosts", {})
+
+def test_timeout_follows_latency_percentile():
+    """
+    Tests that the timeout starts at the default and then tracks recent latencies within bounds.
+    """
+    health = HostHealth("dibb.nnols.org")
+    assert health.timeout() == health_module.DEFAULT_TIMEOUT
+    for latency in [4.0] * 19 + [30.0]:
+        health.record_success(latency)
+    assert health.timeout() == health_module.MAX_TIMEOUT
+    for _ in range(200):
+        health.record_success(4.0)
+    assert health.timeout() == 12.0
+    for _ in range(200):
+        health.record_success(0.2)
+    assert health.timeout() == health_module.MIN_TIMEOUT
+
+async def test_circuit_opens_probes_and_closes():
+    """
+    Tests that repeated failures hold requests back until a probe succeeds.
+    """
+    health = host_health("http://dibb.nnols.org/Legislation.aspx?LegislationID=1")
+    assert health is host_health("http://dibb.nnols.org/publicreporting.aspx")
+    for _ in range(health_module.FAILURE_THRESHOLD - 1):
+        health.record_failure()
+    assert health.state == "closed"
+    health.record_failure()
+    assert health.state == "open"
+
+    start = time.monotonic()
+    await health.before_request()
+    assert time.monotonic() - start >= 0.09
+    assert health.state == "half_open"
+
+    # Other requests wait while the probe is in flight; a failed probe doubles the cool-down.
+    waiter = asyncio.create_task(health.before_request())
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    health.record_failure()
+    assert health.state == "open" and health.cooldown == pytest.approx(0.2)
+    await waiter
+    assert health.state == "half_open"
+    health.record_success(1.0)
+    assert health.state == "closed" and health.cooldown == pytest.approx(0.1)
+    await asyncio.wait_for(health.before_request(), 0.01)
+
+async def test_gives_up_on_a_host_that_stays_down(monkeypatch):
+    monkeypatch.setattr(health_module, "GIVE_UP_AFTER", 0.0)
+    health = host_health("https://opvp.navajo-nsn.gov/")
+    for _ in range(health_module.FAILURE_THRESHOLD):
+        health.record_failure()
+    with pytest.raises(HostUnavailable):
+        await health.before_request()
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+class FakePage:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    async def goto(self, url, timeout=None, **options):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+async def test_goto_reports_outcomes_and_uses_adaptive_timeout():
+    """
+    Tests that navigations feed the host's health and get its timeout.
+    """
+    url = "https://courts.navajo-nsn.gov/supreme-court-opinions/"
+    page = FakePage([200, 503, TimeoutError("stalled"), 200])
+    assert (await goto(page, url, wait_until="networkidle")).status == 200
+    assert (await goto(page, url)).status == 503
+    with pytest.raises(TimeoutError):
+        await goto(page, url)
+    health = host_health(url)
+    assert health.failures == 2 and len(health.latencies) == 1
+    await goto(page, url, timeout=5000)
+    assert page.timeouts == [60000, 60000, 60000, 5000]
+    assert health.failures == 0
+
+class HangingPage:
+    async def goto(self, url, timeout=None, **options):
+        await asyncio.sleep(60)
+
+async def test_a_probe_that_never_answers_reopens_the_circuit():
+    """
+    Tests that a probe cancelled before recording an outcome counts as a
+    failure instead of leaving the circuit half-open.
+    """
+    url = "http://dibb.nnols.org/publicreporting.aspx"
+    health = host_health(url)
+    for _ in range(health_module.FAILURE_THRESHOLD):
+        health.record_failure()
+    probe = asyncio.create_task(goto(HangingPage(), url))
+    await asyncio.sleep(0.15)
+    assert health.state == "half_open"
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert health.state == "open" and health.cooldown == pytest.approx(0.2)
+    assert (await goto(FakePage([403]), url)).status == 403
+    assert health.state == "closed"
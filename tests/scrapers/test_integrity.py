@@ -0,0 +1,29 @@
+"""
+Tests for the download integrity checks.
+"""
+from pathlib import Path
+from scrapers.integrity import check_file, file_fingerprint
+
+PDF_BYTES = b"%PDF-1.7\n1 0 obj\n<<>>\nendobj\ntrailer\n<<>>\n%%EOF\n"
+
+def test_check_file_detects_missing_truncated_and_changed_files(tmp_path: Path):
+    """
+    Tests that intact files pass and damaged ones are reported.
+    """
+    pdf = tmp_path / "bill.pdf"
+    assert check_file(pdf) == "missing"
+
+    pdf.write_bytes(PDF_BYTES)
+    size, sha256 = file_fingerprint(pdf)
+    assert size == len(PDF_BYTES)
+    assert check_file(pdf, size, sha256) is None
+
+    pdf.write_bytes(PDF_BYTES[:20])
+    assert check_file(pdf) == "truncated or invalid PDF"
+    assert check_file(pdf, size, sha256).startswith("size")
+
+    pdf.write_bytes(PDF_BYTES.replace(b"1 0", b"2 0"))
+    assert check_file(pdf, size, sha256) == "hash mismatch"
+
+    pdf.write_bytes(b"")
+    assert check_file(pdf) == "empty"
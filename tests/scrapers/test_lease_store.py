@@ -0,0 +1,105 @@
+"""
+Tests for the SQLite lease store that coordinates multi-process crawls.
+"""
+import threading
+from pathlib import Path
+import pytest
+from scrapers import lease_store as lease_module
+from scrapers.lease_store import ActiveLeasesError, LeaseStore
+
+URLS = [f"http://dibb.nnols.org/Legislation.aspx?LegislationID={i}" for i in range(5)]
+
+def test_claims_are_handed_out_in_order_and_finished(tmp_path: Path):
+    """
+    Tests claiming, completing and retrying failed URLs until their attempts run out.
+    """
+    store = LeaseStore(tmp_path / "leases.sqlite")
+    store.reset(URLS)
+    assert store._db.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert [store.claim("a") for _ in range(3)] == URLS[:3]
+    assert store.complete(URLS[0], "a")
+    assert store.release(URLS[1], "a")
+    assert store.counts() == {"done": 1, "leased": 1, "pending": 3}
+    assert store.claim("b") == URLS[1]
+    for _ in range(lease_module.MAX_ATTEMPTS - 2):
+        store.release(URLS[1], "b")
+        assert store.claim("b") == URLS[1]
+    store.release(URLS[1], "b")
+    assert store.failed() == [URLS[1]]
+    assert store.remaining() == 3
+    store.close()
+
+def test_expired_leases_are_reclaimed(tmp_path: Path):
+    """
+    Tests that a crashed worker's lease is picked up by another once it runs out,
+    and that renewing keeps a lease.
+    """
+    store = LeaseStore(tmp_path / "leases.sqlite")
+    other = LeaseStore(tmp_path / "leases.sqlite")
+    store.reset(URLS[:2])
+    assert store.claim("alive", lease_seconds=-1) == URLS[0]
+    assert store.renew("alive") == 1
+    assert store.claim("crashed", lease_seconds=-1) == URLS[1]
+    assert other.claim("survivor") == URLS[1]
+    assert other.claim("survivor") is None
+    assert other.remaining() == 2
+    # The crashed worker no longer owns its URL, so it cannot finish or release it.
+    assert not store.complete(URLS[1], "crashed")
+    assert not store.release(URLS[1], "crashed")
+    assert other.complete(URLS[1], "survivor")
+    store.close()
+    other.close()
+
+def test_reset_refuses_a_store_in_use(tmp_path: Path):
+    """
+    Tests that a new crawl cannot wipe a store while a worker holds a live
+    lease, but can once the leases have run out.
+    """
+    store = LeaseStore(tmp_path / "leases.sqlite")
+    store.reset(URLS[:2])
+    store.claim("joiner")
+    with pytest.raises(ActiveLeasesError):
+        store.reset(URLS)
+    assert store.counts() == {"leased": 1, "pending": 1}
+    store.renew("joiner", lease_seconds=-1)
+    store.reset(URLS)
+    assert store.counts() == {"pending": 5}
+    store.close()
+
+def test_a_url_that_keeps_killing_workers_is_failed(tmp_path: Path):
+    """
+    Tests that a URL whose lease expires on every attempt is marked failed
+    instead of being handed out again.
+    """
+    store = LeaseStore(tmp_path / "leases.sqlite")
+    store.reset(URLS[:1])
+    for attempt in range(lease_module.MAX_ATTEMPTS):
+        assert store.claim(f"worker-{attempt}", lease_seconds=-1) == URLS[0]
+    assert store.claim("worker-last") is None
+    assert store.failed() == URLS[:1] and store.remaining() == 0
+    store.close()
+
+def test_concurrent_claims_never_share_a_url(tmp_path: Path):
+    """
+    Tests that workers with their own connections each get distinct URLs.
+    """
+    urls = [f"http://dibb.nnols.org/Legislation.aspx?LegislationID={i}" for i in range(400)]
+    setup = LeaseStore(tmp_path / "leases.sqlite")
+    setup.reset(urls)
+    claimed = []
+
+    def worker(name):
+        store = LeaseStore(tmp_path / "leases.sqlite")
+        while (url := store.claim(name)) is not None:
+            claimed.append(url)
+            assert store.complete(url, name)
+        store.close()
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(urls)
+    assert setup.counts() == {"done": 400}
+    setup.close()
@@ -0,0 +1,142 @@
+"""
+Tests for the on-disk page cache.
+"""
+import time
+from pathlib import Path
+import pytest
+from benchmarks.site_simulator import SiteSimulator
+from scrapers import page_cache as cache_module
+from scrapers.browser import _route_handler, http_client
+from scrapers.page_cache import PageCache, page_cache_from_config
+from scrapers.wordpress import WordPressAPIError, fetch_posts
+
+URL = "https://www.navajonationcouncil.org/press-releases-archive/"
+
+def _cache(tmp_path: Path, mode: str, ttl: float = 60) -> PageCache:
+    return PageCache(tmp_path / "pages.sqlite", ttl=ttl, mode=mode)
+
+def test_on_mode_serves_fresh_entries_only(tmp_path: Path):
+    """
+    Tests that responses are served within the TTL and refetched after it.
+    """
+    cache = _cache(tmp_path, "on", ttl=0.05)
+    assert cache.get(URL) is None
+    cache.put(URL, 200, {"Content-Type": "text/html", "Content-Encoding": "gzip"}, b"<html></html>")
+    cache.put(URL + "missing", 404, {}, b"")
+    entry = cache.get(URL)
+    assert entry == {"status": 200, "headers": {"Content-Type": "text/html"}, "body": b"<html></html>"}
+    assert cache.get(URL + "missing") is None
+    time.sleep(0.1)
+    assert cache.get(URL) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.close()
+
+def test_record_refreshes_and_replay_ignores_age(tmp_path: Path):
+    """
+    Tests that record mode never serves and replay mode serves stale entries.
+    """
+    recorder = _cache(tmp_path, "record", ttl=0)
+    recorder.put(URL, 200, {}, b"v1")
+    assert recorder.get(URL) is None
+    recorder.put(URL, 200, {}, b"v2")
+    recorder.close()
+
+    replay = _cache(tmp_path, "replay", ttl=0)
+    assert replay.get(URL)["body"] == b"v2"
+    assert replay.get(URL + "other") is None
+    replay.close()
+
+def test_unknown_mode_is_rejected(tmp_path: Path):
+    with pytest.raises(ValueError):
+        _cache(tmp_path, "sometimes")
+
+@pytest.fixture
+def configured_cache(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_PATH", tmp_path / "pages.sqlite")
+    monkeypatch.setattr(cache_module, "_caches", {})
+    monkeypatch.setattr(cache_module.atexit, "register", lambda close: None)
+
+def test_contexts_share_one_cache_per_process(configured_cache, monkeypatch):
+    """
+    Tests that the configured cache is opened once and that "off" disables it.
+    """
+    monkeypatch.setenv("ZHIN_PAGE_CACHE", "on")
+    cache = page_cache_from_config()
+    assert page_cache_from_config() is cache
+    monkeypatch.setenv("ZHIN_PAGE_CACHE", "off")
+    assert page_cache_from_config() is None
+    cache.close()
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+        self.method = "GET"
+
+class FakeResponse:
+    def __init__(self, content_type):
+        self.status = 200
+        self.headers = {"content-type": content_type}
+
+    async def body(self):
+        return b"body"
+
+class FakeRoute:
+    def __init__(self, url, resource_type, content_type="text/html; charset=utf-8"):
+        self.request = FakeRequest(url, resource_type)
+        self.content_type = content_type
+        self.outcome = None
+
+    async def fetch(self, url=None):
+        return FakeResponse(self.content_type)
+
+    async def fulfill(self, response=None, **served):
+        self.outcome = "fetched" if response else "cached"
+
+    async def abort(self, reason):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+async def test_only_pages_and_xhr_html_are_cached(tmp_path: Path):
+    """
+    Tests that the route handler caches HTML documents and XHR data but not
+    assets or downloads, and that replay mode never goes to the network.
+    """
+    handle = _route_handler(_cache(tmp_path, "on"), None)
+    routes = [
+        FakeRoute(URL, "document"),
+        FakeRoute(URL + "list", "xhr", "application/json"),
+        FakeRoute(URL + "bill.pdf", "document", "application/pdf"),
+        FakeRoute(URL + "site.js", "script", "text/javascript"),
+    ]
+    for route in routes:
+        await handle(route)
+    assert [route.outcome for route in routes] == ["fetched", "fetched", "fetched", "continued"]
+
+    replay = _route_handler(_cache(tmp_path, "replay"), None)
+    routes = [FakeRoute(URL, "document"), FakeRoute(URL + "list", "xhr"),
+              FakeRoute(URL + "bill.pdf", "document"), FakeRoute(URL + "site.js", "script")]
+    for route in routes:
+        await replay(route)
+    assert [route.outcome for route in routes] == ["cached", "cached", "aborted", "aborted"]
+
+async def test_rest_api_requests_are_recorded_and_replayed(configured_cache, monkeypatch):
+    """
+    Tests that the HTTP client goes through the page cache, so a replayed
+    crawl of the REST API never reaches the site.
+    """
+    site = "https://opvp.navajo-nsn.gov"
+    with SiteSimulator(scale=15) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        monkeypatch.setenv("ZHIN_PAGE_CACHE", "record")
+        async with http_client() as client:
+            recorded = await fetch_posts(client, site, per_page=10)
+        monkeypatch.setenv("ZHIN_PAGE_CACHE", "replay")
+        requests = simulator.stats["requests"]
+        async with http_client() as client:
+            assert await fetch_posts(client, site, per_page=10) == recorded
+            with pytest.raises(WordPressAPIError):
+                await fetch_posts(client, site, per_page=5)
+        assert simulator.stats["requests"] == requests
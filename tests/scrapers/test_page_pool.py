@@ -0,0 +1,150 @@
+"""
+Tests for the reusable page pool.
+"""
+import asyncio
+import pytest
+from scrapers.browser import browser_stats
+from scrapers.page_pool import PagePool, child_processes_rss
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+        self.broken = False
+        self.urls = []
+
+    async def goto(self, url, **kwargs):
+        if self.broken:
+            raise RuntimeError("page crashed")
+        self.urls.append(url)
+
+    async def close(self):
+        self.closed = True
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+        self.broken = False
+
+    def on(self, event, handler):
+        pass
+
+    async def new_page(self):
+        if self.broken:
+            raise RuntimeError("context crashed")
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.failures = 0
+
+    async def new_context(self, **options):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("browser busy")
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+@pytest.fixture(autouse=True)
+def no_routing(monkeypatch):
+    monkeypatch.setenv("ZHIN_PAGE_CACHE", "off")
+    monkeypatch.setenv("ZHIN_RESOURCE_BLOCKING", "off")
+    monkeypatch.delenv("ZHIN_SITE_OVERRIDE", raising=False)
+
+async def test_pages_are_reused_and_reset():
+    """
+    Tests that leases hand out the same pages and blank them between URLs.
+    """
+    browser = FakeBrowser()
+    pool = PagePool(browser, size=2, max_navigations=100)
+    await pool.start()
+    seen = set()
+    for i in range(6):
+        async with pool.page() as page:
+            await page.goto(f"https://example.org/{i}")
+            seen.add(page)
+    assert len(browser.contexts) == 1
+    assert len(seen) <= 2
+    assert all(page.urls[-1] == "about:blank" for page in seen)
+    await pool.close()
+    assert browser.contexts[0].closed
+
+async def test_context_is_recycled_after_max_navigations():
+    """
+    Tests that the context is replaced, and the old one closed once its last
+    leased page comes back.
+    """
+    browser = FakeBrowser()
+    pool = PagePool(browser, size=3, max_navigations=4)
+    await pool.start()
+    recycled_before = browser_stats["contexts_recycled"]
+
+    async def visit(i):
+        async with pool.page() as page:
+            await asyncio.sleep(0.001 * (i % 3))
+
+    await asyncio.gather(*(visit(i) for i in range(10)))
+    assert len(browser.contexts) == 3
+    assert browser_stats["contexts_recycled"] - recycled_before == 2
+    old, current = browser.contexts[:-1], browser.contexts[-1]
+    assert all(context.closed and all(page.closed for page in context.pages) for context in old)
+    assert not current.closed
+    assert pool.context is current
+    assert pool._idle.qsize() == pool.size
+    await pool.close()
+
+async def test_failed_recycle_keeps_the_current_context():
+    """
+    Tests that a context that cannot be replaced stays in use and the
+    leased page still comes back to the pool.
+    """
+    browser = FakeBrowser()
+    pool = PagePool(browser, size=2, max_navigations=1)
+    await pool.start()
+    browser.failures = 1
+    with pytest.raises(RuntimeError):
+        async with pool.page():
+            pass
+    assert pool.context is browser.contexts[0]
+    assert pool._idle.qsize() == pool.size
+    async with pool.page():
+        pass
+    assert len(browser.contexts) == 2
+    await pool.close()
+
+async def test_a_page_that_cannot_be_replaced_does_not_shrink_the_pool():
+    """
+    Tests that when a page can neither be reset nor replaced, the next lease
+    gets a page from a fresh context instead of waiting forever.
+    """
+    browser = FakeBrowser()
+    pool = PagePool(browser, size=1, max_navigations=100)
+    await pool.start()
+    with pytest.raises(RuntimeError):
+        async with pool.page() as page:
+            page.broken = page.context.broken = True
+
+    async def lease():
+        async with pool.page() as page:
+            return page
+
+    page = await asyncio.wait_for(lease(), 1)
+    assert page.context is browser.contexts[1]
+    assert browser.contexts[0].closed
+    assert pool._idle.qsize() == pool.size
+    await pool.close()
+
+def test_child_processes_rss():
+    """
+    Tests that the browser memory reading is a byte count where /proc exists.
+    """
+    rss = child_processes_rss()
+    assert rss is None or rss >= 0
@@ -0,0 +1,99 @@
+"""
+Tests for the REST API paths of the press release scrapers.
+"""
+import json
+from pathlib import Path
+import pytest
+from benchmarks.site_simulator import SiteSimulator, opvp_post_meta_html
+from scrapers import opvp_scrapers
+from scrapers.nnc_press_scrapers import archive_press_releases, scrape_press_releases_api
+from scrapers.opvp_scrapers import OPVP_SITE, opvp_post_meta, scrape_opvp_press_releases, scrape_opvp_press_releases_api
+from scrapers.wordpress import WordPressAPIError, load_sync_state, parse_html
+
+async def test_opvp_api_writes_markdown_incrementally(tmp_path: Path, monkeypatch):
+    """
+    Tests that posts are saved in the browser scraper's Markdown format, and
+    a second run fetches nothing unchanged.
+    """
+    monkeypatch.chdir(tmp_path)
+    with SiteSimulator(scale=12) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        await scrape_opvp_press_releases_api()
+        # The cursor is the local modification time WordPress compares modified_after with.
+        assert load_sync_state(OPVP_SITE) == "2025-01-01T10:00:11"
+        files = sorted(Path("data/opvp/press_releases").glob("*.md"))
+        assert len(files) == 12
+        assert Path("data/opvp/press_releases/release-3.md").read_text() == (
+            "# Release 3\n\n**by OPVP Communications | Jan 1, 2025 | Press Releases**\n\n" + "".join(f"Paragraph {k} of release 3.\n\n" for k in range(8))
+        )
+        Path("data/opvp/press_releases/release-3.md").unlink()
+        await scrape_opvp_press_releases_api()
+        assert not Path("data/opvp/press_releases/release-3.md").exists()
+        await scrape_opvp_press_releases_api(full=True)
+        assert Path("data/opvp/press_releases/release-3.md").exists()
+
+def test_opvp_post_meta_matches_the_rendered_byline():
+    """
+    Tests that the API path writes the same date line the browser reads
+    from a post's `p.post-meta`.
+    """
+    post = {
+        "date": "2025-01-01T09:00:00",
+        "_embedded": {
+            "author": [{"name": "OPVP Communications"}],
+            "wp:term": [[{"taxonomy": "category", "name": "Press Releases"}], [{"taxonomy": "post_tag", "name": "Chapter"}]],
+        },
+    }
+    rendered = parse_html(opvp_post_meta_html()).find("p", "post-meta").text().strip()
+    assert opvp_post_meta(post) == rendered == "by OPVP Communications | Jan 1, 2025 | Press Releases"
+    assert opvp_post_meta({"date": "2024-03-05T17:30:00"}) == "Mar 5, 2024"
+
+async def test_opvp_falls_back_to_the_browser_when_the_api_lists_nothing(tmp_path: Path, monkeypatch):
+    """
+    Tests that a full crawl finding no posts is treated as an unavailable API.
+    """
+    monkeypatch.chdir(tmp_path)
+    fallbacks = []
+
+    async def browser_scraper(headless=True):
+        fallbacks.append(headless)
+
+    monkeypatch.setattr(opvp_scrapers, "scrape_opvp_press_releases_browser", browser_scraper)
+    with SiteSimulator(scale=0) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        with pytest.raises(WordPressAPIError):
+            await scrape_opvp_press_releases_api(full=True)
+        await scrape_opvp_press_releases(full=True)
+    assert fallbacks == [True]
+
+async def test_council_api_lists_the_archive(tmp_path: Path, monkeypatch):
+    """
+    Tests that the archive read through the API yields the releases and their metadata.
+    """
+    monkeypatch.chdir(tmp_path)
+    with SiteSimulator(scale=20) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        await scrape_press_releases_api(start_year=2020)
+        downloads = simulator.stats["downloads"]
+        await scrape_press_releases_api(start_year=2020)
+        assert simulator.stats["downloads"] == downloads
+        # An unchanged archive still retries downloads that went missing.
+        retried = sorted(Path("data/nnc_press_releases").glob("*.pdf"))[0]
+        retried.unlink()
+        await scrape_press_releases_api(start_year=2020)
+        assert simulator.stats["downloads"] == downloads + 1 and retried.exists()
+    metadata = sorted(Path("data/nnc_press_releases").glob("*.json"))
+    assert len(metadata) == downloads == 12
+    first = json.loads(metadata[0].read_text())
+    assert first["download_status"] == "Success" and first["title"].startswith("Release ")
+
+def test_archive_press_releases_mirrors_the_browser_extraction():
+    archive = parse_html(
+        '<ul class="et_pb_tabs_controls"><li><a>2024 Press Releases</a></li><li><a>2015 Press Releases</a></li></ul>'
+        '<div class="et_pb_tab"><ul><li>3/14/2024 – <a href="/wp-content/uploads/2024/pi.pdf">Pi Day</a></li>'
+        '<li>No date <a href="/x.pdf">x</a></li></ul></div>'
+        '<div class="et_pb_tab"><ul><li>1/1/2015 – <a href="/old.pdf">Old</a></li></ul></div>'
+    )
+    assert archive_press_releases(archive, 2016) == [{
+        "url": "https://www.navajonationcouncil.org/wp-content/uploads/2024/pi.pdf", "title": "Pi Day", "date": "3/14/2024",
+    }]
@@ -0,0 +1,51 @@
+"""
+Tests for the resource blocking profile.
+"""
+from scrapers.resource_blocking import BlockingProfile, blocking_profile_from_config
+
+PAGE = "https://www.navajonationcouncil.org/press-releases-archive/"
+
+def test_blocks_assets_and_third_party_requests():
+    """
+    Tests that heavy asset types and other sites' requests are blocked, and
+    documents and first-party scripts are not.
+    """
+    profile = BlockingProfile()
+    assert not profile.should_block(PAGE, "document", PAGE)
+    assert not profile.should_block("https://www.navajonationcouncil.org/app.js", "script", PAGE)
+    assert not profile.should_block("https://cdn.navajonationcouncil.org/app.js", "script", PAGE)
+    assert profile.should_block("https://www.navajonationcouncil.org/logo.png", "image", PAGE)
+    assert profile.should_block("https://www.navajonationcouncil.org/site.css", "stylesheet", PAGE)
+    assert profile.should_block("https://www.google-analytics.com/analytics.js", "script", PAGE)
+    assert profile.should_block("https://fonts.gstatic.com/font.woff2", "font", PAGE)
+
+def test_per_site_allowlist():
+    """
+    Tests that a site's allowlist lets its listed domains and types through
+    without affecting other sites.
+    """
+    profile = BlockingProfile(allow={
+        "dibb.nnols.org": {"domains": ["cdn.datatables.net"], "types": ["stylesheet"]},
+    })
+    dibb = "http://dibb.nnols.org/publicreporting.aspx"
+    assert not profile.should_block("https://cdn.datatables.net/1.13/jquery.dataTables.js", "script", dibb)
+    assert not profile.should_block("http://dibb.nnols.org/site.css", "stylesheet", dibb)
+    assert profile.should_block("http://dibb.nnols.org/logo.png", "image", dibb)
+    assert profile.should_block("https://cdn.datatables.net/1.13/jquery.dataTables.js", "script", PAGE)
+
+def test_unknown_page_blocks_by_type_only():
+    """
+    Tests that requests whose page is unknown are only blocked by type.
+    """
+    profile = BlockingProfile()
+    assert not profile.should_block("https://www.google-analytics.com/analytics.js", "script")
+    assert profile.should_block("https://www.google-analytics.com/pixel.gif", "image")
+
+def test_environment_overrides_config(monkeypatch):
+    """
+    Tests that ZHIN_RESOURCE_BLOCKING turns the profile on or off.
+    """
+    monkeypatch.setenv("ZHIN_RESOURCE_BLOCKING", "off")
+    assert blocking_profile_from_config() is None
+    monkeypatch.setenv("ZHIN_RESOURCE_BLOCKING", "on")
+    assert isinstance(blocking_profile_from_config(), BlockingProfile)
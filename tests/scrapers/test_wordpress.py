@@ -0,0 +1,66 @@
+"""
+Tests for the WordPress REST API helpers.
+"""
+import pytest
+from benchmarks.site_simulator import SiteSimulator
+from scrapers.browser import http_client
+from scrapers.wordpress import (
+    WordPressAPIError, fetch_page, fetch_posts, featured_image_url, load_sync_state, parse_html, rendered_text,
+    save_sync_state,
+)
+
+OPVP = "https://opvp.navajo-nsn.gov"
+COUNCIL = "https://www.navajonationcouncil.org"
+
+def test_parse_html_finds_elements_and_text():
+    """
+    Tests the element tree built from rendered post content.
+    """
+    root = parse_html('<div class="entry et_pb_tab"><p>One &amp; <a href="/x">two</a></p><br><p>Three<img src="i.jpg"></p></div>')
+    assert [p.text() for p in root.find_all("p")] == ["One & two", "Three"]
+    assert root.find("div", "et_pb_tab").classes == ["entry", "et_pb_tab"]
+    assert root.find("a").attrs["href"] == "/x"
+    assert root.find("img").attrs["src"] == "i.jpg"
+    assert root.find("div", "missing") is None
+    assert rendered_text({"rendered": "Council &#8211; Update"}) == "Council – Update"
+
+def test_featured_image_url():
+    assert featured_image_url({"_embedded": {"wp:featuredmedia": [{"source_url": "https://a/b.jpg"}]}}) == "https://a/b.jpg"
+    assert featured_image_url({"_embedded": {"wp:featuredmedia": [{"code": "rest_forbidden"}]}}) is None
+    assert featured_image_url({}) is None
+
+async def test_fetch_posts_pages_and_filters_by_modification(monkeypatch):
+    """
+    Tests that every page of posts is fetched, and modified_after narrows them.
+    """
+    with SiteSimulator(scale=25) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        async with http_client() as client:
+            posts = await fetch_posts(client, OPVP, per_page=10)
+            assert simulator.stats["requests"] == 3
+            latest = sorted(post["modified"] for post in posts)[-5]
+            recent = await fetch_posts(client, OPVP, modified_after=latest, per_page=10)
+    assert [post["id"] for post in posts] == list(range(25))
+    assert [post["id"] for post in recent] == list(range(21, 25))
+
+async def test_fetch_page_and_unavailable_api(monkeypatch):
+    """
+    Tests that an unchanged page yields None and a missing API raises.
+    """
+    with SiteSimulator(scale=5) as simulator:
+        monkeypatch.setenv("ZHIN_SITE_OVERRIDE", simulator.url)
+        async with http_client() as client:
+            page = await fetch_page(client, COUNCIL, "press-releases-archive")
+            assert await fetch_page(client, COUNCIL, "press-releases-archive", modified_after=page["modified"]) is None
+            with pytest.raises(WordPressAPIError):
+                await fetch_page(client, COUNCIL, "no-such-page")
+            with pytest.raises(WordPressAPIError):
+                await fetch_posts(client, "https://nndoj.navajo-nsn.gov")
+    assert "et_pb_tabs_controls" in page["content"]["rendered"]
+
+def test_sync_state_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert load_sync_state(OPVP) is None
+    save_sync_state(OPVP, "2025-01-01T10:00:00")
+    save_sync_state(COUNCIL, "2025-02-01T00:00:00")
+    assert load_sync_state(OPVP) == "2025-01-01T10:00:00"
@@ -0,0 +1,99 @@
+"""
+Tests for the bill catalog.
+"""
+import json
+import sqlite3
+from pathlib import Path
+import config
+from catalog import BillCatalog
+
+def _bill(number, status, sponsor, documents):
+    return {
+        "url": f"http://dibb.nnols.org/view?{number}",
+        "legislation_number": number,
+        "title": f"Bill {number}",
+        "description": "",
+        "sponsor": sponsor,
+        "co_sponsors": "",
+        "status": status,
+        "documents": documents,
+    }
+
+def _doc(name, status):
+    return {"title": name, "url": f"http://dibb.nnols.org/api/FileInfo/GetUri/?id={name}",
+            "local_path": f"data/dibb/bills/{name}.pdf", "download_status": status}
+
+def test_catalog_queries_and_upserts(tmp_path: Path):
+    """
+    Tests queries by status, sponsor and download state, and that upserts replace documents.
+    """
+    catalog = BillCatalog(tmp_path / "catalog.sqlite")
+    catalog.upsert_bill(_bill("0001-24", "Passed", "Jane Doe", [_doc("a", "Success"), _doc("b", "Failed")]))
+    catalog.upsert_bill(_bill("0002-24", "Pending", "John Roe", [_doc("c", "Not Found")]))
+
+    assert [b["legislation_number"] for b in catalog.bills(status="Passed")] == ["0001-24"]
+    assert [b["legislation_number"] for b in catalog.bills(sponsor="John Roe")] == ["0002-24"]
+    assert [d["title"] for d in catalog.documents(download_status="Failed")] == ["b"]
+
+    catalog.set_download_status(_doc("b", "")["url"], "Success")
+    assert catalog.documents(download_status="Failed") == []
+
+    catalog.upsert_bill(_bill("0001-24", "Vetoed", "Jane Doe", [_doc("a", "Success")]))
+    bill = catalog.bill("0001-24")
+    assert bill["status"] == "Vetoed"
+    assert [d["title"] for d in bill["documents"]] == ["a"]
+    catalog.close()
+
+def test_import_json_files(tmp_path: Path):
+    """
+    Tests that per-bill JSON files from earlier runs are imported.
+    """
+    (tmp_path / "0003-24.json").write_text(json.dumps(_bill("0003-24", "Passed", "Jane Doe", [_doc("d", "Success")])))
+    (tmp_path / "broken.json").write_text("{")
+    catalog = BillCatalog(tmp_path / "catalog.sqlite")
+    assert catalog.import_json_files(tmp_path) == 1
+    assert catalog.bill("0003-24")["documents"][0]["title"] == "d"
+    catalog.close()
+
+def test_a_document_can_belong_to_several_bills(tmp_path: Path):
+    """
+    Tests that a PDF attached to two bills stays listed under both.
+    """
+    catalog = BillCatalog(tmp_path / "catalog.sqlite")
+    catalog.upsert_bill(_bill("0001-24", "Passed", "Jane Doe", [_doc("shared", "Success")]))
+    catalog.upsert_bill(_bill("0002-24", "Pending", "John Roe", [_doc("shared", "Success"), _doc("e", "Success")]))
+    assert [d["title"] for d in catalog.bill("0001-24")["documents"]] == ["shared"]
+    assert [d["title"] for d in catalog.bill("0002-24")["documents"]] == ["e", "shared"]
+    catalog.set_download_status(_doc("shared", "")["url"], "Failed")
+    assert [d["legislation_number"] for d in catalog.documents(download_status="Failed")] == ["0001-24", "0002-24"]
+    catalog.close()
+
+def test_catalogs_keyed_by_url_are_migrated(tmp_path: Path):
+    path = tmp_path / "catalog.sqlite"
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE bills (legislation_number TEXT PRIMARY KEY, url TEXT, title TEXT, description TEXT, sponsor TEXT,"
+        " co_sponsors TEXT, status TEXT, updated_at TEXT);"
+        "CREATE TABLE documents (url TEXT PRIMARY KEY, legislation_number TEXT NOT NULL, title TEXT, local_path TEXT,"
+        " download_status TEXT);"
+        "INSERT INTO bills (legislation_number) VALUES ('0001-24');"
+        "INSERT INTO documents VALUES ('http://dibb.nnols.org/a', '0001-24', 'a', 'a.pdf', 'Success');"
+    )
+    db.close()
+    catalog = BillCatalog(path)
+    assert catalog.documents()[0]["title"] == "a"
+    catalog.upsert_bill(_bill("0002-24", "Passed", "Jane Doe", [{**_doc("a", "Success"), "url": "http://dibb.nnols.org/a"}]))
+    assert len(catalog.documents()) == 2
+    catalog.close()
+
+def test_shared_data_directories_use_the_rollback_journal(tmp_path: Path, monkeypatch):
+    """
+    Tests that the catalog avoids WAL when the data directory is shared between machines.
+    """
+    catalog = BillCatalog(tmp_path / "local.sqlite")
+    assert catalog._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    catalog.close()
+    monkeypatch.setattr(config, "get_config", lambda: {"storage": {"shared": True}})
+    catalog = BillCatalog(tmp_path / "shared.sqlite")
+    assert catalog._db.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    catalog.close()
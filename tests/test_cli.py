@@ -0,0 +1,76 @@
+"""
+Tests for the zhin command line and its import-time cost.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+HEAVY_MODULES = ["playwright", "httpx", "fitz", "pymupdf", "numpy", "google.genai", "toml"]
+
+# Generous enough for a loaded CI machine; a regression to eager imports of
+# Playwright or PyMuPDF costs far more than this.
+IMPORT_BUDGET_SECONDS = 0.1
+
+def _run(code: str, cwd: Path) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, env={"PYTHONPATH": str(SRC_DIR)}, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total) / 1e6
+    return {"output": json.loads(result.stdout.splitlines()[-1]), "import_seconds": cumulative}
+
+def test_importing_the_cli_is_cheap(tmp_path: Path):
+    """
+    Tests that `import main` loads no heavy dependency and stays within budget.
+    """
+    result = _run(
+        f"import json, sys, main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))",
+        tmp_path,
+    )
+    assert result["output"] == []
+    assert result["import_seconds"]["main"] < IMPORT_BUDGET_SECONDS
+
+def test_search_command_does_not_load_scrapers_or_pdf_support(tmp_path: Path):
+    """
+    Tests that a keyword search imports only what searching needs.
+    """
+    result = _run(
+        "import json, sys, main; main.main(['search', 'grazing']); "
+        f"print(json.dumps([m for m in {HEAVY_MODULES + ['scrapers']!r} if m in sys.modules]))",
+        tmp_path,
+    )
+    assert result["output"] == ["toml"]
+
+def test_subcommands_parse_their_own_options():
+    """
+    Tests that each subcommand carries its own and the shared profiling options.
+    """
+    import main
+    args = main.build_parser().parse_args(["phase2", "--watch", "--interval", "2", "--profile"])
+    assert (args.command, args.watch, args.interval, args.profile) == ("phase2", True, 2.0, True)
+    assert args.handler is main.phase2_command
+
+def test_dibb_command_takes_process_options():
+    import main
+    args = main.build_parser().parse_args(["dibb", "--processes", "4", "--join", "--lease-store", "/mnt/shared/leases.sqlite"])
+    assert (args.handler, args.processes, args.join) == (main.dibb_command, 4, True)
+    assert args.lease_store == Path("/mnt/shared/leases.sqlite")
+    assert main.build_parser().parse_args(["scrape", "--processes", "2"]).processes == 2
+
+def test_diff_command_prints_changed_sections(tmp_path: Path, monkeypatch, capsys):
+    """
+    Tests that `zhin diff` reports only the sections that differ.
+    """
+    import main
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "old.md").write_text("§ 1. Scope\nApplies to grazing.\n§ 2. Fees\nFees are $5.\n", encoding="utf-8")
+    (tmp_path / "new.md").write_text("§ 1. Scope\nApplies to grazing.\n§ 2. Fees\nFees are $10.\n", encoding="utf-8")
+    main.main(["diff", "old.md", "new.md", "--no-cache"])
+    assert capsys.readouterr().out == "§ 2: changed\n  - Fees are $5.\n  + Fees are $10.\n"
@@ -0,0 +1,57 @@
+"""
+Tests for the profiling hooks.
+"""
+import asyncio
+import os
+import time
+from pathlib import Path
+import profiling
+from profiling import profile_run, run_async, stage
+
+def test_stage_is_a_noop_without_a_profile():
+    """
+    Tests that marking stages outside a profiled run records nothing.
+    """
+    with stage("idle"):
+        pass
+    assert profiling._active is None
+
+def test_profile_run_reports_stages_profiles_and_stalls(tmp_path: Path):
+    """
+    Tests that a profiled run writes one report with every section filled in.
+    """
+    async def stalls_the_loop():
+        with stage("async.block"):
+            time.sleep(0.05)
+
+    with profile_run("zhin-test", True, cprofile=True, memory=True, slow_callback=0.02) as profiler:
+        profiler.report_dir = tmp_path
+        for _ in range(3):
+            with stage("outer"):
+                with stage("inner"):
+                    sum(range(10000))
+        run_async(stalls_the_loop())
+
+    assert profiler.stages["outer"][0] == 3
+    assert profiler.stages["inner"][0] == 3
+    # Only the outermost stage is profiled; nested stages are part of it.
+    assert set(profiler.profiles) == {"outer", "async.block"}
+    reports = list(tmp_path.glob("zhin-test-*.txt"))
+    assert len(reports) == 1
+    report = reports[0].read_text()
+    assert "Event-loop stalls over 20 ms: 1" in report
+    assert "cProfile: outer" in report
+    assert "Top allocations: outer" in report
+    assert profiling._active is None
+
+def test_process_tree_rss_counts_the_root_only_when_asked():
+    """
+    Tests that the memory reading is a byte count where /proc exists, and
+    that leaving out the root process never adds to it.
+    """
+    with_root = profiling.process_tree_rss(os.getpid())
+    children = profiling.process_tree_rss(os.getpid(), include_root=False)
+    if with_root is None:
+        assert children is None
+    else:
+        assert with_root > 0 and 0 <= children <= with_root
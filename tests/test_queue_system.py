@@ -0,0 +1,24 @@
+"""
+Tests for the asynchronous task queue.
+"""
+import asyncio
+from queue_system import QueueManager
+
+async def test_failing_tasks_do_not_block_join():
+    """
+    Tests that a task raising an error is still marked done, and the worker goes on.
+    """
+    done = []
+
+    async def work(n):
+        if n % 2:
+            raise OSError(f"task {n} failed")
+        done.append(n)
+
+    queue = QueueManager(worker_coro=work, num_workers=2, name="Flaky")
+    await queue.start()
+    for n in range(6):
+        await queue.add_task(n)
+    await asyncio.wait_for(queue.join(), 1)
+    await queue.stop()
+    assert sorted(done) == [0, 2, 4]
@@ -0,0 +1,47 @@
+"""
+Tests for span tracing.
+"""
+import asyncio
+import json
+from pathlib import Path
+from queue_system import QueueManager
+from tracing import span, trace_run
+
+def test_span_is_a_noop_without_a_trace():
+    """
+    Tests that spans outside a traced run still yield their arguments.
+    """
+    with span("idle", url="http://example.org") as args:
+        args["status"] = "Success"
+    assert args == {"url": "http://example.org", "status": "Success"}
+
+async def test_queue_workers_get_their_own_tracks(tmp_path: Path):
+    """
+    Tests that spans from concurrent workers are exported on separate, named tracks.
+    """
+    trace_path = tmp_path / "trace.json"
+
+    async def work(url):
+        with span("fetch", url=url) as args:
+            await asyncio.sleep(0.01)
+            args["status"] = "Success"
+
+    with trace_run(trace_path):
+        queue = QueueManager(worker_coro=work, num_workers=2, name="Fetcher")
+        await queue.start()
+        for i in range(4):
+            await queue.add_task(f"http://example.org/{i}")
+        await queue.join()
+        await queue.stop()
+
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    tracks = {e["args"]["name"]: e["tid"] for e in events if e["ph"] == "M"}
+    fetches = [e for e in events if e["name"] == "fetch"]
+    assert len(fetches) == 4
+    assert all(e["args"]["status"] == "Success" and e["dur"] > 0 for e in fetches)
+    assert {e["tid"] for e in fetches} == {tracks["MainThread/Fetcher/worker-1"], tracks["MainThread/Fetcher/worker-2"]}
+    tasks = [e for e in events if e["name"] == "Fetcher.task"]
+    # Each fetch is nested inside the task span on the same track.
+    for fetch in fetches:
+        assert any(t["tid"] == fetch["tid"] and t["ts"] <= fetch["ts"] and
+                   fetch["ts"] + fetch["dur"] <= t["ts"] + t["dur"] for t in tasks)